@@ -0,0 +1,81 @@
+"""Micro-benchmark: text framing and validation vs. the binary wire protocol.
+
+Times framing one read of pipelined messages and validating (text) or
+resolving (binary) every frame, without the frame cache, so the figures show
+the per-message decode cost each format puts on the event loop.
+
+Run from the repository root (Home Assistant must be importable, as for the
+integration itself):
+
+    python benchmarks/bench_binary.py [--number N] [--pipeline N]
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from custom_components.tcp_to_event_converter.binary import (  # noqa: E402
+    BinaryRegistry,
+    encode_binary_event,
+)
+from custom_components.tcp_to_event_converter.framing import (  # noqa: E402
+    BinaryFramer,
+    NewlineFramer,
+)
+from custom_components.tcp_to_event_converter.validator import (  # noqa: E402
+    validate_frame,
+)
+
+REGISTRY = BinaryRegistry.from_json(json.dumps({
+    "devices": {"12": "living_room_panel"},
+    "buttons": {"3": "button_3"},
+    "actions": ["press", "release"],
+}))
+
+
+def main() -> None:
+    """Time both formats on one read of pipelined messages."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000, help="reads per format")
+    parser.add_argument("--pipeline", type=int, default=64, help="messages per read")
+    args = parser.parse_args()
+
+    text_read = b"living_room_panel:button_3:press\n" * args.pipeline
+    binary_read = encode_binary_event(12, 3, 0) * args.pipeline
+    text_framer = NewlineFramer()
+    binary_framer = BinaryFramer()
+    resolve = REGISTRY.resolve
+
+    def text() -> None:
+        for frame in text_framer.feed(text_read):
+            validate_frame(frame)
+
+    def binary() -> None:
+        for frame in binary_framer.feed(binary_read):
+            resolve(frame)
+
+    assert [validate_frame(f)[1] for f in NewlineFramer().feed(text_read)] == [
+        resolve(f)[1] for f in BinaryFramer().feed(binary_read)
+    ]
+
+    messages = args.number * args.pipeline
+    text_time = min(timeit.repeat(text, number=args.number, repeat=3))
+    binary_time = min(timeit.repeat(binary, number=args.number, repeat=3))
+    print(f"{'format':<8}{'bytes/msg':>10}{'ns/msg':>10}{'msg/s/core':>14}")
+    for name, elapsed, size in (
+        ("text", text_time, len(text_read)),
+        ("binary", binary_time, len(binary_read)),
+    ):
+        print(
+            f"{name:<8}{size / args.pipeline:>10.0f}"
+            f"{elapsed / messages * 1e9:>10.0f}{messages / elapsed:>14.0f}"
+        )
+    print(f"speedup {text_time / binary_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
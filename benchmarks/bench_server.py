@@ -0,0 +1,611 @@
+"""Load generator and benchmark for the TCP ingest server.
+
+Starts a TCPServer against a stub ``hass`` whose bus records when each event
+is fired, then drives it from separate client processes so that the server
+process' CPU time and memory are measured on their own. Reports throughput,
+end-to-end latency (client write to ``async_fire``), server CPU and RSS.
+With ``--idle-connections`` it first opens that many extra connections that
+stay idle for the whole run and reports the server RSS they cost per
+connection. ``--tls`` serves TLS with a throwaway self-signed certificate
+(generated with the ``openssl`` command), and ``--reconnects`` adds a storm of
+short connections that each resume the previous TLS session, reporting
+handshake latency and the server's resumption rate.
+
+Run from the repository root (Home Assistant must be importable, as for the
+integration itself):
+
+    python benchmarks/bench_server.py --clients 50 --rate 200 --pipeline 4
+    python benchmarks/bench_server.py --output baseline.json
+    python benchmarks/bench_server.py --compare baseline.json
+    python benchmarks/bench_server.py --server-mode protocol --idle-connections 10000
+    python benchmarks/bench_server.py --tls --reconnects 2000
+
+End-to-end latency is matched per client in arrival order, so it is only
+exact when no valid message is dropped (for example by rate limiting).
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import random
+import resource
+import socket
+import ssl
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from custom_components.tcp_to_event_converter.admission import (  # noqa: E402
+    raise_open_file_limit,
+)
+from custom_components.tcp_to_event_converter.binary import (  # noqa: E402
+    encode_binary_event,
+)
+from custom_components.tcp_to_event_converter.const import (  # noqa: E402
+    CONF_BINARY_REGISTRY,
+    CONF_FRAMING,
+    CONF_IDLE_TIMEOUT,
+    CONF_MAX_CONNECTIONS,
+    CONF_SERVER_MODE,
+    CONF_SOCKET_PATH,
+    CONF_TLS_CERTFILE,
+    CONF_TLS_KEYFILE,
+    CONF_TRANSPORT,
+    FRAMING_BINARY,
+    FRAMING_LENGTH_PREFIXED,
+    FRAMING_MODES,
+    FRAMING_NEWLINE,
+    OPEN_FILE_HEADROOM,
+    SERVER_MODES,
+    TRANSPORT_TCP,
+    TRANSPORT_UDP,
+    TRANSPORT_UNIX,
+    TRANSPORTS,
+)
+from custom_components.tcp_to_event_converter.tcp_server import TCPServer  # noqa: E402
+
+EVENT_TYPE = "tcp_bench"
+# Time allowed for queued events to be fired after the clients finish
+DRAIN_GRACE: float = 1.0
+# Number of distinct button ids used per client
+BUTTONS_PER_CLIENT: int = 16
+# Idle connections opened concurrently by the idle connection process
+IDLE_CONNECT_BATCH: int = 100
+# Seconds allowed for the server to accept all idle connections
+IDLE_ACCEPT_TIMEOUT: float = 60.0
+# Seconds a reconnecting client reads for the session tickets sent after the handshake
+TICKET_WAIT: float = 0.01
+# Seconds a reconnecting client waits for the connection and handshake
+RECONNECT_TIMEOUT: float = 5.0
+# Result figures printed by print_report
+REPORT_KEYS: Tuple[str, ...] = (
+    "valid_sent", "events_fired", "throughput",
+    "latency_p50_ms", "latency_p99_ms", "latency_max_ms",
+    "server_cpu_seconds", "server_cpu_percent",
+    "rss_mb", "rss_growth_mb", "peak_rss_mb", "rss_per_connection_bytes",
+    "reconnects_done", "handshake_p50_ms", "handshake_p99_ms", "resumption_rate",
+)
+
+
+class StubBus:
+    """Event bus stub recording the fire time of every event per device."""
+
+    def __init__(self) -> None:
+        """Initialize an empty record."""
+        self.fired: Dict[str, List[float]] = defaultdict(list)
+        self.count: int = 0
+
+    def async_fire(self, event_type: str, event_data: Dict[str, Any]) -> None:
+        """Record the event instead of dispatching it."""
+        self.fired[event_data["device_id"]].append(time.monotonic())
+        self.count += 1
+
+
+class StubHass:
+    """Minimal stand-in for HomeAssistant used by TCPServer."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Initialize the stub for the running loop."""
+        self.loop = loop
+        self.bus = StubBus()
+        self.data: Dict[str, Any] = {}
+
+    def async_add_executor_job(self, target: Any, *args: Any) -> asyncio.Future:
+        """Run a blocking function in the default executor."""
+        return self.loop.run_in_executor(None, target, *args)
+
+
+def encode_frame(payload: bytes, framing: str) -> bytes:
+    """Frame a payload for the configured framing mode."""
+    if framing == FRAMING_LENGTH_PREFIXED:
+        return struct.pack("!H", len(payload)) + payload
+    return payload + b"\n"
+
+
+class _DatagramWriter:
+    """StreamWriter-like wrapper sending each write as one datagram."""
+
+    def __init__(self, transport: asyncio.DatagramTransport, _protocol: Any) -> None:
+        """Wrap a connected datagram transport."""
+        self._transport = transport
+
+    def write(self, data: bytes) -> None:
+        """Send one datagram."""
+        self._transport.sendto(data)
+
+    async def drain(self) -> None:
+        """Datagrams are not flow controlled."""
+
+    def close(self) -> None:
+        """Close the transport."""
+        self._transport.close()
+
+    async def wait_closed(self) -> None:
+        """Nothing to wait for."""
+
+
+def self_signed_certificate(directory: str) -> Tuple[str, str]:
+    """Generate a throwaway self-signed certificate and key with openssl.
+
+    Returns:
+        Paths of the certificate and the private key files
+    """
+    certfile = os.path.join(directory, "cert.pem")
+    keyfile = os.path.join(directory, "key.pem")
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "ec",
+            "-pkeyopt", "ec_paramgen_curve:prime256v1", "-nodes", "-days", "1",
+            "-subj", "/CN=localhost", "-keyout", keyfile, "-out", certfile,
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return certfile, keyfile
+
+
+def client_ssl_context(args: argparse.Namespace) -> Optional[ssl.SSLContext]:
+    """TLS context of the load clients, accepting the self-signed certificate."""
+    if not args.tls:
+        return None
+    context = ssl.create_default_context()
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+def bench_registry(clients: int) -> Dict[str, Any]:
+    """Binary framing registry naming the ids used by the load clients."""
+    return {
+        "devices": {str(client_id): f"bench{client_id}" for client_id in range(clients)},
+        "buttons": [f"b{index}" for index in range(BUTTONS_PER_CLIENT)],
+        "actions": ["press"],
+    }
+
+
+async def _run_client(
+    client_id: int, args: argparse.Namespace, deadline: float
+) -> List[float]:
+    """Send messages from one connection until the deadline.
+
+    Returns:
+        Send time (time.monotonic) of every valid message, in order
+    """
+    rng = random.Random(client_id)
+    device = b"bench%d" % client_id
+    buttons = [b"b%d" % index for index in range(BUTTONS_PER_CLIENT)]
+    if args.framing == FRAMING_BINARY:
+        valid = [encode_binary_event(client_id, index, 0) for index in range(len(buttons))]
+        invalid = encode_binary_event(client_id, 0, 1)  # Unknown action id
+    else:
+        valid = [
+            encode_frame(device + b":" + button + b":press", args.framing)
+            for button in buttons
+        ]
+        invalid = encode_frame(device + b":bad$button:press", args.framing)
+    interval = args.pipeline / args.rate if args.rate > 0 else 0.0
+
+    if args.transport == TRANSPORT_UDP:
+        writer = _DatagramWriter(
+            *await asyncio.get_running_loop().create_datagram_endpoint(
+                asyncio.DatagramProtocol, remote_addr=(args.host, args.port)
+            )
+        )
+    elif args.transport == TRANSPORT_UNIX:
+        _, writer = await asyncio.open_unix_connection(args.socket_path)
+    else:
+        _, writer = await asyncio.open_connection(
+            args.host, args.port, ssl=client_ssl_context(args)
+        )
+    sent: List[float] = []
+    next_send = time.monotonic()
+    try:
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            batch = []
+            valid_in_batch = 0
+            for _ in range(args.pipeline):
+                if rng.random() < args.invalid_ratio:
+                    batch.append(invalid)
+                else:
+                    batch.append(rng.choice(valid))
+                    valid_in_batch += 1
+            writer.write(b"".join(batch))
+            sent.extend([now] * valid_in_batch)
+            await writer.drain()
+
+            if interval:
+                next_send += interval
+                delay = next_send - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            else:
+                await asyncio.sleep(0)
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+    return sent
+
+
+def _client_process(
+    first_id: int,
+    count: int,
+    args: argparse.Namespace,
+    start_at: float,
+    results: "multiprocessing.Queue",
+) -> None:
+    """Run a group of client connections in a separate process."""
+    async def main() -> Dict[int, List[float]]:
+        delay = start_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        deadline = start_at + args.duration
+        sent = await asyncio.gather(*(
+            _run_client(client_id, args, deadline)
+            for client_id in range(first_id, first_id + count)
+        ))
+        return dict(zip(range(first_id, first_id + count), sent))
+
+    results.put(asyncio.run(main()))
+
+
+async def _open_idle_connection(args: argparse.Namespace) -> asyncio.StreamWriter:
+    """Open a connection that never sends anything."""
+    if args.transport == TRANSPORT_UNIX:
+        _, writer = await asyncio.open_unix_connection(args.socket_path)
+    else:
+        _, writer = await asyncio.open_connection(
+            args.host, args.port, ssl=client_ssl_context(args)
+        )
+    return writer
+
+
+def _idle_process(
+    args: argparse.Namespace,
+    opened: Any,
+    finished: Any,
+) -> None:
+    """Hold idle connections open in a separate process until the run ends."""
+    raise_open_file_limit(args.idle_connections + OPEN_FILE_HEADROOM)
+
+    async def main() -> None:
+        writers: List[asyncio.StreamWriter] = []
+        for first in range(0, args.idle_connections, IDLE_CONNECT_BATCH):
+            count = min(IDLE_CONNECT_BATCH, args.idle_connections - first)
+            writers.extend(await asyncio.gather(
+                *(_open_idle_connection(args) for _ in range(count))
+            ))
+        opened.set()
+        await asyncio.get_running_loop().run_in_executor(None, finished.wait)
+        for writer in writers:
+            writer.close()
+
+    asyncio.run(main())
+
+
+async def _measure_idle_connections(
+    args: argparse.Namespace, server: TCPServer
+) -> Tuple[Optional[multiprocessing.Process], Any, float]:
+    """Open the idle connections and measure the server RSS they cost.
+
+    Returns:
+        The idle connection process, the event that ends it and the RSS
+        growth per idle connection in bytes
+    """
+    if not args.idle_connections:
+        return None, None, 0.0
+    loop = asyncio.get_running_loop()
+    rss_before = _rss_bytes()
+    opened = multiprocessing.Event()
+    finished = multiprocessing.Event()
+    process = multiprocessing.Process(target=_idle_process, args=(args, opened, finished))
+    process.start()
+    await loop.run_in_executor(None, opened.wait)
+    deadline = time.monotonic() + IDLE_ACCEPT_TIMEOUT
+    while server._connection_count < args.idle_connections:
+        if time.monotonic() > deadline:
+            raise RuntimeError(
+                f"only {server._connection_count} of {args.idle_connections} "
+                "idle connections were accepted"
+            )
+        await asyncio.sleep(0.05)
+    return process, finished, (_rss_bytes() - rss_before) / args.idle_connections
+
+
+def _reconnect(args: argparse.Namespace, count: int, deadline: float) -> List[float]:
+    """Open short connections one after another until count or the deadline.
+
+    Each TLS connection resumes the session of the previous one, like a
+    device that reconnects often.
+
+    Returns:
+        Connect and handshake time of every connection that succeeded, in
+        seconds
+    """
+    context = client_ssl_context(args)
+    session = None
+    times: List[float] = []
+    for _ in range(count):
+        if time.monotonic() >= deadline:
+            break
+        started = time.monotonic()
+        try:
+            sock = socket.create_connection(
+                (args.host, args.port), timeout=RECONNECT_TIMEOUT
+            )
+        except OSError:
+            continue
+        try:
+            if context is not None:
+                sock = context.wrap_socket(sock, session=session)
+            times.append(time.monotonic() - started)
+            if context is not None:
+                # TLS 1.3 session tickets arrive after the handshake
+                sock.settimeout(TICKET_WAIT)
+                try:
+                    sock.recv(1)
+                except OSError:
+                    pass
+                session = sock.session
+        except OSError:
+            pass  # Reset by admission control or the handshake failed
+        finally:
+            sock.close()
+    return times
+
+
+def _reconnect_process(
+    args: argparse.Namespace, start_at: float, results: "multiprocessing.Queue"
+) -> None:
+    """Run the reconnect storm from client threads in a separate process."""
+    delay = start_at - time.monotonic()
+    if delay > 0:
+        time.sleep(delay)
+    deadline = start_at + args.duration
+    threads = min(args.clients, args.reconnects)
+    counts = [
+        args.reconnects // threads + (index < args.reconnects % threads)
+        for index in range(threads)
+    ]
+    with ThreadPoolExecutor(threads) as executor:
+        times = executor.map(lambda count: _reconnect(args, count, deadline), counts)
+        results.put([value for thread_times in times for value in thread_times])
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(round(fraction * len(values))) - 1))
+    return values[index]
+
+
+def _rss_bytes() -> int:
+    """Current resident set size of this process."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return 0
+
+
+async def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    """Start the server, drive it with client processes and collect results."""
+    loop = asyncio.get_running_loop()
+    hass = StubHass(loop)
+    options = {
+        CONF_TRANSPORT: args.transport,
+        CONF_SOCKET_PATH: args.socket_path,
+        CONF_SERVER_MODE: args.server_mode,
+        CONF_FRAMING: args.framing,
+    }
+    if args.tls:
+        options[CONF_TLS_CERTFILE] = args.tls_certfile
+        options[CONF_TLS_KEYFILE] = args.tls_keyfile
+    if args.framing == FRAMING_BINARY:
+        options[CONF_BINARY_REGISTRY] = json.dumps(bench_registry(args.clients))
+    if args.idle_connections:
+        options[CONF_MAX_CONNECTIONS] = args.idle_connections + args.clients
+        options[CONF_IDLE_TIMEOUT] = 0
+    options.update(json.loads(args.options))
+    raise_open_file_limit(args.idle_connections + args.clients + OPEN_FILE_HEADROOM)
+    server = TCPServer(hass, args.port, EVENT_TYPE, options)
+    await server.start()
+    idle_process, idle_finished, rss_per_connection = await _measure_idle_connections(
+        args, server
+    )
+
+    rss_before = _rss_bytes()
+    results: "multiprocessing.Queue" = multiprocessing.Queue()
+    start_at = time.monotonic() + 0.5
+    processes = []
+    per_process = -(-args.clients // args.client_procs)
+    for first_id in range(0, args.clients, per_process):
+        process = multiprocessing.Process(
+            target=_client_process,
+            args=(first_id, min(per_process, args.clients - first_id), args, start_at, results),
+        )
+        process.start()
+        processes.append(process)
+    reconnect_process = None
+    reconnect_results: "multiprocessing.Queue" = multiprocessing.Queue()
+    if args.reconnects:
+        reconnect_process = multiprocessing.Process(
+            target=_reconnect_process, args=(args, start_at, reconnect_results)
+        )
+        reconnect_process.start()
+
+    usage_start = resource.getrusage(resource.RUSAGE_SELF)
+    sent: Dict[int, List[float]] = {}
+    for _ in processes:
+        sent.update(await loop.run_in_executor(None, results.get))
+    for process in processes:
+        await loop.run_in_executor(None, process.join)
+    handshakes: List[float] = []
+    if reconnect_process is not None:
+        handshakes = sorted(await loop.run_in_executor(None, reconnect_results.get))
+        await loop.run_in_executor(None, reconnect_process.join)
+    await asyncio.sleep(DRAIN_GRACE)
+    usage_end = resource.getrusage(resource.RUSAGE_SELF)
+    rss_after = _rss_bytes()
+    if idle_process is not None:
+        idle_finished.set()
+        await loop.run_in_executor(None, idle_process.join)
+    await server.stop()
+
+    latencies: List[float] = []
+    for client_id, send_times in sent.items():
+        fire_times = hass.bus.fired.get("bench%d" % client_id, [])
+        latencies.extend(
+            fired - sent_at for sent_at, fired in zip(send_times, fire_times)
+        )
+    latencies.sort()
+
+    cpu = (
+        usage_end.ru_utime - usage_start.ru_utime
+        + usage_end.ru_stime - usage_start.ru_stime
+    )
+    valid_sent = sum(len(times) for times in sent.values())
+    tls = server.tls_stats
+    return {
+        "config": {
+            "clients": args.clients,
+            "rate": args.rate,
+            "pipeline": args.pipeline,
+            "invalid_ratio": args.invalid_ratio,
+            "duration": args.duration,
+            "idle_connections": args.idle_connections,
+            "reconnects": args.reconnects,
+            "options": options,
+        },
+        "valid_sent": valid_sent,
+        "events_fired": hass.bus.count,
+        "throughput": hass.bus.count / args.duration,
+        "latency_p50_ms": _percentile(latencies, 0.5) * 1000,
+        "latency_p99_ms": _percentile(latencies, 0.99) * 1000,
+        "latency_max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+        "server_cpu_seconds": cpu,
+        "server_cpu_percent": cpu / (args.duration + DRAIN_GRACE) * 100,
+        "rss_mb": rss_after / 1e6,
+        "rss_growth_mb": (rss_after - rss_before) / 1e6,
+        "peak_rss_mb": usage_end.ru_maxrss / 1e3,
+        "rss_per_connection_bytes": rss_per_connection,
+        "reconnects_done": len(handshakes),
+        "handshake_p50_ms": _percentile(handshakes, 0.5) * 1000,
+        "handshake_p99_ms": _percentile(handshakes, 0.99) * 1000,
+        "resumption_rate": tls["resumption_rate"] if tls is not None else 0.0,
+        "server_metrics": server.metrics.as_dict(),
+        "tls": tls,
+        "drops": server.drop_counts,
+    }
+
+
+def print_report(
+    result: Dict[str, Any],
+    baseline: Optional[Dict[str, Any]],
+    keys: Tuple[str, ...] = REPORT_KEYS,
+) -> None:
+    """Print the headline figures, with deltas against a baseline if given."""
+    for key in keys:
+        line = f"{key:<26}{result[key]:>14.3f}"
+        if baseline is not None and key in baseline:
+            base = baseline[key]
+            change = (result[key] - base) / base * 100 if base else 0.0
+            line += f"{base:>14.3f}{change:>+9.1f}%"
+        print(line)
+    print("drops", result["drops"])
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54399)
+    parser.add_argument("--clients", type=int, default=10, help="concurrent connections")
+    parser.add_argument("--client-procs", type=int, default=2, help="load generator processes")
+    parser.add_argument("--rate", type=float, default=100.0,
+                        help="messages/second per client (0 = as fast as possible)")
+    parser.add_argument("--pipeline", type=int, default=1, help="messages per write")
+    parser.add_argument("--invalid-ratio", type=float, default=0.0,
+                        help="fraction of invalid messages")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load")
+    parser.add_argument("--idle-connections", type=int, default=0,
+                        help="extra connections held open without sending (tcp and unix)")
+    parser.add_argument("--reconnects", type=int, default=0,
+                        help="short connections opened one after another during the load")
+    parser.add_argument("--tls", action="store_true",
+                        help="serve TLS with a generated self-signed certificate (tcp)")
+    parser.add_argument("--transport", choices=TRANSPORTS, default=TRANSPORT_TCP)
+    parser.add_argument("--socket-path", default="/tmp/tcp_to_event_converter_bench.sock",
+                        help="socket file for the unix transport")
+    parser.add_argument("--server-mode", choices=SERVER_MODES, default=SERVER_MODES[0])
+    parser.add_argument("--framing", choices=FRAMING_MODES, default=FRAMING_NEWLINE)
+    parser.add_argument("--options", default="{}", help="extra server options as JSON")
+    parser.add_argument("--log-level", default="ERROR", help="integration log level")
+    parser.add_argument("--output", help="write the full result to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    args = parser.parse_args(argv)
+    if args.tls and args.transport != TRANSPORT_TCP:
+        parser.error("--tls requires the tcp transport")
+    if args.reconnects and args.transport != TRANSPORT_TCP:
+        parser.error("--reconnects requires the tcp transport")
+    return args
+
+
+def main() -> None:
+    """Run the benchmark from the command line."""
+    args = parse_args()
+    logging.basicConfig(level=args.log_level.upper())
+    with tempfile.TemporaryDirectory() as directory:
+        if args.tls:
+            args.tls_certfile, args.tls_keyfile = self_signed_certificate(directory)
+        result = asyncio.run(run_benchmark(args))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+    print_report(result, baseline)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(result, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Micro-benchmark: legacy per-field validation vs. the single-pass validator.
+
+Run from the repository root (Home Assistant must be importable, as for the
+integration itself):
+
+    python benchmarks/bench_validator.py [--number N]
+"""
+
+import argparse
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from custom_components.tcp_to_event_converter.const import (  # noqa: E402
+    EXPECTED_MESSAGE_PARTS,
+    FIELD_VALIDATION_PATTERN,
+    MAX_FIELD_LENGTH,
+)
+from custom_components.tcp_to_event_converter.validator import (  # noqa: E402
+    ValidationCode,
+    validate_frame,
+)
+
+SAMPLES = {
+    "valid": b"living_room_panel:button_12:press",
+    "valid_padded": b"  living_room_panel : button_12 : press \r",
+    "bad_chars": b"living_room_panel:button$12:press",
+    "wrong_parts": b"living_room_panel:button_12",
+}
+
+_field_pattern = re.compile(FIELD_VALIDATION_PATTERN)
+
+
+def _legacy_validate_field(field: str, field_name: str) -> str:
+    """Per-field validation as done before the single-pass validator."""
+    field = field.strip()
+    if not field:
+        raise ValueError(f"{field_name} cannot be empty")
+    if len(field) > MAX_FIELD_LENGTH:
+        raise ValueError(
+            f"{field_name} exceeds maximum length "
+            f"({len(field)} > {MAX_FIELD_LENGTH}): {field[:20]}..."
+        )
+    if not _field_pattern.match(field):
+        raise ValueError(
+            f"{field_name} contains invalid characters "
+            f"(must match {FIELD_VALIDATION_PATTERN}): {field[:20]}..."
+        )
+    return field
+
+
+def legacy_validate(frame: bytes):
+    """Decode, split and validate each field, raising on failure."""
+    try:
+        payload = frame.decode("utf-8").strip()
+    except UnicodeDecodeError:
+        return None
+    parts = payload.split(":", maxsplit=EXPECTED_MESSAGE_PARTS - 1)
+    if len(parts) != EXPECTED_MESSAGE_PARTS:
+        return None
+    try:
+        return (
+            _legacy_validate_field(parts[0], "device_id"),
+            _legacy_validate_field(parts[1], "button_id"),
+            _legacy_validate_field(parts[2], "action"),
+        )
+    except ValueError:
+        return None
+
+
+def main() -> None:
+    """Time both validators on each sample frame."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=200000, help="iterations per sample")
+    args = parser.parse_args()
+
+    print(f"{'sample':<14}{'legacy ns':>12}{'single-pass ns':>16}{'speedup':>10}")
+    for name, frame in SAMPLES.items():
+        legacy_result = legacy_validate(frame)
+        code, fields, _ = validate_frame(frame)
+        assert (code is ValidationCode.OK) == (legacy_result is not None), name
+        assert code is not ValidationCode.OK or fields == legacy_result, name
+
+        legacy = min(timeit.repeat(
+            lambda: legacy_validate(frame), number=args.number, repeat=3
+        ))
+        fast = min(timeit.repeat(
+            lambda: validate_frame(frame), number=args.number, repeat=3
+        ))
+        print(
+            f"{name:<14}{legacy / args.number * 1e9:>12.0f}"
+            f"{fast / args.number * 1e9:>16.0f}{legacy / fast:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
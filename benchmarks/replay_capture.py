@@ -0,0 +1,415 @@
+"""Replay a traffic capture into the TCP ingest server.
+
+Feeds capture files recorded by the integration's **Traffic Capture Size**
+option into a TCPServer against the same stub ``hass`` as bench_server.py,
+from separate client processes, and reports the same throughput, latency,
+server CPU and RSS figures. Every captured connection is replayed on a
+connection of its own with the captured reads as writes, at the captured
+pace (``--speed 1``), N times faster (``--speed N``) or as fast as possible
+(``--speed 0``), so a production burst becomes a repeatable benchmark.
+
+Run from the repository root (Home Assistant must be importable, as for the
+integration itself):
+
+    python benchmarks/replay_capture.py /config/tcp_to_event_converter/capture_54321
+    python benchmarks/replay_capture.py capture/ --speed 10 --output baseline.json
+    python benchmarks/replay_capture.py capture/ --speed 0 --server-mode protocol \\
+        --compare baseline.json
+
+The transport and framing are those of the capture; all other server options
+are the defaults unless given with ``--options``. End-to-end latency is
+matched per device in send order, so it is only exact when no valid message
+is dropped, deduplicated or coalesced.
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+# Also puts the repository root on sys.path
+from bench_server import (
+    DRAIN_GRACE,
+    EVENT_TYPE,
+    StubHass,
+    _DatagramWriter,
+    _percentile,
+    _rss_bytes,
+    print_report,
+)
+
+from custom_components.tcp_to_event_converter.admission import raise_open_file_limit
+from custom_components.tcp_to_event_converter.capture import (
+    CAPTURE_SUFFIX,
+    RECORD_CLOSE,
+    RECORD_DATA,
+    read_capture,
+)
+from custom_components.tcp_to_event_converter.const import (
+    CONF_FRAMING,
+    CONF_MAX_CONNECTIONS,
+    CONF_SERVER_MODE,
+    CONF_SOCKET_PATH,
+    CONF_TRANSPORT,
+    DEFAULT_MAX_CONNECTIONS,
+    OPEN_FILE_HEADROOM,
+    SERVER_MODES,
+    TRANSPORT_UDP,
+    TRANSPORT_UNIX,
+)
+from custom_components.tcp_to_event_converter.frame_cache import build_cached_frame
+from custom_components.tcp_to_event_converter.framing import (
+    FramingError,
+    create_framer,
+    split_datagram,
+)
+from custom_components.tcp_to_event_converter.tcp_server import TCPServer
+from custom_components.tcp_to_event_converter.validator import ValidationCode
+
+# Result figures printed for a replay
+REPLAY_REPORT_KEYS: Tuple[str, ...] = (
+    "records", "connections", "duration",
+    "valid_sent", "events_fired", "throughput",
+    "latency_p50_ms", "latency_p99_ms", "latency_max_ms",
+    "server_cpu_seconds", "server_cpu_percent",
+    "rss_mb", "rss_growth_mb", "peak_rss_mb",
+)
+
+# (kind, seconds since the start of the replay, payload) of a replayed record
+Step = Tuple[int, float, bytes]
+
+
+class Replay(NamedTuple):
+    """Capture records grouped into the connections to replay."""
+
+    transport: str
+    framing: str
+    # Records of every connection, by replay connection id
+    connections: Dict[int, List[Step]]
+    records: int
+
+
+def capture_files(paths: List[str]) -> List[str]:
+    """Expand capture directories into their files, oldest first."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "*" + CAPTURE_SUFFIX))))
+        else:
+            files.append(path)
+    return files
+
+
+def load_replay(files: List[str], max_gap: float) -> Replay:
+    """Read capture files and group their records by connection.
+
+    Connection ids are only unique within one capture, so connections are
+    told apart by their capture's start time as well. A connection whose
+    opening was rotated out of the capture is opened at its first record.
+
+    Args:
+        files: Capture files, oldest first
+        max_gap: Longest silence kept between two records, in seconds
+            (0 = keep every gap)
+
+    Raises:
+        ValueError: If a file is not a capture file, or the files were
+            captured with different transports or framing modes
+    """
+    modes = set()
+    timeline: List[Tuple[float, Tuple[float, int], int, bytes]] = []
+    for path in files:
+        header, records = read_capture(path)
+        modes.add((header.transport, header.framing))
+        timeline.extend(
+            (header.started + record.time, (header.started, record.connection),
+             record.kind, record.payload)
+            for record in records
+        )
+    if len(modes) != 1:
+        raise ValueError(f"expected captures of one transport and framing, got {modes}")
+    transport, framing = modes.pop()
+    timeline.sort(key=lambda record: record[0])
+
+    ids: Dict[Tuple[float, int], int] = {}
+    connections: Dict[int, List[Step]] = {}
+    elapsed = 0.0
+    previous = timeline[0][0] if timeline else 0.0
+    for at, key, kind, payload in timeline:
+        gap = at - previous
+        elapsed += min(gap, max_gap) if max_gap else gap
+        previous = at
+        connection = ids.setdefault(key, len(ids))
+        connections.setdefault(connection, []).append((kind, elapsed, payload))
+    return Replay(transport, framing, connections, len(timeline))
+
+
+def expected_devices(replay: Replay, server: TCPServer) -> Dict[int, List[List[str]]]:
+    """Device id of every event each captured read should fire.
+
+    Frames the captured reads and validates the frames the way the server
+    will, so latency can be matched per device.
+
+    Returns:
+        For every connection, the device ids of the valid messages of each
+        of its data records, in order
+    """
+    plan: Dict[int, List[List[str]]] = {}
+    for connection, steps in replay.connections.items():
+        framer = create_framer(replay.framing)
+        devices: List[List[str]] = []
+        for kind, _, payload in steps:
+            if kind != RECORD_DATA:
+                continue
+            try:
+                if replay.transport == TRANSPORT_UDP:
+                    frames = split_datagram(payload, replay.framing)
+                else:
+                    frames = framer.feed(payload)
+            except FramingError:
+                frames = []  # The server drops the datagram or the connection
+            devices.append(_valid_devices(frames, server))
+        if devices and replay.transport != TRANSPORT_UDP:
+            # The server handles a final unterminated frame when the connection closes
+            devices[-1].extend(_valid_devices(framer.flush(), server))
+        plan[connection] = devices
+    return plan
+
+
+def _valid_devices(frames: List[bytes], server: TCPServer) -> List[str]:
+    """Device ids of the frames the server will accept, in order."""
+    devices = []
+    for frame in frames:
+        if not frame:
+            continue  # Heartbeat
+        code, fields, _ = server._validate(frame)
+        if code is ValidationCode.OK:
+            devices.append(build_cached_frame(fields).event_data["device_id"])
+    return devices
+
+
+async def _replay_connection(
+    steps: List[Step], args: argparse.Namespace, transport: str, start_at: float
+) -> List[float]:
+    """Replay the records of one connection.
+
+    Returns:
+        Send time (time.monotonic) of each data record that was written
+    """
+    sent: List[float] = []
+    speed = args.speed
+
+    async def wait_until(elapsed: float) -> None:
+        delay = start_at + (elapsed / speed if speed else 0.0) - time.monotonic()
+        await asyncio.sleep(max(0.0, delay))
+
+    await wait_until(steps[0][1])
+    try:
+        if transport == TRANSPORT_UDP:
+            writer = _DatagramWriter(
+                *await asyncio.get_running_loop().create_datagram_endpoint(
+                    asyncio.DatagramProtocol, remote_addr=(args.host, args.port)
+                )
+            )
+        elif transport == TRANSPORT_UNIX:
+            _, writer = await asyncio.open_unix_connection(args.socket_path)
+        else:
+            _, writer = await asyncio.open_connection(args.host, args.port)
+    except OSError:
+        return sent  # Refused, e.g. over the connection limit
+
+    try:
+        for kind, elapsed, payload in steps:
+            if kind == RECORD_CLOSE:
+                break
+            if kind != RECORD_DATA:
+                continue
+            await wait_until(elapsed)
+            writer.write(payload)
+            sent.append(time.monotonic())
+            await writer.drain()
+    except OSError:
+        pass  # Closed by the server, e.g. by the overload policy
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+    return sent
+
+
+def _client_process(
+    connections: Dict[int, List[Step]],
+    args: argparse.Namespace,
+    transport: str,
+    start_at: float,
+    results: "multiprocessing.Queue",
+) -> None:
+    """Replay a group of connections in a separate process."""
+    raise_open_file_limit(len(connections) + OPEN_FILE_HEADROOM)
+
+    async def main() -> Dict[int, List[float]]:
+        sent = await asyncio.gather(*(
+            _replay_connection(steps, args, transport, start_at)
+            for steps in connections.values()
+        ))
+        return dict(zip(connections, sent))
+
+    results.put(asyncio.run(main()))
+
+
+async def run_replay(args: argparse.Namespace, replay: Replay) -> Dict[str, Any]:
+    """Start the server, replay the capture into it and collect results."""
+    loop = asyncio.get_running_loop()
+    hass = StubHass(loop)
+    options = {
+        CONF_TRANSPORT: replay.transport,
+        CONF_SOCKET_PATH: args.socket_path,
+        CONF_SERVER_MODE: args.server_mode,
+        CONF_FRAMING: replay.framing,
+        # Captured connections are only refused if the options say so
+        CONF_MAX_CONNECTIONS: max(DEFAULT_MAX_CONNECTIONS, len(replay.connections)),
+    }
+    options.update(json.loads(args.options))
+    raise_open_file_limit(len(replay.connections) + OPEN_FILE_HEADROOM)
+    server = TCPServer(hass, args.port, EVENT_TYPE, options)
+    plan = expected_devices(replay, server)
+    await server.start()
+
+    rss_before = _rss_bytes()
+    results: "multiprocessing.Queue" = multiprocessing.Queue()
+    start_at = time.monotonic() + 0.5
+    processes = []
+    for index in range(args.client_procs):
+        connections = {
+            connection: steps
+            for connection, steps in replay.connections.items()
+            if connection % args.client_procs == index
+        }
+        if not connections:
+            continue
+        process = multiprocessing.Process(
+            target=_client_process,
+            args=(connections, args, replay.transport, start_at, results),
+        )
+        process.start()
+        processes.append(process)
+
+    usage_start = resource.getrusage(resource.RUSAGE_SELF)
+    sent: Dict[int, List[float]] = {}
+    for _ in processes:
+        sent.update(await loop.run_in_executor(None, results.get))
+    for process in processes:
+        await loop.run_in_executor(None, process.join)
+    await asyncio.sleep(DRAIN_GRACE)
+    usage_end = resource.getrusage(resource.RUSAGE_SELF)
+    rss_after = _rss_bytes()
+    await server.stop()
+
+    send_times: Dict[str, List[float]] = {}
+    for connection, times in sent.items():
+        for sent_at, devices in zip(times, plan[connection]):
+            for device in devices:
+                send_times.setdefault(device, []).append(sent_at)
+    latencies: List[float] = []
+    for device, times in send_times.items():
+        times.sort()
+        latencies.extend(
+            fired - sent_at
+            for sent_at, fired in zip(times, hass.bus.fired.get(device, []))
+        )
+    latencies.sort()
+
+    # Until the last write or, replaying faster than the server keeps up, the last event
+    finished_at = max(
+        [times[-1] for times in sent.values() if times]
+        + [times[-1] for times in hass.bus.fired.values() if times],
+        default=start_at,
+    )
+    duration = max(finished_at - start_at, 0.001)
+    cpu = (
+        usage_end.ru_utime - usage_start.ru_utime
+        + usage_end.ru_stime - usage_start.ru_stime
+    )
+    return {
+        "config": {
+            "files": args.files,
+            "speed": args.speed,
+            "max_gap": args.max_gap,
+            "options": options,
+        },
+        "records": replay.records,
+        "connections": len(replay.connections),
+        "duration": duration,
+        "valid_sent": sum(len(times) for times in send_times.values()),
+        "events_fired": hass.bus.count,
+        "throughput": hass.bus.count / duration,
+        "latency_p50_ms": _percentile(latencies, 0.5) * 1000,
+        "latency_p99_ms": _percentile(latencies, 0.99) * 1000,
+        "latency_max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+        "server_cpu_seconds": cpu,
+        "server_cpu_percent": cpu / (duration + DRAIN_GRACE) * 100,
+        "rss_mb": rss_after / 1e6,
+        "rss_growth_mb": (rss_after - rss_before) / 1e6,
+        "peak_rss_mb": usage_end.ru_maxrss / 1e3,
+        "server_metrics": server.metrics.as_dict(),
+        "drops": server.drop_counts,
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="capture files or capture directories")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="replay speed factor (0 = as fast as possible)")
+    parser.add_argument("--max-gap", type=float, default=0.0,
+                        help="shorten silences longer than this many seconds (0 = keep)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54399)
+    parser.add_argument("--client-procs", type=int, default=2, help="replay client processes")
+    parser.add_argument("--socket-path", default="/tmp/tcp_to_event_converter_bench.sock",
+                        help="socket file for the unix transport")
+    parser.add_argument("--server-mode", choices=SERVER_MODES, default=SERVER_MODES[0])
+    parser.add_argument("--options", default="{}", help="extra server options as JSON")
+    parser.add_argument("--log-level", default="ERROR", help="integration log level")
+    parser.add_argument("--output", help="write the full result to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    args = parser.parse_args(argv)
+    if args.speed < 0:
+        parser.error("--speed must not be negative")
+    args.files = capture_files(args.paths)
+    if not args.files:
+        parser.error("no capture files found")
+    return args
+
+
+def main() -> None:
+    """Replay a capture from the command line."""
+    args = parse_args()
+    logging.basicConfig(level=args.log_level.upper())
+    replay = load_replay(args.files, args.max_gap)
+    if not replay.connections:
+        raise SystemExit("the capture holds no records")
+    result = asyncio.run(run_replay(args, replay))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+    print_report(result, baseline, REPLAY_REPORT_KEYS)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(result, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,32 +2,72 @@
 import asyncio
 import logging
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
-from .const import DOMAIN, CONF_TCP_PORT, CONF_EVENT_TYPE
+from .const import DOMAIN, CONF_TCP_PORT, CONF_EVENT_TYPE, DATA_DISPATCHER, DATA_SERVERS
+from .dispatch import EventDispatcher
 from .tcp_server import TCPServer
 
 _LOGGER = logging.getLogger(__name__)
 
+PLATFORMS = [Platform.SENSOR]
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
-    """Set up TCP to Event Converter from a config entry."""
+    """Set up TCP to Event Converter from a config entry.
+
+    Every config entry runs its own listener; all listeners share a single
+    event dispatch queue stored alongside them in hass.data[DOMAIN].
+    """
     tcp_port = entry.data[CONF_TCP_PORT]
     event_type = entry.data[CONF_EVENT_TYPE]
 
-    server = TCPServer(hass, tcp_port, event_type)
-
+    domain_data = hass.data.setdefault(DOMAIN, {
+        DATA_SERVERS: {},
+        DATA_DISPATCHER: EventDispatcher(hass),
+    })
     try:
+        server = TCPServer(
+            hass, tcp_port, event_type, entry.options, domain_data[DATA_DISPATCHER]
+        )
         await server.start()
     except Exception as e:
         _LOGGER.error("Failed to setup TCP to Event Converter: %s", e)
+        if not domain_data[DATA_SERVERS]:
+            hass.data.pop(DOMAIN)
         return False
 
-    hass.data[DOMAIN] = server
+    domain_data[DATA_SERVERS][entry.entry_id] = server
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
     _LOGGER.info("TCP to Event Converter setup complete on port %d", tcp_port)
     return True
 
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply changed options to the running listener, reloading only if required.
+
+    Most options are applied live so that tuning a busy listener does not
+    drop its connections; the listener is only restarted for options that
+    change how it listens.
+    """
+    server = hass.data.get(DOMAIN, {}).get(DATA_SERVERS, {}).get(entry.entry_id)
+    if server is not None:
+        try:
+            if server.apply_options(entry.options):
+                _LOGGER.info(
+                    "Applied new options on port %d without restarting", server.tcp_port
+                )
+                return
+        except ValueError as e:
+            _LOGGER.error("Failed to apply new options: %s", e)
+    await hass.config_entries.async_reload(entry.entry_id)
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload the TCP to Event Converter integration."""
-    server = hass.data.pop(DOMAIN, None)
+    if not await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
+        return False
+
+    domain_data = hass.data.get(DOMAIN, {})
+    server = domain_data.get(DATA_SERVERS, {}).pop(entry.entry_id, None)
     if server:
         try:
             await server.stop()
@@ -35,5 +75,9 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
             _LOGGER.error("Error stopping TCP server during unload: %s", e)
             return False
 
+    if domain_data and not domain_data[DATA_SERVERS]:
+        # Last listener gone, its queued events have been fired: drop shared state
+        hass.data.pop(DOMAIN)
+
     _LOGGER.info("TCP to Event Converter unloaded successfully")
     return True
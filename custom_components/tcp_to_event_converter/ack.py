@@ -0,0 +1,193 @@
+"""Application-level acknowledgements for stream connections.
+
+In ack mode every frame has a sequence number and the server tells the
+sender which frames it accepted, so a sender can keep one persistent,
+pipelined connection and only resend what was refused or never acknowledged.
+
+Sequence numbers are either carried by the frame or assigned implicitly as
+the previous sequence number plus one (starting at 1 on every connection).
+Blank keep-alive frames without a sequence number are not numbered; the
+reply to them repeats the ACK of the last sequence number:
+
+* text framings: an optional decimal prefix followed by ``|``, e.g.
+  ``17|living_room:button_1:press``
+* binary framing: an optional ``!I`` after the 5 id bytes of the record
+  payload (payload length 9); payloads of any other length than 5 or 9 are
+  NACKed as a malformed sequence number
+
+After each read the server writes one reply covering every frame of that
+read: a NACK per refused frame followed by a cumulative ACK of the highest
+sequence number, meaning every frame up to it that was not NACKed has been
+accepted. Text framings reply with lines (``NACK <seq> <code>`` and
+``ACK <seq>``), binary framing with ``!BIB`` records (kind, sequence number,
+code). NACK codes are the ValidationCode values, plus NACK_OVERLOADED for
+frames dropped by the rate limit or because the event queue or spool was
+full, and NACK_BAD_SEQUENCE for a malformed sequence number prefix.
+"""
+
+import struct
+from typing import Callable, List, Optional, Tuple
+
+from .validator import ValidationCode
+
+# NACK codes beyond the validation codes
+NACK_OVERLOADED: int = 64  # Dropped by the overload policy or a full queue or spool
+NACK_BAD_SEQUENCE: int = 65  # Sequence number prefix is not a decimal number
+
+# Binary reply record: kind, sequence number, code (0 for ACK)
+ACK_RECORD = struct.Struct("!BIB")
+KIND_ACK: int = 1
+KIND_NACK: int = 2
+
+# Binary payload offset and format of the optional sequence number
+_BINARY_SEQUENCE = struct.Struct("!I")
+_BINARY_SEQUENCE_OFFSET = 5
+_BINARY_SEQUENCED_SIZE = _BINARY_SEQUENCE_OFFSET + _BINARY_SEQUENCE.size
+_MAX_SEQUENCE = 0xFFFFFFFF
+_SEPARATOR = b"|"
+_OK = ValidationCode.OK
+
+# Same signature as TCPServer._handle_frame
+HandleFrameFn = Callable[[bytes, tuple, float], int]
+# Same signature as TCPServer._record_bad_sequence
+BadSequenceFn = Callable[[bytes, tuple], None]
+
+
+class AckTracker:
+    """Assigns sequence numbers and collects the reply for one connection."""
+
+    __slots__ = (
+        "_handle_frame", "_bad_sequence", "_binary", "_last_seq", "_acked", "_nacks"
+    )
+
+    def __init__(
+        self, handle_frame: HandleFrameFn, bad_sequence: BadSequenceFn, binary: bool
+    ) -> None:
+        """Initialize the tracker.
+
+        Args:
+            handle_frame: Function handling a frame and returning its
+                validation result
+            bad_sequence: Function recording a frame with a malformed
+                sequence number prefix, which is not handled
+            binary: Whether the connection uses binary framing
+        """
+        self._handle_frame = handle_frame
+        self._bad_sequence = bad_sequence
+        self._binary = binary
+        self._last_seq = 0
+        self._acked = False
+        self._nacks: List[Tuple[int, int]] = []
+
+    def handle(self, frame: bytes, addr: tuple, received_at: float) -> int:
+        """Handle a frame and record its acknowledgement.
+
+        Has the same signature as the frame handler it wraps, so it can be
+        used in its place.
+
+        Args:
+            frame: One complete frame, possibly with a sequence number
+            addr: Client address for logging
+            received_at: Loop time at which the frame was read
+
+        Returns:
+            The validation result or NACK code
+        """
+        if self._is_blank(frame):
+            self._acked = True
+            return self._handle_frame(frame, addr, received_at)
+        payload = self._next(frame)
+        if payload is None:
+            self._bad_sequence(frame, addr)
+            self._nacks.append((self._last_seq, NACK_BAD_SEQUENCE))
+            return ValidationCode.WRONG_PART_COUNT
+        frame = payload
+        code = self._handle_frame(frame, addr, received_at)
+        if code is not _OK:
+            self._nacks.append((self._last_seq, code))
+        return code
+
+    def reject(self, frame: bytes, code: int) -> None:
+        """Record a NACK for a frame refused before it was handled.
+
+        Args:
+            frame: The refused frame
+            code: NACK code
+        """
+        if self._is_blank(frame):
+            return
+        self._next(frame)
+        self._nacks.append((self._last_seq, code))
+
+    def reply(self) -> bytes:
+        """Build the reply for the frames seen since the last reply.
+
+        Returns:
+            The encoded reply, empty if no frames were seen
+        """
+        if not self._acked:
+            return b""
+        self._acked = False
+        nacks = self._nacks
+        if self._binary:
+            pack = ACK_RECORD.pack
+            parts = [pack(KIND_NACK, seq, code) for seq, code in nacks]
+            parts.append(pack(KIND_ACK, self._last_seq, 0))
+        else:
+            parts = [b"NACK %d %d\n" % (seq, code) for seq, code in nacks]
+            parts.append(b"ACK %d\n" % self._last_seq)
+        nacks.clear()
+        return b"".join(parts)
+
+    def _is_blank(self, frame: bytes) -> bool:
+        """Return whether a frame is a keep-alive without a sequence number."""
+        if self._binary:
+            return not frame
+        return not frame.strip()
+
+    def _next(self, frame: bytes) -> Optional[bytes]:
+        """Advance the sequence number and strip it from a frame.
+
+        Returns:
+            The frame without its sequence number, or None if the sequence
+            number is malformed
+        """
+        self._acked = True
+        seq = self._last_seq + 1 if self._last_seq < _MAX_SEQUENCE else 0
+        if self._binary:
+            size = len(frame)
+            if size == _BINARY_SEQUENCED_SIZE:
+                seq = _BINARY_SEQUENCE.unpack_from(frame, _BINARY_SEQUENCE_OFFSET)[0]
+                frame = frame[:_BINARY_SEQUENCE_OFFSET]
+            elif size != _BINARY_SEQUENCE_OFFSET:
+                self._last_seq = seq
+                return None
+            self._last_seq = seq
+            return frame
+
+        separator = frame.find(_SEPARATOR)
+        if separator >= 0:
+            prefix = frame[:separator].strip()
+            if not prefix.isdigit() or int(prefix) > _MAX_SEQUENCE:
+                self._last_seq = seq
+                return None
+            seq = int(prefix)
+            frame = frame[separator + 1:]
+        self._last_seq = seq
+        return frame
+
+
+def create_ack_tracker(
+    enabled: bool,
+    handle_frame: HandleFrameFn,
+    bad_sequence: BadSequenceFn,
+    binary: bool,
+) -> Optional[AckTracker]:
+    """Create the acknowledgement tracker for a new connection.
+
+    Returns:
+        An AckTracker, or None if ack mode is disabled
+    """
+    if not enabled:
+        return None
+    return AckTracker(handle_frame, bad_sequence, binary)
@@ -0,0 +1,529 @@
+"""Connection admission control for the TCP listener.
+
+``asyncio.start_server`` accepts every connection and creates its protocol
+(and, in stream mode, a task) before the server can look at it, so a reconnect
+storm over the connection limit churns through tasks and sockets only to
+close them again. The Listener instead owns the listening socket and its
+accept loop:
+
+* connections are checked by an AdmissionController right after ``accept``,
+  against the connection limit, an accept rate and a per source address
+  limit; rejected connections are reset without creating a protocol or task
+* at capacity, or over the accept rate, accepting can be paused by removing
+  the listening socket from the event loop. New connections then wait in the
+  kernel's listen backlog (and beyond it, clients retry their SYNs) instead
+  of being accepted and closed; accepting resumes as soon as there is room
+* with an SSL context, admitted connections are wrapped in TLS. At most
+  ``max_handshakes`` handshakes are in progress at a time; beyond that
+  accepting pauses until one finishes, so a reconnect storm cannot fill the
+  event loop with handshakes
+"""
+
+import asyncio
+import errno
+import logging
+import socket
+import ssl
+import struct
+from typing import Any, Callable, Dict, Optional, Set
+
+from .const import ACCEPT_BATCH, ACCEPT_ERROR_DELAY, TLS_HANDSHAKE_TIMEOUT
+from .metrics import HandshakeMetrics
+from .rate_limit import TokenBucket, create_bucket
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+_LOGGER = logging.getLogger(__name__)
+
+# Rejection reasons reported by AdmissionController.admit
+REJECT_CAPACITY: str = "capacity"
+REJECT_ACCEPT_RATE: str = "accept_rate"
+REJECT_PER_SOURCE: str = "per_source"
+
+# SO_LINGER with a zero timeout: close with RST and leave no TIME_WAIT behind
+_LINGER_RESET = struct.pack("ii", 1, 0)
+# accept() errors caused by running out of resources rather than by the client
+_RESOURCE_ERRNOS = (errno.EMFILE, errno.ENFILE, errno.ENOBUFS, errno.ENOMEM)
+
+
+class AdmissionController:
+    """Tracks admitted connections and decides whether to admit new ones."""
+
+    __slots__ = (
+        "max_connections",
+        "max_per_source",
+        "_bucket",
+        "_sources",
+        "active",
+        "rejected",
+    )
+
+    def __init__(
+        self,
+        max_connections: int,
+        max_per_source: int,
+        accept_rate: int,
+        now: float,
+    ) -> None:
+        """Initialize the controller.
+
+        Args:
+            max_connections: Maximum concurrent connections
+            max_per_source: Maximum concurrent connections per source
+                address (0 = unlimited)
+            accept_rate: Maximum new connections per second (0 = unlimited)
+            now: Current loop time
+        """
+        self.max_connections = max_connections
+        self.max_per_source = max_per_source
+        self._bucket: Optional[TokenBucket] = create_bucket(accept_rate, now)
+        self._sources: Dict[str, int] = {}
+        self.active: int = 0
+        self.rejected: Dict[str, int] = {
+            REJECT_CAPACITY: 0,
+            REJECT_ACCEPT_RATE: 0,
+            REJECT_PER_SOURCE: 0,
+        }
+
+    def configure(
+        self, max_connections: int, max_per_source: int, accept_rate: int, now: float
+    ) -> None:
+        """Change the connection limits and the accept rate.
+
+        Args:
+            max_connections: Maximum concurrent connections; connections over
+                a lowered limit stay open
+            max_per_source: Maximum concurrent connections per source
+                address (0 = unlimited)
+            accept_rate: Maximum new connections per second (0 = unlimited)
+            now: Current loop time
+        """
+        self.max_connections = max_connections
+        self.max_per_source = max_per_source
+        bucket = self._bucket
+        if bucket is None or bucket.rate != accept_rate:
+            self._bucket = create_bucket(accept_rate, now)
+
+    @property
+    def at_capacity(self) -> bool:
+        """Whether the connection limit has been reached."""
+        return self.active >= self.max_connections
+
+    def time_until_accept(self, now: float) -> float:
+        """Seconds until the accept rate admits another connection."""
+        if self._bucket is None:
+            return 0.0
+        return self._bucket.time_until_available(now)
+
+    def admit(self, source: str, now: float) -> Optional[str]:
+        """Admit a new connection from a source address.
+
+        Args:
+            source: Source address of the connection
+            now: Current loop time
+
+        Returns:
+            None if the connection was admitted, otherwise the rejection reason
+        """
+        if self.active >= self.max_connections:
+            reason = REJECT_CAPACITY
+        elif self.max_per_source and self._sources.get(source, 0) >= self.max_per_source:
+            reason = REJECT_PER_SOURCE
+        elif self._bucket is not None and not self._bucket.try_consume(now):
+            reason = REJECT_ACCEPT_RATE
+        else:
+            self.active += 1
+            self._sources[source] = self._sources.get(source, 0) + 1
+            return None
+        self.rejected[reason] += 1
+        return reason
+
+    def release(self, source: str) -> None:
+        """Release an admitted connection.
+
+        Args:
+            source: Source address the connection was admitted for
+        """
+        self.active -= 1
+        count = self._sources.get(source, 0) - 1
+        if count > 0:
+            self._sources[source] = count
+        else:
+            self._sources.pop(source, None)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Counters for diagnostics."""
+        return {
+            "active": self.active,
+            "sources": len(self._sources),
+            "max_connections": self.max_connections,
+            "max_per_source": self.max_per_source,
+            "rejected": dict(self.rejected),
+        }
+
+
+class Listener:
+    """Listening socket with an admission-controlled accept loop."""
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        sock: socket.socket,
+        protocol_factory: Callable[[], asyncio.BaseProtocol],
+        admission: AdmissionController,
+        pause_when_limited: bool,
+        on_reject: Callable[[str, Any], None],
+        ssl_context: Optional[ssl.SSLContext] = None,
+        max_handshakes: int = 0,
+        handshake_metrics: Optional[HandshakeMetrics] = None,
+    ) -> None:
+        """Initialize the listener; call ``start`` to begin accepting.
+
+        Args:
+            loop: Event loop
+            sock: Bound, listening socket
+            protocol_factory: Factory of the protocol for admitted connections
+            admission: Admission controller; connections it admits must be
+                released with ``release`` when they close
+            pause_when_limited: Stop accepting while at capacity or over the
+                accept rate instead of accepting and rejecting connections
+            on_reject: Called with the reason and peer address of every
+                rejected connection
+            ssl_context: Server context to wrap connections in TLS with
+            max_handshakes: Maximum TLS handshakes in progress (0 = unlimited)
+            handshake_metrics: Records completed and failed TLS handshakes
+        """
+        self._loop = loop
+        self._sock = sock
+        self._protocol_factory = protocol_factory
+        self.admission = admission
+        self.pause_when_limited = pause_when_limited
+        self._on_reject = on_reject
+        self._ssl_context = ssl_context
+        self.max_handshakes = max_handshakes
+        self.handshake_metrics = handshake_metrics
+        self._accepting = False
+        self._closed = False
+        self._resume_handle: Optional[asyncio.TimerHandle] = None
+        self._setups: Set[asyncio.Task] = set()
+        self.pauses: int = 0
+
+    @property
+    def sockets(self) -> tuple:
+        """The listening socket, like ``asyncio.Server.sockets``."""
+        return () if self._closed else (self._sock,)
+
+    @property
+    def paused(self) -> bool:
+        """Whether accepting is currently paused."""
+        return not self._accepting and not self._closed
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Counters for diagnostics."""
+        stats = {
+            **self.admission.stats,
+            "paused": self.paused,
+            "pauses": self.pauses,
+        }
+        if self._ssl_context is not None:
+            stats["handshakes_in_progress"] = len(self._setups)
+        return stats
+
+    def start(self) -> None:
+        """Start accepting connections."""
+        self.resume()
+
+    def configure(
+        self, backlog: int, pause_when_limited: bool, max_handshakes: int
+    ) -> None:
+        """Change the listen backlog and pause behaviour while listening.
+
+        Args:
+            backlog: Listen backlog; applied by calling listen() again on
+                the listening socket
+            pause_when_limited: Stop accepting while at capacity or over
+                the accept rate
+            max_handshakes: Maximum TLS handshakes in progress (0 = unlimited)
+        """
+        if self._closed:
+            return
+        self._sock.listen(backlog)
+        self.pause_when_limited = pause_when_limited
+        self.max_handshakes = max_handshakes
+        # Re-evaluate a pause under the old settings on the next accept
+        self.resume()
+
+    def pause(self, duration: Optional[float] = None) -> None:
+        """Stop accepting without closing the listening socket.
+
+        Args:
+            duration: Resume automatically after this many seconds; without
+                it accepting resumes on ``resume`` or ``release``
+        """
+        if self._accepting:
+            self._loop.remove_reader(self._sock.fileno())
+            self._accepting = False
+            self.pauses += 1
+        if duration is not None and self._resume_handle is None:
+            self._resume_handle = self._loop.call_later(duration, self._resume_later)
+
+    def resume(self) -> None:
+        """Resume accepting connections."""
+        if self._accepting or self._closed:
+            return
+        if self._resume_handle is not None:
+            self._resume_handle.cancel()
+            self._resume_handle = None
+        self._loop.add_reader(self._sock.fileno(), self._on_readable)
+        self._accepting = True
+
+    def release(self, peer: Any) -> None:
+        """Release a closed connection admitted by this listener.
+
+        Args:
+            peer: Peer address of the connection
+        """
+        self.admission.release(_source(peer))
+        if not self._accepting and self._resume_handle is None:
+            self.resume()
+
+    def close(self) -> None:
+        """Stop accepting, close the listening socket and abort pending setups."""
+        if self._closed:
+            return
+        self.pause()
+        self._closed = True
+        if self._resume_handle is not None:
+            self._resume_handle.cancel()
+            self._resume_handle = None
+        self._sock.close()
+        for task in self._setups:
+            task.cancel()
+
+    def detach(self) -> socket.socket:
+        """Stop accepting and hand over the listening socket without closing it.
+
+        Connections still being set up are left to finish; ``wait_closed``
+        waits for them.
+
+        Returns:
+            The listening socket, still bound and listening
+        """
+        self.pause()
+        self._closed = True
+        if self._resume_handle is not None:
+            self._resume_handle.cancel()
+            self._resume_handle = None
+        return self._sock
+
+    async def wait_closed(self) -> None:
+        """Wait for connection setups still running after ``close`` or ``detach``."""
+        if self._setups:
+            await asyncio.gather(*self._setups, return_exceptions=True)
+
+    def _resume_later(self) -> None:
+        """Resume after a timed pause unless still at capacity."""
+        self._resume_handle = None
+        if not (self.pause_when_limited and self.admission.at_capacity):
+            self.resume()
+
+    def _on_readable(self) -> None:
+        """Accept and admit pending connections."""
+        sock = self._sock
+        admission = self.admission
+        loop = self._loop
+        for _ in range(ACCEPT_BATCH):
+            if self.pause_when_limited and self._limited(loop.time()):
+                return
+            if self._handshakes_limited():
+                return
+            try:
+                conn, peer = sock.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                if e.errno in _RESOURCE_ERRNOS:
+                    # Like asyncio: back off instead of spinning on the error
+                    _LOGGER.error(
+                        "Error accepting connection on %s: %s, pausing for %s seconds",
+                        sock.getsockname(), e, ACCEPT_ERROR_DELAY
+                    )
+                    self.pause(ACCEPT_ERROR_DELAY)
+                    return
+                continue
+
+            reason = admission.admit(_source(peer), loop.time())
+            if reason is not None:
+                _reset(conn)
+                self._on_reject(reason, peer)
+                continue
+
+            conn.setblocking(False)
+            task = loop.create_task(self._connect(conn, peer))
+            self._setups.add(task)
+            task.add_done_callback(self._setup_done)
+
+    def _limited(self, now: float) -> bool:
+        """Pause if at capacity or over the accept rate.
+
+        Returns:
+            True if accepting was paused
+        """
+        admission = self.admission
+        if admission.at_capacity:
+            self.pause()
+            return True
+        wait = admission.time_until_accept(now)
+        if wait > 0:
+            self.pause(wait)
+            return True
+        return False
+
+    def _handshakes_limited(self) -> bool:
+        """Pause while the maximum number of TLS handshakes is in progress.
+
+        Returns:
+            True if accepting was paused
+        """
+        if (
+            self._ssl_context is None
+            or not self.max_handshakes
+            or len(self._setups) < self.max_handshakes
+        ):
+            return False
+        self.pause()
+        return True
+
+    def _setup_done(self, task: asyncio.Task) -> None:
+        """Forget a finished connection setup and resume after a handshake pause."""
+        self._setups.discard(task)
+        if (
+            self._ssl_context is not None
+            and not self._accepting
+            and self._resume_handle is None
+            and not (self.pause_when_limited and self.admission.at_capacity)
+        ):
+            self.resume()
+
+    async def _connect(self, conn: socket.socket, peer: Any) -> None:
+        """Create the transport and protocol of an admitted connection.
+
+        With TLS this includes the handshake; the protocol only sees the
+        connection once the handshake succeeded.
+        """
+        loop = self._loop
+        ssl_context = self._ssl_context
+        created = False
+
+        def protocol_factory() -> asyncio.BaseProtocol:
+            nonlocal created
+            created = True
+            return self._protocol_factory()
+
+        started = loop.time()
+        try:
+            transport, _ = await loop.connect_accepted_socket(
+                protocol_factory,
+                conn,
+                ssl=ssl_context,
+                ssl_handshake_timeout=(
+                    TLS_HANDSHAKE_TIMEOUT if ssl_context is not None else None
+                ),
+            )
+        except BaseException as e:
+            conn.close()
+            if not created or ssl_context is not None:
+                # Otherwise the protocol releases the connection when it is lost
+                self.release(peer)
+            if isinstance(e, asyncio.CancelledError):
+                return
+            if ssl_context is None:
+                _LOGGER.warning("Error setting up connection from %s: %s", peer, e)
+                return
+            if self.handshake_metrics is not None:
+                self.handshake_metrics.failed += 1
+            _LOGGER.debug("TLS handshake with %s failed: %s", peer, e)
+            return
+
+        if ssl_context is not None and self.handshake_metrics is not None:
+            ssl_object = transport.get_extra_info("ssl_object")
+            self.handshake_metrics.record(
+                loop.time() - started,
+                ssl_object is not None and ssl_object.session_reused,
+            )
+
+
+def create_listen_socket(host: str, port: int, backlog: int) -> socket.socket:
+    """Create a non-blocking listening TCP socket.
+
+    Raises:
+        OSError: If the address cannot be bound
+    """
+    sock = socket.create_server((host, port), backlog=backlog)
+    sock.setblocking(False)
+    return sock
+
+
+def open_file_limit() -> Optional[int]:
+    """Return the soft limit on open files of this process.
+
+    Returns:
+        The soft limit, or None if it is unlimited or cannot be read
+    """
+    if resource is None:
+        return None
+    soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft == resource.RLIM_INFINITY:
+        return None
+    return soft
+
+
+def raise_open_file_limit(needed: int) -> int:
+    """Raise the soft limit on open files towards ``needed`` if it is lower.
+
+    Every connection holds a file descriptor, so a connection limit in the
+    thousands needs more than the usual soft limit of 1024. The soft limit
+    can be raised up to the hard limit without privileges. Only meant for
+    processes of our own (ingest workers, benchmarks), never for the Home
+    Assistant process.
+
+    Args:
+        needed: File descriptors the process needs
+
+    Returns:
+        The soft limit in effect afterwards
+    """
+    if resource is None:
+        return needed
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft == resource.RLIM_INFINITY or soft >= needed:
+        return needed
+    target = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+    if target <= soft:
+        return soft
+    try:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+    except (OSError, ValueError) as e:
+        _LOGGER.debug("Could not raise the open file limit to %d: %s", target, e)
+        return soft
+    _LOGGER.debug("Raised the open file limit from %d to %d", soft, target)
+    return target
+
+
+def _source(peer: Any) -> str:
+    """Source address of a peer address tuple."""
+    return peer[0] if isinstance(peer, tuple) else str(peer)
+
+
+def _reset(conn: socket.socket) -> None:
+    """Close a rejected connection with a reset."""
+    try:
+        conn.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, _LINGER_RESET)
+    except OSError:
+        pass
+    conn.close()
@@ -0,0 +1,175 @@
+"""Compact binary wire protocol.
+
+With binary framing every message is a record of a 1-byte payload length
+followed by the payload, whose first five bytes are big-endian integer ids:
+
+    !B  payload length (5 for current senders)
+    !H  device id
+    !H  button id
+    !B  action id
+
+Additional payload bytes are ignored so the record can be extended. The ids
+are resolved to names through a BinaryRegistry loaded from the integration
+options; names are validated once when the registry is loaded, so resolving
+a record needs no decoding or per-field validation. The registry is also
+announced to stream clients when they connect so senders can learn the ids.
+"""
+
+import json
+import struct
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from .validator import Fields, ValidationCode, validate_field
+
+# Payload of a binary record: device id, button id, action id
+BINARY_EVENT = struct.Struct("!HHB")
+_unpack_event = BINARY_EVENT.unpack_from
+_OK = ValidationCode.OK
+# Length prefix of the registry announcement (unsigned 32-bit, big-endian)
+ANNOUNCEMENT_PREFIX = struct.Struct("!I")
+
+# Registry sections with the largest id each accepts
+_SECTIONS: Tuple[Tuple[str, int], ...] = (
+    ("devices", 0xFFFF),
+    ("buttons", 0xFFFF),
+    ("actions", 0xFF),
+)
+
+
+def encode_binary_event(device: int, button: int, action: int) -> bytes:
+    """Encode one binary record, e.g. for tests and benchmarks.
+
+    Args:
+        device: Device id
+        button: Button id
+        action: Action id
+
+    Returns:
+        The record including its length byte
+    """
+    return bytes((BINARY_EVENT.size,)) + BINARY_EVENT.pack(device, button, action)
+
+
+class BinaryRegistry:
+    """Maps the integer ids of binary records to device, button and action names."""
+
+    __slots__ = ("devices", "buttons", "actions")
+
+    def __init__(
+        self,
+        devices: Mapping[int, str],
+        buttons: Mapping[int, str],
+        actions: Mapping[int, str],
+    ) -> None:
+        """Initialize the registry.
+
+        Args:
+            devices: Device names by id
+            buttons: Button names by id
+            actions: Action names by id
+        """
+        self.devices: Dict[int, str] = dict(devices)
+        self.buttons: Dict[int, str] = dict(buttons)
+        self.actions: Dict[int, str] = dict(actions)
+
+    @classmethod
+    def from_json(cls, text: str) -> "BinaryRegistry":
+        """Load a registry from its JSON configuration.
+
+        Each of ``devices``, ``buttons`` and ``actions`` is either an object
+        mapping ids to names or a list whose indexes are the ids, e.g.
+        ``{"devices": {"1": "hall"}, "buttons": ["b0", "b1"],
+        "actions": ["press", "release"]}``.
+
+        Args:
+            text: JSON text; empty text gives an empty registry
+
+        Returns:
+            The loaded registry
+
+        Raises:
+            ValueError: If the JSON is malformed or contains invalid ids or names
+        """
+        if not text.strip():
+            return cls({}, {}, {})
+        try:
+            config = json.loads(text)
+        except ValueError as e:
+            raise ValueError(f"registry is not valid JSON: {e}") from None
+        if not isinstance(config, dict):
+            raise ValueError("registry must be a JSON object")
+
+        sections = [_load_section(config, name, max_id) for name, max_id in _SECTIONS]
+        return cls(*sections)
+
+    def resolve(self, payload: bytes) -> Tuple[ValidationCode, Optional[Fields], Optional[str]]:
+        """Resolve a record payload to its names.
+
+        Returns the same (code, fields, detail) tuple as validate_frame so a
+        binary record goes through the same caching and logging path as a
+        text frame.
+
+        Args:
+            payload: Record payload without the length byte
+
+        Returns:
+            Tuple of (code, fields, detail)
+        """
+        try:
+            device_id, button_id, action_id = _unpack_event(payload)
+        except struct.error:
+            return ValidationCode.SHORT_RECORD, None, str(len(payload))
+
+        device = self.devices.get(device_id)
+        button = self.buttons.get(button_id)
+        action = self.actions.get(action_id)
+        if device is not None and button is not None and action is not None:
+            return _OK, (device, button, action), None
+
+        if device is None:
+            return ValidationCode.UNKNOWN_ID, None, f"device id {device_id}"
+        if button is None:
+            return ValidationCode.UNKNOWN_ID, None, f"button id {button_id}"
+        return ValidationCode.UNKNOWN_ID, None, f"action id {action_id}"
+
+    def as_dict(self) -> Dict[str, Dict[str, str]]:
+        """Return the registry in its JSON configuration form."""
+        return {
+            name: {str(key): value for key, value in sorted(getattr(self, name).items())}
+            for name, _ in _SECTIONS
+        }
+
+    def announcement(self) -> bytes:
+        """Build the registry announcement sent to stream clients on connect.
+
+        Returns:
+            The JSON registry prefixed with its 4-byte big-endian length
+        """
+        body = json.dumps(self.as_dict(), separators=(",", ":")).encode("ascii")
+        return ANNOUNCEMENT_PREFIX.pack(len(body)) + body
+
+
+def _load_section(config: Mapping[str, Any], name: str, max_id: int) -> Dict[int, str]:
+    """Load and validate one section of a registry configuration.
+
+    Raises:
+        ValueError: If an id or name is invalid
+    """
+    section = config.get(name, {})
+    if isinstance(section, list):
+        section = dict(enumerate(section))
+    elif not isinstance(section, dict):
+        raise ValueError(f"{name} must be a list or an object")
+
+    result: Dict[int, str] = {}
+    for key, value in section.items():
+        try:
+            item_id = int(key)
+        except ValueError:
+            raise ValueError(f"{name}: id {key!r} is not an integer") from None
+        if not 0 <= item_id <= max_id:
+            raise ValueError(f"{name}: id {item_id} is out of range 0-{max_id}")
+        if not isinstance(value, str) or validate_field(value) is not ValidationCode.OK:
+            raise ValueError(f"{name}: invalid name {value!r} for id {item_id}")
+        result[item_id] = value
+    return result
@@ -0,0 +1,357 @@
+"""Capture of received traffic for offline replay.
+
+With capture enabled the server records everything it reads, exactly as it
+was read (or every datagram), with its arrival time and the id of its
+connection, plus when each connection was opened and closed. A capture of a
+production burst can then be fed back into a TCPServer offline, with the
+same segmentation and timing, by benchmarks/replay_capture.py.
+
+Recording must not slow the ingest path down: records are appended to an
+in-memory buffer, which is written out from an executor in chunks, one write
+at a time. If the disk falls behind by CAPTURE_BUFFER_LIMIT bytes, further
+records are dropped and counted until it catches up. The capture rotates
+through CAPTURE_FILES files that together hold about the configured size;
+the oldest file is deleted when a new one is started.
+
+File layout:
+
+    header:  !4sHd16s16s  magic, version, capture start (Unix time),
+                          transport, framing
+    record:  !BIdI        kind, connection id, seconds since the capture
+                          start, payload length, followed by the payload
+
+Every file starts with a header, so each one can be replayed on its own.
+Connection ids are only unique within one capture (one server run).
+"""
+
+import asyncio
+import contextlib
+import logging
+import os
+import struct
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from homeassistant.core import HomeAssistant
+
+from .const import (
+    CAPTURE_BUFFER_LIMIT,
+    CAPTURE_FILES,
+    CAPTURE_FLUSH_INTERVAL,
+    CAPTURE_FLUSH_SIZE,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+FILE_HEADER = struct.Struct("!4sHd16s16s")
+FILE_MAGIC = b"TECA"
+FILE_VERSION = 1
+RECORD_HEADER = struct.Struct("!BIdI")
+CAPTURE_SUFFIX = ".cap"
+
+# Record kinds
+RECORD_OPEN = 1  # Connection opened; the payload is the peer address as text
+RECORD_DATA = 2  # Bytes as read from the connection, or one datagram
+RECORD_CLOSE = 3  # Connection closed
+# Connection id of every datagram received by the udp transport
+DATAGRAM_CONNECTION = 0
+
+
+class CaptureHeader(NamedTuple):
+    """Header of a capture file."""
+
+    started: float  # Unix time at which the capture started
+    transport: str
+    framing: str
+
+
+class CaptureRecord(NamedTuple):
+    """One record read from a capture file."""
+
+    kind: int
+    connection: int
+    time: float  # Seconds since the capture started
+    payload: bytes
+
+
+class _CaptureFiles:
+    """Rotating capture files of one capture; every method blocks."""
+
+    def __init__(
+        self, directory: str, file_size: int, max_files: int, header: bytes
+    ) -> None:
+        """Initialize the files; the first one is created on the first write.
+
+        Args:
+            directory: Capture directory
+            file_size: Size after which the next file is started
+            max_files: Number of files kept, including the current one
+            header: File header written at the start of every file
+        """
+        self.directory = directory
+        self.file_size = file_size
+        self.max_files = max_files
+        self._header = header
+        self._file: Optional[Any] = None
+        self._size = 0
+        # Files kept, oldest first; None until the directory has been listed
+        self._paths: Optional[List[str]] = None
+        self._next_index = 0
+        self.bytes_written: int = 0
+
+    @property
+    def count(self) -> int:
+        """Number of capture files on disk."""
+        return len(self._paths) if self._paths is not None else 0
+
+    def write(self, chunk: bytes) -> None:
+        """Append whole records, starting a new file if the current one is full.
+
+        Raises:
+            OSError: If a file cannot be created or written
+        """
+        if self._file is None or self._size >= self.file_size:
+            self._rotate()
+        self._file.write(chunk)
+        self._file.flush()
+        self._size += len(chunk)
+        self.bytes_written += len(chunk)
+
+    def close(self, chunk: bytes) -> None:
+        """Append the last records and close the current file.
+
+        Raises:
+            OSError: If the records cannot be written
+        """
+        try:
+            if chunk:
+                self.write(chunk)
+        finally:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _rotate(self) -> None:
+        """Start the next file and delete the oldest ones beyond max_files."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._paths is None:
+            # Number files after those of earlier captures, which share the budget
+            os.makedirs(self.directory, exist_ok=True)
+            indexes = sorted(
+                int(name[:-len(CAPTURE_SUFFIX)])
+                for name in os.listdir(self.directory)
+                if name.endswith(CAPTURE_SUFFIX) and name[:-len(CAPTURE_SUFFIX)].isdigit()
+            )
+            self._paths = [self._path(index) for index in indexes]
+            self._next_index = indexes[-1] + 1 if indexes else 0
+        path = self._path(self._next_index)
+        self._next_index += 1
+        self._file = open(path, "wb")
+        self._file.write(self._header)
+        self._size = len(self._header)
+        self._paths.append(path)
+        while len(self._paths) > self.max_files:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self._paths.pop(0))
+
+    def _path(self, index: int) -> str:
+        """Path of the capture file with an index."""
+        return os.path.join(self.directory, f"{index:010d}{CAPTURE_SUFFIX}")
+
+
+class Capture:
+    """Recorder of the traffic received by one server.
+
+    Recording only appends to a buffer on the event loop; ``close`` is the
+    only coroutine and writes out what is still buffered.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        directory: str,
+        max_bytes: int,
+        transport: str,
+        framing: str,
+    ) -> None:
+        """Initialize the capture; no file is created before traffic arrives.
+
+        Args:
+            hass: Home Assistant instance
+            directory: Capture directory
+            max_bytes: Approximate total size of the capture files
+            transport: Transport of the server, recorded in the file header
+            framing: Framing mode of the server, recorded in the file header
+        """
+        self._hass = hass
+        self._loop = hass.loop
+        self._start = hass.loop.time()
+        header = FILE_HEADER.pack(
+            FILE_MAGIC,
+            FILE_VERSION,
+            time.time(),
+            transport.encode("ascii"),
+            framing.encode("ascii"),
+        )
+        self._files = _CaptureFiles(
+            directory,
+            max(max_bytes // CAPTURE_FILES, CAPTURE_FLUSH_SIZE),
+            CAPTURE_FILES,
+            header,
+        )
+        self._buffer = bytearray()
+        self._write: Optional[asyncio.Future] = None
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._closed = False
+        self.records: int = 0
+        self.dropped: int = 0
+        self.write_errors: int = 0
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Counters for diagnostics."""
+        return {
+            "records": self.records,
+            "dropped": self.dropped,
+            "write_errors": self.write_errors,
+            "buffered_bytes": len(self._buffer),
+            "bytes_written": self._files.bytes_written,
+            "files": self._files.count,
+        }
+
+    def opened(self, connection: int, peer: Any, at: float) -> None:
+        """Record a new connection.
+
+        Args:
+            connection: Connection id, unique within this capture
+            peer: Peer address, recorded as text
+            at: Loop time at which the connection was set up
+        """
+        self._append(RECORD_OPEN, connection, at, str(peer).encode("utf-8"))
+
+    def data(self, connection: int, at: float, data: Any) -> None:
+        """Record bytes read from a connection, or a datagram.
+
+        Args:
+            connection: Connection id, DATAGRAM_CONNECTION for datagrams
+            at: Loop time at which the data was read
+            data: The bytes read (any bytes-like object; it is copied)
+        """
+        self._append(RECORD_DATA, connection, at, data)
+
+    def closed(self, connection: int, at: float) -> None:
+        """Record a closed connection."""
+        self._append(RECORD_CLOSE, connection, at, b"")
+
+    def _append(self, kind: int, connection: int, at: float, payload: Any) -> None:
+        """Buffer a record and write the buffer out once it is large enough."""
+        buffer = self._buffer
+        if len(buffer) >= CAPTURE_BUFFER_LIMIT or self._closed:
+            self.dropped += 1
+            return
+        buffer += RECORD_HEADER.pack(kind, connection, at - self._start, len(payload))
+        buffer += payload
+        self.records += 1
+        if self._write is not None:
+            return  # Written out when the current write finishes
+        if len(buffer) >= CAPTURE_FLUSH_SIZE:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = self._loop.call_later(
+                CAPTURE_FLUSH_INTERVAL, self._flush
+            )
+
+    def _flush(self) -> None:
+        """Hand the buffered records to the executor for writing."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._write is not None or not self._buffer:
+            return
+        chunk = self._buffer
+        self._buffer = bytearray()
+        self._write = self._hass.async_add_executor_job(self._files.write, chunk)
+        self._write.add_done_callback(self._written)
+
+    def _written(self, future: asyncio.Future) -> None:
+        """Continue with the records buffered while a write was in progress."""
+        self._write = None
+        if future.cancelled() or future.exception() is not None:
+            self.write_errors += 1
+            _LOGGER.warning(
+                "Failed to write traffic capture to %s: %s",
+                self._files.directory,
+                None if future.cancelled() else future.exception(),
+            )
+        if self._closed or not self._buffer:
+            return
+        if len(self._buffer) >= CAPTURE_FLUSH_SIZE:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = self._loop.call_later(
+                CAPTURE_FLUSH_INTERVAL, self._flush
+            )
+
+    async def close(self) -> None:
+        """Stop recording, write out the buffered records and close the file."""
+        self._closed = True
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._write is not None:
+            # A failed write has already been logged by _written
+            with contextlib.suppress(Exception):
+                await self._write
+        chunk = bytes(self._buffer)
+        self._buffer = bytearray()
+        try:
+            await self._hass.async_add_executor_job(self._files.close, chunk)
+        except OSError as e:
+            self.write_errors += 1
+            _LOGGER.warning(
+                "Failed to write traffic capture to %s: %s", self._files.directory, e
+            )
+
+
+def read_capture(path: str) -> Tuple[CaptureHeader, List[CaptureRecord]]:
+    """Read a capture file (blocking).
+
+    A record cut short at the end of the file, as left by a crash, is
+    ignored.
+
+    Args:
+        path: Capture file path
+
+    Returns:
+        The file header and the records in the order they were read
+
+    Raises:
+        OSError: If the file cannot be read
+        ValueError: If the file is not a capture file
+    """
+    with open(path, "rb") as file:
+        content = file.read()
+    if len(content) < FILE_HEADER.size:
+        raise ValueError(f"{path} is not a capture file")
+    magic, version, started, transport, framing = FILE_HEADER.unpack_from(content)
+    if magic != FILE_MAGIC or version != FILE_VERSION:
+        raise ValueError(f"{path} is not a capture file")
+    header = CaptureHeader(
+        started,
+        transport.rstrip(b"\0").decode("ascii"),
+        framing.rstrip(b"\0").decode("ascii"),
+    )
+
+    records = []
+    offset = FILE_HEADER.size
+    size = len(content)
+    while offset + RECORD_HEADER.size <= size:
+        kind, connection, at, length = RECORD_HEADER.unpack_from(content, offset)
+        start = offset + RECORD_HEADER.size
+        if start + length > size:
+            break
+        records.append(CaptureRecord(kind, connection, at, content[start:start + length]))
+        offset = start + length
+    return header, records
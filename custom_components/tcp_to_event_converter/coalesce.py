@@ -0,0 +1,247 @@
+"""Deduplication and press/release gesture coalescing before event firing.
+
+Some senders repeat every message a few times within milliseconds for
+reliability, and every copy would otherwise become its own event and its own
+automation run. The EventCoalescer sits between validation and the dispatch
+queue and
+
+* drops repeats of an identical device_id:button_id:action within the dedupe
+  window of its first copy, unless another action of the same device and
+  button arrived in between (press, release, press is three events), and
+* optionally turns press/release sequences per device and button into a
+  single ``press``, a ``double_press`` or a ``long_press`` event.
+
+All timers live on a shared TimerWheel; there is no task or loop timer per
+device or button.
+"""
+
+from typing import Callable, Dict, Optional, Tuple
+
+from .const import (
+    ACTION_DOUBLE_PRESS,
+    ACTION_LONG_PRESS,
+    ACTION_PRESS,
+    ACTION_RELEASE,
+    GESTURE_STATE_TIMEOUT,
+)
+from .frame_cache import CachedFrame, build_cached_frame
+from .timer_wheel import TimerWheel, WheelTimer
+
+# Gesture states of a device/button pair
+_PRESSED = 1  # Pressed once, waiting for release or the long press time
+_RELEASED = 2  # Pressed and released, waiting for a second press
+_DOUBLE = 3  # double_press fired, waiting for the second release
+_LONG = 4  # long_press fired, waiting for the release
+
+# Called with (event_data, received_at, addr) for every event to fire
+EmitFn = Callable[[Dict[str, str], float, tuple], None]
+_Key = Tuple[str, str]
+
+
+class _Gesture:
+    """Gesture state of one device/button pair."""
+
+    __slots__ = ("state", "timer", "addr")
+
+    def __init__(self, state: int, timer: WheelTimer, addr: tuple) -> None:
+        """Initialize the state."""
+        self.state = state
+        self.timer = timer
+        self.addr = addr
+
+
+class EventCoalescer:
+    """Deduplicates events and coalesces press/release gestures."""
+
+    def __init__(
+        self,
+        wheel: TimerWheel,
+        emit: EmitFn,
+        dedupe_window: float,
+        gestures: bool,
+        double_press: float,
+        long_press: float,
+    ) -> None:
+        """Initialize the coalescer.
+
+        Args:
+            wheel: Timer wheel for dedupe windows and gesture timeouts
+            emit: Function queueing an event for firing
+            dedupe_window: Seconds during which repeats are dropped (0 = off)
+            gestures: Whether to coalesce press/release gestures
+            double_press: Maximum seconds between release and second press
+            long_press: Minimum seconds a press must be held for long_press
+        """
+        self._wheel = wheel
+        self._emit = emit
+        self.dedupe_window = dedupe_window
+        self.gestures = gestures
+        self.double_press = double_press
+        self.long_press = long_press
+        # Last action of each device/button pair within the dedupe window
+        self._recent: Dict[_Key, Tuple[str, WheelTimer]] = {}
+        self._gestures: Dict[_Key, _Gesture] = {}
+        self.received: int = 0
+        self.emitted: int = 0
+        self.deduplicated: int = 0
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Counters for diagnostics."""
+        return {
+            "received": self.received,
+            "emitted": self.emitted,
+            "deduplicated": self.deduplicated,
+            "coalesced": self.received - self.deduplicated - self.emitted,
+            "pending_gestures": len(self._gestures),
+        }
+
+    def submit(self, cached: CachedFrame, received_at: float, addr: tuple) -> None:
+        """Pass a validated event through deduplication and gesture coalescing.
+
+        Args:
+            cached: Validated fields and event payload
+            received_at: Loop time at which the message was read
+            addr: Client address for logging
+        """
+        self.received += 1
+        fields = cached.fields
+
+        key = (fields[0], fields[1])
+        action = fields[2]
+        if self.dedupe_window:
+            recent = self._recent
+            last = recent.get(key)
+            if last is not None:
+                if last[0] == action:
+                    self.deduplicated += 1
+                    return
+                # A different action ends the window of the previous one
+                self._wheel.cancel(last[1])
+            recent[key] = (
+                action,
+                self._wheel.schedule(self.dedupe_window, recent.pop, key, None),
+            )
+
+        if self.gestures and (action == ACTION_PRESS or action == ACTION_RELEASE):
+            if action == ACTION_PRESS:
+                self._on_press(key, received_at, addr)
+            else:
+                self._on_release(key, cached, received_at, addr)
+            return
+
+        self.emitted += 1
+        self._emit(cached.event_data, received_at, addr)
+
+    def flush(self) -> None:
+        """Fire presses whose gesture is still undecided and reset.
+
+        Called on shutdown so a press made just before it is not lost.
+        """
+        wheel = self._wheel
+        now = wheel.time()
+        gestures = list(self._gestures.items())
+        self._gestures.clear()
+        for key, gesture in gestures:
+            wheel.cancel(gesture.timer)
+            if gesture.state in (_PRESSED, _RELEASED):
+                self._emit_action(key, ACTION_PRESS, now, gesture.addr)
+        for _, timer in self._recent.values():
+            wheel.cancel(timer)
+        self._recent.clear()
+
+    def _on_press(self, key: _Key, received_at: float, addr: tuple) -> None:
+        """Advance the gesture of a device/button pair on a press."""
+        wheel = self._wheel
+        gesture = self._gestures.get(key)
+        if gesture is not None:
+            wheel.cancel(gesture.timer)
+            if gesture.state == _RELEASED:
+                # Second press within the double press window
+                gesture.state = _DOUBLE
+                gesture.timer = wheel.schedule(GESTURE_STATE_TIMEOUT, self._expire, key)
+                self._emit_action(key, ACTION_DOUBLE_PRESS, received_at, addr)
+                return
+            if gesture.state == _PRESSED:
+                # The release of the previous press was lost
+                self._emit_action(key, ACTION_PRESS, received_at, gesture.addr)
+
+        self._gestures[key] = _Gesture(
+            _PRESSED, wheel.schedule(self.long_press, self._on_long_press, key), addr
+        )
+
+    def _on_release(
+        self, key: _Key, cached: CachedFrame, received_at: float, addr: tuple
+    ) -> None:
+        """Advance the gesture of a device/button pair on a release."""
+        gesture = self._gestures.get(key)
+        if gesture is None:
+            # Release without a tracked press: nothing to coalesce it with
+            self.emitted += 1
+            self._emit(cached.event_data, received_at, addr)
+            return
+
+        if gesture.state == _PRESSED:
+            self._wheel.cancel(gesture.timer)
+            gesture.state = _RELEASED
+            gesture.timer = self._wheel.schedule(
+                self.double_press, self._on_single_press, key
+            )
+        elif gesture.state in (_DOUBLE, _LONG):
+            # End of a gesture that has already been fired
+            self._wheel.cancel(gesture.timer)
+            del self._gestures[key]
+
+    def _on_long_press(self, key: _Key) -> None:
+        """Fire long_press for a button still held after the long press time."""
+        gesture = self._gestures[key]
+        gesture.state = _LONG
+        gesture.timer = self._wheel.schedule(GESTURE_STATE_TIMEOUT, self._expire, key)
+        self._emit_action(key, ACTION_LONG_PRESS, self._wheel.time(), gesture.addr)
+
+    def _on_single_press(self, key: _Key) -> None:
+        """Fire press once no second press followed within the window."""
+        gesture = self._gestures.pop(key)
+        self._emit_action(key, ACTION_PRESS, self._wheel.time(), gesture.addr)
+
+    def _expire(self, key: _Key) -> None:
+        """Forget a gesture whose release never arrived."""
+        self._gestures.pop(key, None)
+
+    def _emit_action(
+        self, key: _Key, action: str, received_at: float, addr: tuple
+    ) -> None:
+        """Fire an event for a device/button pair with a coalesced action.
+
+        Events decided by a timer carry the time of that decision rather than
+        the time the last message was read, so the latency metrics measure
+        the pipeline and not the gesture windows.
+        """
+        self.emitted += 1
+        event_data = build_cached_frame((key[0], key[1], action)).event_data
+        self._emit(event_data, received_at, addr)
+
+
+def create_coalescer(
+    wheel: TimerWheel,
+    emit: EmitFn,
+    dedupe_window_ms: int,
+    gestures: bool,
+    double_press_ms: int,
+    long_press_ms: int,
+) -> Optional[EventCoalescer]:
+    """Create the coalescing stage if deduplication or gestures are enabled.
+
+    Returns:
+        An EventCoalescer, or None if both are disabled
+    """
+    if not dedupe_window_ms and not gestures:
+        return None
+    return EventCoalescer(
+        wheel,
+        emit,
+        dedupe_window_ms / 1000,
+        gestures,
+        double_press_ms / 1000,
+        long_press_ms / 1000,
+    )
@@ -1,9 +1,7 @@
 """Config flow for TCP to Event Converter integration."""
 
-import asyncio
 import logging
 import re
-import socket
 from typing import Any, Dict, Optional
 
 import voluptuous as vol
@@ -11,23 +9,132 @@ from homeassistant import config_entries
 from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
 
+from .binary import BinaryRegistry
 from .const import (
     DOMAIN,
     CONF_TCP_PORT,
     CONF_EVENT_TYPE,
+    CONF_ACCEPT_RATE,
+    CONF_ACK_MODE,
+    CONF_BINARY_REGISTRY,
+    CONF_CAPTURE_SIZE_MB,
+    CONF_DEDUPE_WINDOW_MS,
+    CONF_DOUBLE_PRESS_MS,
+    CONF_FRAMING,
+    CONF_FRAME_CACHE_SIZE,
+    CONF_GESTURES,
+    CONF_HEARTBEAT_INTERVAL,
+    CONF_IDLE_TIMEOUT,
+    CONF_INGEST_WORKERS,
+    CONF_LISTEN_BACKLOG,
+    CONF_LONG_PRESS_MS,
+    CONF_MAX_CONNECTIONS,
+    CONF_MAX_CONNECTIONS_PER_SOURCE,
+    CONF_MAX_HANDSHAKES,
+    CONF_PAUSE_ACCEPTING,
+    CONF_DISPATCH_MAX_BATCH,
+    CONF_DISPATCH_MAX_DELAY_MS,
+    CONF_LOG_SAMPLE_LIMIT,
+    CONF_OVERLOAD_POLICY,
+    CONF_RATE_LIMIT_CONNECTION,
+    CONF_RATE_LIMIT_GLOBAL,
+    CONF_READ_BUFFER_SIZE,
+    CONF_ROUTES,
+    CONF_SERVER_MODE,
+    CONF_SOCKET_HANDOFF,
+    CONF_SOCKET_PATH,
+    CONF_SPOOL_SIZE_MB,
+    CONF_TCP_KEEPALIVE,
+    CONF_TLS_CERTFILE,
+    CONF_TLS_KEYFILE,
+    CONF_TRANSPORT,
+    DEFAULT_ACCEPT_RATE,
+    DEFAULT_ACK_MODE,
+    DEFAULT_CAPTURE_SIZE_MB,
+    DEFAULT_DEDUPE_WINDOW_MS,
+    DEFAULT_DOUBLE_PRESS_MS,
+    DEFAULT_FRAMING,
+    DEFAULT_FRAME_CACHE_SIZE,
+    DEFAULT_GESTURES,
+    DEFAULT_HEARTBEAT_INTERVAL,
+    DEFAULT_IDLE_TIMEOUT,
+    DEFAULT_INGEST_WORKERS,
+    DEFAULT_DISPATCH_MAX_BATCH,
+    DEFAULT_DISPATCH_MAX_DELAY_MS,
+    DEFAULT_LOG_SAMPLE_LIMIT,
+    DEFAULT_LISTEN_BACKLOG,
+    DEFAULT_LONG_PRESS_MS,
+    DEFAULT_MAX_CONNECTIONS,
+    DEFAULT_MAX_CONNECTIONS_PER_SOURCE,
+    DEFAULT_MAX_HANDSHAKES,
+    DEFAULT_PAUSE_ACCEPTING,
+    DEFAULT_OVERLOAD_POLICY,
+    DEFAULT_RATE_LIMIT_CONNECTION,
+    DEFAULT_RATE_LIMIT_GLOBAL,
+    DEFAULT_READ_BUFFER_SIZE,
+    DEFAULT_SERVER_MODE,
+    DEFAULT_SOCKET_HANDOFF,
+    DEFAULT_SPOOL_SIZE_MB,
+    DEFAULT_TCP_KEEPALIVE,
+    DEFAULT_TRANSPORT,
+    FRAMING_MODES,
+    LEGACY_FRAMING,
+    LISTEN_HOST,
+    MAX_ACCEPT_RATE,
+    MAX_CAPTURE_SIZE_MB,
+    MAX_CONNECTION_LIMIT,
+    MAX_DEDUPE_WINDOW_MS,
+    MAX_DISPATCH_BATCH,
+    MAX_DISPATCH_DELAY_MS,
+    MAX_FRAME_CACHE_SIZE,
+    MAX_GESTURE_MS,
+    MAX_HANDSHAKES_LIMIT,
+    MAX_HEARTBEAT_INTERVAL,
+    MAX_IDLE_TIMEOUT,
+    MAX_INGEST_WORKERS,
+    MAX_LISTEN_BACKLOG,
+    MAX_LOG_SAMPLE_LIMIT,
+    MAX_RATE_LIMIT,
+    MAX_READ_BUFFER_SIZE,
+    MAX_SPOOL_SIZE_MB,
+    MAX_TCP_KEEPALIVE,
+    MIN_GESTURE_MS,
+    MIN_READ_BUFFER_SIZE,
+    OVERLOAD_POLICIES,
+    PORT_PROBE_RANGE,
+    SERVER_MODES,
+    TRANSPORTS,
     MIN_PORT,
     MAX_PORT,
     EVENT_TYPE_PATTERN,
 )
+from .handoff import park_socket
+from .probe import (
+    ERROR_CANNOT_BIND,
+    ERROR_PORT_IN_USE,
+    ERROR_PORT_PRIVILEGED,
+    probe_port,
+)
+from .routing import RoutingTable
+from .tls import create_server_context
 
 _LOGGER = logging.getLogger(__name__)
 
+_EVENT_TYPE_MATCH = re.compile(EVENT_TYPE_PATTERN).match
+# Error shown instead of port_in_use when a free port was found after it
+_ERROR_PORT_IN_USE_SUGGESTED = "port_in_use_suggested"
+
 
 class TcpToEventConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for TCP to Event Converter."""
 
     VERSION = 1
 
+    def __init__(self) -> None:
+        """Initialize the flow."""
+        # First free port after a requested port found to be in use
+        self._suggested_port: Optional[int] = None
+
     async def async_step_user(
         self, user_input: Optional[Dict[str, Any]] = None
     ) -> FlowResult:
@@ -40,27 +147,39 @@ class TcpToEventConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             FlowResult with either form or entry creation
         """
         errors: Dict[str, str] = {}
+        tcp_port = 54321
 
         if user_input is not None:
+            tcp_port = user_input[CONF_TCP_PORT]
+            self._suggested_port = None
             # Validate the configuration
             validation_error = await self._validate_config(user_input)
 
-            if validation_error:
+            if validation_error == ERROR_PORT_IN_USE and self._suggested_port:
+                errors["base"] = _ERROR_PORT_IN_USE_SUGGESTED
+                tcp_port = self._suggested_port
+            elif validation_error:
                 errors["base"] = validation_error
             else:
-                # Configuration is valid, create the entry
+                # Configuration is valid, create the entry; entries without a
+                # framing option predate it and keep the legacy framing
                 return self.async_create_entry(
                     title=f"TCP Port {user_input[CONF_TCP_PORT]}",
-                    data=user_input
+                    data=user_input,
+                    options={CONF_FRAMING: DEFAULT_FRAMING},
                 )
 
         return self.async_show_form(
             step_id="user",
             data_schema=vol.Schema({
-                vol.Required(CONF_TCP_PORT, default=54321): int,
-                vol.Required(CONF_EVENT_TYPE, default="tcp_event"): str,
+                vol.Required(CONF_TCP_PORT, default=tcp_port): int,
+                vol.Required(
+                    CONF_EVENT_TYPE,
+                    default=(user_input or {}).get(CONF_EVENT_TYPE, "tcp_event"),
+                ): str,
             }),
             errors=errors,
+            description_placeholders={"suggested_port": str(self._suggested_port)},
         )
 
     async def _validate_config(self, config: Dict[str, Any]) -> Optional[str]:
@@ -68,7 +187,7 @@ class TcpToEventConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
         Performs comprehensive validation including:
         - Port range validation
-        - Port availability check
+        - Port availability check, reserving the port for the listener
         - Event type format validation
         - Duplicate entry detection
 
@@ -112,7 +231,8 @@ class TcpToEventConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             )
             return "invalid_event_type"
 
-        # 4. Check if port is available by attempting to bind
+        # 4. Check if port is available by binding it, last so that the
+        # port is only reserved for a configuration that is created
         port_check_error = await self._check_port_available(tcp_port)
         if port_check_error:
             return port_check_error
@@ -137,15 +257,16 @@ class TcpToEventConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         if not event_type:
             return False
 
-        pattern = re.compile(EVENT_TYPE_PATTERN)
-        return bool(pattern.match(event_type))
+        return bool(_EVENT_TYPE_MATCH(event_type))
 
     async def _check_port_available(self, port: int) -> Optional[str]:
         """Check if the specified port is available for binding.
 
-        Attempts to temporarily bind to the port to verify availability.
-        This prevents configuration errors that would only be discovered
-        when the integration attempts to start the TCP server.
+        Binds the port on the listener's address in an executor job. A free
+        port stays bound and is parked for the listener to adopt when the
+        entry is set up, so it cannot be taken in between; for a port in use
+        the following ports are probed in the same job and the first free
+        one is remembered as a suggestion.
 
         Args:
             port: TCP port number to check
@@ -154,42 +275,29 @@ class TcpToEventConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             Error code string if port check fails, None if available
         """
         try:
-            # Create a socket and attempt to bind to the port
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-
-            try:
-                # Attempt to bind to the port
-                await asyncio.get_event_loop().run_in_executor(
-                    None, sock.bind, ("0.0.0.0", port)
-                )
-                _LOGGER.debug("Port %d is available", port)
-                return None
-
-            except OSError as bind_error:
-                if bind_error.errno == 98:  # Address already in use (Linux)
-                    _LOGGER.error("Port %d is already in use", port)
-                    return "port_in_use"
-                elif bind_error.errno == 48:  # Address already in use (macOS)
-                    _LOGGER.error("Port %d is already in use", port)
-                    return "port_in_use"
-                elif bind_error.errno == 13:  # Permission denied
-                    _LOGGER.error("Permission denied to bind to port %d", port)
-                    return "port_privileged"
-                else:
-                    _LOGGER.error(
-                        "Cannot bind to port %d: %s (errno: %d)",
-                        port, bind_error, bind_error.errno
-                    )
-                    return "cannot_bind"
-
-            finally:
-                # Always close the socket
-                sock.close()
-
+            probe = await self.hass.async_add_executor_job(
+                probe_port, port, (LISTEN_HOST,), DEFAULT_LISTEN_BACKLOG, PORT_PROBE_RANGE
+            )
         except Exception as e:
             _LOGGER.error("Unexpected error checking port %d: %s", port, e)
-            return "cannot_bind"
+            return ERROR_CANNOT_BIND
+
+        if probe.error is None:
+            _LOGGER.debug("Port %d is available, reserving it", port)
+            park_socket(self.hass, port, probe.sock)
+            return None
+
+        if probe.error == ERROR_PORT_IN_USE:
+            _LOGGER.error(
+                "Port %d is already in use%s", port,
+                f", port {probe.suggested_port} is free" if probe.suggested_port else ""
+            )
+            self._suggested_port = probe.suggested_port
+        elif probe.error == ERROR_PORT_PRIVILEGED:
+            _LOGGER.error("Permission denied to bind to port %d", port)
+        else:
+            _LOGGER.error("Cannot bind to port %d", port)
+        return probe.error
 
     @staticmethod
     @callback
@@ -222,8 +330,200 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
         Returns:
             FlowResult with either form or entry update
         """
-        # Currently no options to configure, but structure is in place for future
+        errors: Dict[str, str] = {}
         if user_input is not None:
-            return self.async_create_entry(title="", data=user_input)
-
-        return self.async_show_form(step_id="init")
\ No newline at end of file
+            try:
+                BinaryRegistry.from_json(user_input.get(CONF_BINARY_REGISTRY, ""))
+            except ValueError as e:
+                _LOGGER.debug("Invalid binary registry: %s", e)
+                errors[CONF_BINARY_REGISTRY] = "invalid_registry"
+            try:
+                RoutingTable.from_json(user_input.get(CONF_ROUTES, ""))
+            except ValueError as e:
+                _LOGGER.debug("Invalid routes: %s", e)
+                errors[CONF_ROUTES] = "invalid_routes"
+            certfile = user_input.get(CONF_TLS_CERTFILE, "")
+            keyfile = user_input.get(CONF_TLS_KEYFILE, "")
+            if certfile or keyfile:
+                try:
+                    await self.hass.async_add_executor_job(
+                        create_server_context, certfile, keyfile
+                    )
+                except OSError as e:
+                    _LOGGER.debug("Invalid TLS certificate: %s", e)
+                    errors[CONF_TLS_CERTFILE] = "invalid_certificate"
+            dedupe_window_ms = user_input.get(
+                CONF_DEDUPE_WINDOW_MS, DEFAULT_DEDUPE_WINDOW_MS
+            )
+            double_press_ms = user_input.get(
+                CONF_DOUBLE_PRESS_MS, DEFAULT_DOUBLE_PRESS_MS
+            )
+            if (
+                user_input.get(CONF_GESTURES, DEFAULT_GESTURES)
+                and dedupe_window_ms >= double_press_ms
+            ):
+                # A double press must not look like a repeated message
+                errors[CONF_DEDUPE_WINDOW_MS] = "dedupe_window_too_long"
+            if not errors:
+                return self.async_create_entry(title="", data=user_input)
+
+        options = {**self.config_entry.options, **(user_input or {})}
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema({
+                vol.Optional(
+                    CONF_TRANSPORT,
+                    default=options.get(CONF_TRANSPORT, DEFAULT_TRANSPORT),
+                ): vol.In(TRANSPORTS),
+                vol.Optional(
+                    CONF_SOCKET_PATH,
+                    default=options.get(CONF_SOCKET_PATH, ""),
+                ): str,
+                vol.Optional(
+                    CONF_TLS_CERTFILE,
+                    default=options.get(CONF_TLS_CERTFILE, ""),
+                ): str,
+                vol.Optional(
+                    CONF_TLS_KEYFILE,
+                    default=options.get(CONF_TLS_KEYFILE, ""),
+                ): str,
+                vol.Optional(
+                    CONF_SERVER_MODE,
+                    default=options.get(CONF_SERVER_MODE, DEFAULT_SERVER_MODE),
+                ): vol.In(SERVER_MODES),
+                vol.Optional(
+                    CONF_FRAMING,
+                    default=options.get(CONF_FRAMING, LEGACY_FRAMING),
+                ): vol.In(FRAMING_MODES),
+                vol.Optional(
+                    CONF_FRAME_CACHE_SIZE,
+                    default=options.get(CONF_FRAME_CACHE_SIZE, DEFAULT_FRAME_CACHE_SIZE),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=MAX_FRAME_CACHE_SIZE)),
+                vol.Optional(
+                    CONF_READ_BUFFER_SIZE,
+                    default=options.get(CONF_READ_BUFFER_SIZE, DEFAULT_READ_BUFFER_SIZE),
+                ): vol.All(
+                    vol.Coerce(int),
+                    vol.Range(min=MIN_READ_BUFFER_SIZE, max=MAX_READ_BUFFER_SIZE),
+                ),
+                vol.Optional(
+                    CONF_DISPATCH_MAX_BATCH,
+                    default=options.get(
+                        CONF_DISPATCH_MAX_BATCH, DEFAULT_DISPATCH_MAX_BATCH
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=MAX_DISPATCH_BATCH)),
+                vol.Optional(
+                    CONF_DISPATCH_MAX_DELAY_MS,
+                    default=options.get(
+                        CONF_DISPATCH_MAX_DELAY_MS, DEFAULT_DISPATCH_MAX_DELAY_MS
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=MAX_DISPATCH_DELAY_MS)),
+                vol.Optional(
+                    CONF_RATE_LIMIT_CONNECTION,
+                    default=options.get(
+                        CONF_RATE_LIMIT_CONNECTION, DEFAULT_RATE_LIMIT_CONNECTION
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=MAX_RATE_LIMIT)),
+                vol.Optional(
+                    CONF_RATE_LIMIT_GLOBAL,
+                    default=options.get(
+                        CONF_RATE_LIMIT_GLOBAL, DEFAULT_RATE_LIMIT_GLOBAL
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=MAX_RATE_LIMIT)),
+                vol.Optional(
+                    CONF_OVERLOAD_POLICY,
+                    default=options.get(CONF_OVERLOAD_POLICY, DEFAULT_OVERLOAD_POLICY),
+                ): vol.In(OVERLOAD_POLICIES),
+                vol.Optional(
+                    CONF_LOG_SAMPLE_LIMIT,
+                    default=options.get(CONF_LOG_SAMPLE_LIMIT, DEFAULT_LOG_SAMPLE_LIMIT),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=MAX_LOG_SAMPLE_LIMIT)),
+                vol.Optional(
+                    CONF_INGEST_WORKERS,
+                    default=options.get(CONF_INGEST_WORKERS, DEFAULT_INGEST_WORKERS),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=MAX_INGEST_WORKERS)),
+                vol.Optional(
+                    CONF_BINARY_REGISTRY,
+                    default=options.get(CONF_BINARY_REGISTRY, ""),
+                ): str,
+                vol.Optional(
+                    CONF_ROUTES,
+                    default=options.get(CONF_ROUTES, ""),
+                ): str,
+                vol.Optional(
+                    CONF_DEDUPE_WINDOW_MS,
+                    default=options.get(CONF_DEDUPE_WINDOW_MS, DEFAULT_DEDUPE_WINDOW_MS),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=MAX_DEDUPE_WINDOW_MS)),
+                vol.Optional(
+                    CONF_GESTURES,
+                    default=options.get(CONF_GESTURES, DEFAULT_GESTURES),
+                ): bool,
+                vol.Optional(
+                    CONF_DOUBLE_PRESS_MS,
+                    default=options.get(CONF_DOUBLE_PRESS_MS, DEFAULT_DOUBLE_PRESS_MS),
+                ): vol.All(
+                    vol.Coerce(int), vol.Range(min=MIN_GESTURE_MS, max=MAX_GESTURE_MS)
+                ),
+                vol.Optional(
+                    CONF_LONG_PRESS_MS,
+                    default=options.get(CONF_LONG_PRESS_MS, DEFAULT_LONG_PRESS_MS),
+                ): vol.All(
+                    vol.Coerce(int), vol.Range(min=MIN_GESTURE_MS, max=MAX_GESTURE_MS)
+                ),
+                vol.Optional(
+                    CONF_SPOOL_SIZE_MB,
+                    default=options.get(CONF_SPOOL_SIZE_MB, DEFAULT_SPOOL_SIZE_MB),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=MAX_SPOOL_SIZE_MB)),
+                vol.Optional(
+                    CONF_CAPTURE_SIZE_MB,
+                    default=options.get(CONF_CAPTURE_SIZE_MB, DEFAULT_CAPTURE_SIZE_MB),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=MAX_CAPTURE_SIZE_MB)),
+                vol.Optional(
+                    CONF_ACK_MODE,
+                    default=options.get(CONF_ACK_MODE, DEFAULT_ACK_MODE),
+                ): bool,
+                vol.Optional(
+                    CONF_MAX_CONNECTIONS,
+                    default=options.get(CONF_MAX_CONNECTIONS, DEFAULT_MAX_CONNECTIONS),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=MAX_CONNECTION_LIMIT)),
+                vol.Optional(
+                    CONF_LISTEN_BACKLOG,
+                    default=options.get(CONF_LISTEN_BACKLOG, DEFAULT_LISTEN_BACKLOG),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=MAX_LISTEN_BACKLOG)),
+                vol.Optional(
+                    CONF_ACCEPT_RATE,
+                    default=options.get(CONF_ACCEPT_RATE, DEFAULT_ACCEPT_RATE),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=MAX_ACCEPT_RATE)),
+                vol.Optional(
+                    CONF_MAX_CONNECTIONS_PER_SOURCE,
+                    default=options.get(
+                        CONF_MAX_CONNECTIONS_PER_SOURCE, DEFAULT_MAX_CONNECTIONS_PER_SOURCE
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=MAX_CONNECTION_LIMIT)),
+                vol.Optional(
+                    CONF_PAUSE_ACCEPTING,
+                    default=options.get(CONF_PAUSE_ACCEPTING, DEFAULT_PAUSE_ACCEPTING),
+                ): bool,
+                vol.Optional(
+                    CONF_MAX_HANDSHAKES,
+                    default=options.get(CONF_MAX_HANDSHAKES, DEFAULT_MAX_HANDSHAKES),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=MAX_HANDSHAKES_LIMIT)),
+                vol.Optional(
+                    CONF_SOCKET_HANDOFF,
+                    default=options.get(CONF_SOCKET_HANDOFF, DEFAULT_SOCKET_HANDOFF),
+                ): bool,
+                vol.Optional(
+                    CONF_IDLE_TIMEOUT,
+                    default=options.get(CONF_IDLE_TIMEOUT, DEFAULT_IDLE_TIMEOUT),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=MAX_IDLE_TIMEOUT)),
+                vol.Optional(
+                    CONF_HEARTBEAT_INTERVAL,
+                    default=options.get(CONF_HEARTBEAT_INTERVAL, DEFAULT_HEARTBEAT_INTERVAL),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=MAX_HEARTBEAT_INTERVAL)),
+                vol.Optional(
+                    CONF_TCP_KEEPALIVE,
+                    default=options.get(CONF_TCP_KEEPALIVE, DEFAULT_TCP_KEEPALIVE),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=MAX_TCP_KEEPALIVE)),
+            }),
+            errors=errors,
+        )
\ No newline at end of file
@@ -5,20 +5,207 @@ DOMAIN: str = "tcp_to_event_converter"
 CONF_TCP_PORT: str = "tcp_port"
 CONF_EVENT_TYPE: str = "event_type"
 
+# Keys of the integration's hass.data[DOMAIN] dictionary
+DATA_SERVERS: str = "servers"  # TCPServer instances keyed by config entry id
+DATA_DISPATCHER: str = "dispatcher"  # EventDispatcher shared by all listeners
+# Key of hass.data itself, kept while no listener is loaded
+DATA_HANDOFF: str = f"{DOMAIN}_handoff"  # Listening sockets parked across reloads, by port
+DATA_TLS_CONTEXTS: str = f"{DOMAIN}_tls_contexts"  # Server SSL contexts, by certificate
+
+# Options keys
+CONF_FRAMING: str = "framing"
+CONF_DISPATCH_MAX_BATCH: str = "dispatch_max_batch"
+CONF_DISPATCH_MAX_DELAY_MS: str = "dispatch_max_delay_ms"
+CONF_RATE_LIMIT_CONNECTION: str = "rate_limit_connection"
+CONF_RATE_LIMIT_GLOBAL: str = "rate_limit_global"
+CONF_OVERLOAD_POLICY: str = "overload_policy"
+CONF_SERVER_MODE: str = "server_mode"
+CONF_FRAME_CACHE_SIZE: str = "frame_cache_size"
+CONF_LOG_SAMPLE_LIMIT: str = "log_sample_limit"
+CONF_INGEST_WORKERS: str = "ingest_workers"
+CONF_TRANSPORT: str = "transport"
+CONF_SOCKET_PATH: str = "socket_path"
+CONF_BINARY_REGISTRY: str = "binary_registry"
+CONF_DEDUPE_WINDOW_MS: str = "dedupe_window_ms"
+CONF_GESTURES: str = "gestures"
+CONF_DOUBLE_PRESS_MS: str = "double_press_ms"
+CONF_LONG_PRESS_MS: str = "long_press_ms"
+CONF_SPOOL_SIZE_MB: str = "spool_size_mb"
+CONF_ACK_MODE: str = "ack_mode"
+CONF_LISTEN_BACKLOG: str = "listen_backlog"
+CONF_ACCEPT_RATE: str = "accept_rate"
+CONF_MAX_CONNECTIONS_PER_SOURCE: str = "max_connections_per_source"
+CONF_PAUSE_ACCEPTING: str = "pause_accepting"
+CONF_IDLE_TIMEOUT: str = "idle_timeout"
+CONF_HEARTBEAT_INTERVAL: str = "heartbeat_interval"
+CONF_TCP_KEEPALIVE: str = "tcp_keepalive"
+CONF_ROUTES: str = "routes"
+CONF_READ_BUFFER_SIZE: str = "read_buffer_size"
+CONF_SOCKET_HANDOFF: str = "socket_handoff"
+CONF_MAX_CONNECTIONS: str = "max_connections"
+CONF_TLS_CERTFILE: str = "tls_certfile"
+CONF_TLS_KEYFILE: str = "tls_keyfile"
+CONF_MAX_HANDSHAKES: str = "max_handshakes"
+CONF_CAPTURE_SIZE_MB: str = "capture_size_mb"
+
 # Port validation constants
 MIN_PORT: int = 1024  # Minimum port (avoid privileged ports)
 MAX_PORT: int = 65535  # Maximum valid port number
+PORT_PROBE_RANGE: int = 32  # Ports after a taken one probed for a free suggestion
 
 # Message validation constants
 EXPECTED_MESSAGE_PARTS: int = 3  # device_id:button_id:action
 MAX_FIELD_LENGTH: int = 64  # Maximum characters per field
 FIELD_VALIDATION_PATTERN: str = r"^[a-zA-Z0-9_-]+$"  # Alphanumeric, underscore, hyphen only
 
+# Listener transports
+TRANSPORT_TCP: str = "tcp"  # TCP stream on LISTEN_HOST:<port>
+TRANSPORT_UDP: str = "udp"  # UDP datagrams on LISTEN_HOST:<port>, one or more frames each
+TRANSPORT_UNIX: str = "unix"  # AF_UNIX stream socket at the configured path
+TRANSPORTS: tuple = (TRANSPORT_TCP, TRANSPORT_UDP, TRANSPORT_UNIX)
+DEFAULT_TRANSPORT: str = TRANSPORT_TCP
+DEFAULT_SOCKET_PATH: str = "tcp_to_event_converter/{port}.sock"  # Relative to config, if unset
+SOCKET_PERMISSIONS: int = 0o660  # Only the Home Assistant user and group may connect
+LISTEN_HOST: str = "0.0.0.0"  # Address the tcp and udp listeners bind
+
+# Connection handler implementations
+SERVER_MODE_STREAM: str = "stream"  # asyncio streams, one task per connection
+SERVER_MODE_PROTOCOL: str = "protocol"  # asyncio.Protocol callbacks, no per-connection task
+SERVER_MODES: tuple = (SERVER_MODE_STREAM, SERVER_MODE_PROTOCOL)
+DEFAULT_SERVER_MODE: str = SERVER_MODE_STREAM
+
+# Stream framing modes
+FRAMING_NEWLINE: str = "newline"  # One message per line (\n or \r\n)
+FRAMING_READ: str = "read"  # Like newline, but the end of each read also ends a message
+FRAMING_LENGTH_PREFIXED: str = "length_prefixed"  # 2-byte big-endian length + payload
+FRAMING_BINARY: str = "binary"  # 1-byte length + integer ids resolved via the registry
+FRAMING_MODES: tuple = (
+    FRAMING_NEWLINE,
+    FRAMING_READ,
+    FRAMING_LENGTH_PREFIXED,
+    FRAMING_BINARY,
+)
+DEFAULT_FRAMING: str = FRAMING_NEWLINE  # Framing of new entries
+LEGACY_FRAMING: str = FRAMING_READ  # Entries created before framing was configurable
+MAX_FRAME_SIZE: int = 1024  # Maximum bytes per frame before it is discarded
+
+# Event dispatch batching
+DEFAULT_DISPATCH_MAX_BATCH: int = 100  # Maximum events fired per loop iteration
+DEFAULT_DISPATCH_MAX_DELAY_MS: int = 0  # Maximum batching delay (0 = next loop tick)
+MAX_DISPATCH_BATCH: int = 10000  # Upper bound accepted in options
+MAX_DISPATCH_DELAY_MS: int = 1000  # Upper bound accepted in options
+DISPATCH_QUEUE_SIZE: int = 10000  # Maximum queued events before dropping
+
+# Rate limiting and overload handling
+DEFAULT_RATE_LIMIT_CONNECTION: int = 0  # Messages/second per connection (0 = unlimited)
+DEFAULT_RATE_LIMIT_GLOBAL: int = 0  # Messages/second across all connections (0 = unlimited)
+MAX_RATE_LIMIT: int = 1000000  # Upper bound accepted in options
+RATE_LIMIT_BURST_SECONDS: float = 1.0  # Bucket capacity expressed in seconds of rate
+OVERLOAD_PAUSE: str = "pause"  # Stop reading from the connection until tokens refill
+OVERLOAD_DROP_NEWEST: str = "drop_newest"  # Discard the incoming message
+OVERLOAD_DROP_OLDEST: str = "drop_oldest"  # Discard the oldest queued event instead
+OVERLOAD_DISCONNECT: str = "disconnect"  # Close the offending connection
+OVERLOAD_POLICIES: tuple = (
+    OVERLOAD_PAUSE,
+    OVERLOAD_DROP_NEWEST,
+    OVERLOAD_DROP_OLDEST,
+    OVERLOAD_DISCONNECT,
+)
+DEFAULT_OVERLOAD_POLICY: str = OVERLOAD_PAUSE
+
+# Validated frame cache
+DEFAULT_FRAME_CACHE_SIZE: int = 4096  # Distinct frames kept (0 = disabled)
+MAX_FRAME_CACHE_SIZE: int = 100000  # Upper bound accepted in options
+
+# Per-message log sampling
+DEFAULT_LOG_SAMPLE_LIMIT: int = 0  # Lines per log site per interval (0 = log everything)
+MAX_LOG_SAMPLE_LIMIT: int = 10000  # Upper bound accepted in options
+LOG_SAMPLE_INTERVAL: float = 60.0  # Sampling interval in seconds
+
+# Multi-process ingest
+DEFAULT_INGEST_WORKERS: int = 0  # SO_REUSEPORT worker processes (0 = ingest in Home Assistant)
+MAX_INGEST_WORKERS: int = 32  # Upper bound accepted in options
+
+# Deduplication and press/release gesture coalescing
+DEFAULT_DEDUPE_WINDOW_MS: int = 0  # Drop repeats of a message within this window (0 = off)
+MAX_DEDUPE_WINDOW_MS: int = 10000  # Upper bound accepted in options
+DEFAULT_GESTURES: bool = False  # Coalesce press/release into press, double_press, long_press
+DEFAULT_DOUBLE_PRESS_MS: int = 400  # Maximum gap between release and second press
+DEFAULT_LONG_PRESS_MS: int = 800  # Minimum hold time of a long press
+MIN_GESTURE_MS: int = 50  # Lower bound accepted in options
+MAX_GESTURE_MS: int = 5000  # Upper bound accepted in options
+GESTURE_STATE_TIMEOUT: float = 60.0  # Forget a gesture whose release never arrives
+ACTION_PRESS: str = "press"
+ACTION_RELEASE: str = "release"
+ACTION_DOUBLE_PRESS: str = "double_press"
+ACTION_LONG_PRESS: str = "long_press"
+
+# Timer wheel used for short-lived per-key timers
+TIMER_WHEEL_TICK: float = 0.01  # Resolution in seconds
+TIMER_WHEEL_SLOTS: int = 512  # Slots per rotation (5.12 s at the default tick)
+
+# Durable event spool
+DEFAULT_SPOOL_SIZE_MB: int = 0  # On-disk spool size in MiB (0 = disabled)
+MAX_SPOOL_SIZE_MB: int = 4096  # Upper bound accepted in options
+SPOOL_SEGMENT_SIZE: int = 4 * 1024 * 1024  # Bytes per memory-mapped segment file
+SPOOL_DIRECTORY: str = ".storage/tcp_to_event_converter/spool_{port}"  # Relative to config
+SPOOL_REPLAY_INTERVAL: float = 0.05  # Seconds between replay attempts while events are spooled
+SPOOL_BACKLOG_SIZE: int = 10000  # Events held in memory while the next segment is prepared
+
+# Traffic capture for offline replay
+DEFAULT_CAPTURE_SIZE_MB: int = 0  # On-disk capture of received traffic in MiB (0 = disabled)
+MAX_CAPTURE_SIZE_MB: int = 4096  # Upper bound accepted in options
+CAPTURE_FILES: int = 4  # Capture files rotated through, sharing the capture size
+CAPTURE_DIRECTORY: str = "tcp_to_event_converter/capture_{port}"  # Relative to config
+CAPTURE_FLUSH_SIZE: int = 64 * 1024  # Buffered bytes written out at once
+CAPTURE_FLUSH_INTERVAL: float = 1.0  # Seconds records stay buffered at most
+CAPTURE_BUFFER_LIMIT: int = 4 * 1024 * 1024  # Buffered bytes before records are dropped
+
+# Application-level acknowledgements
+DEFAULT_ACK_MODE: bool = False  # Reply with ACK/NACK per read on stream connections
+
+# Per-device routing
+MAX_ROUTE_MEMO_SIZE: int = 4096  # Distinct messages whose route lookup is memoised
+
 # Event type validation
 EVENT_TYPE_PATTERN: str = r"^[a-z][a-z0-9_]*$"  # Must start with letter, lowercase alphanumeric + underscore
 
 # Connection limits
-MAX_CONNECTIONS: int = 100  # Maximum concurrent TCP connections
+DEFAULT_MAX_CONNECTIONS: int = 100  # Maximum concurrent connections per listener
+MAX_CONNECTION_LIMIT: int = 100000  # Upper bound accepted in options
+OPEN_FILE_HEADROOM: int = 1024  # File descriptors kept free beyond the connection limit
+
+# Connection admission
+DEFAULT_LISTEN_BACKLOG: int = 100  # Pending connections queued by the kernel
+MAX_LISTEN_BACKLOG: int = 65535  # Upper bound accepted in options (capped by somaxconn)
+DEFAULT_ACCEPT_RATE: int = 0  # New connections/second accepted (0 = unlimited)
+MAX_ACCEPT_RATE: int = 100000  # Upper bound accepted in options
+DEFAULT_MAX_CONNECTIONS_PER_SOURCE: int = 0  # Per source address (0 = unlimited)
+DEFAULT_PAUSE_ACCEPTING: bool = False  # Pause accepting when limited instead of rejecting
+ACCEPT_BATCH: int = 64  # Connections accepted per readiness callback
+ACCEPT_ERROR_DELAY: float = 1.0  # Seconds to stop accepting after running out of sockets
+
+# Connection reads
+DEFAULT_READ_BUFFER_SIZE: int = 1024  # Bytes read at a time from a stream connection
+MIN_READ_BUFFER_SIZE: int = 256  # Lower bound accepted in options
+MAX_READ_BUFFER_SIZE: int = 1024 * 1024  # Upper bound accepted in options
+
+# Shutdown and restarts
+SHUTDOWN_TIMEOUT: float = 5.0  # Seconds to drain connections on stop before aborting them
+DEFAULT_SOCKET_HANDOFF: bool = False  # Park the listening socket for the next server on stop
+SOCKET_HANDOFF_TIMEOUT: float = 30.0  # Seconds a parked socket waits to be adopted
+
+# TLS
+DEFAULT_MAX_HANDSHAKES: int = 32  # TLS handshakes in progress before accepting pauses
+MAX_HANDSHAKES_LIMIT: int = 1000  # Upper bound accepted in options
+TLS_HANDSHAKE_TIMEOUT: float = 10.0  # Seconds a client has to complete the handshake
 
-# Timeout constants
-READ_TIMEOUT: float = 30.0  # Seconds to wait for read operations
\ No newline at end of file
+# Idle connections
+DEFAULT_IDLE_TIMEOUT: int = 30  # Seconds without reads before closing (0 = never)
+MAX_IDLE_TIMEOUT: int = 86400  # Upper bound accepted in options
+DEFAULT_HEARTBEAT_INTERVAL: int = 0  # Seconds without reads before a heartbeat (0 = off)
+MAX_HEARTBEAT_INTERVAL: int = 3600  # Upper bound accepted in options
+DEFAULT_TCP_KEEPALIVE: int = 0  # Seconds idle before TCP keepalive probes (0 = off)
+MAX_TCP_KEEPALIVE: int = 7200  # Upper bound accepted in options
+TCP_KEEPALIVE_INTERVAL: int = 10  # Seconds between keepalive probes
+TCP_KEEPALIVE_PROBES: int = 3  # Unanswered probes before the connection is dropped
@@ -0,0 +1,86 @@
+"""UDP datagram listener.
+
+In UDP transport mode a single UDPEventProtocol receives datagrams from every
+sender. There is no handshake, no connection state and no task per sender:
+each datagram is split into frames and every frame goes through the same
+validation and event queueing as frames read from a TCP connection.
+"""
+
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Optional
+
+from .capture import DATAGRAM_CONNECTION
+from .framing import FramingError, split_datagram
+from .rate_limit import RateLimiter
+
+if TYPE_CHECKING:
+    from .tcp_server import TCPServer
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class UDPEventProtocol(asyncio.DatagramProtocol):
+    """Datagram protocol feeding received frames into a TCPServer."""
+
+    __slots__ = ("_server", "_loop", "_limiter", "_limits_generation")
+
+    def __init__(self, server: "TCPServer") -> None:
+        """Initialize the protocol.
+
+        Only the global rate limit applies: without connections there is
+        nothing to apply a per-connection limit to, and since a sender cannot
+        be paused, messages over the limit are dropped unless the overload
+        policy is drop_oldest. The limiter is rebuilt when the limits are
+        reconfigured.
+
+        Args:
+            server: The TCPServer this listener belongs to
+        """
+        self._server = server
+        self._loop = server.hass.loop
+        self._limiter = self._create_limiter()
+        self._limits_generation = server.limits_generation
+
+    def _create_limiter(self) -> Optional[RateLimiter]:
+        """Create a limiter for the current global rate limit, if any."""
+        bucket = self._server._global_bucket
+        if bucket is None:
+            return None
+        return RateLimiter(None, bucket)
+
+    def datagram_received(self, data: bytes, addr: tuple) -> None:
+        """Split a datagram into frames and handle every frame."""
+        received_at = self._loop.time()
+        server = self._server
+        server.metrics.bytes_received += len(data)
+        if server.capture is not None:
+            server.capture.data(DATAGRAM_CONNECTION, received_at, data)
+
+        try:
+            frames = split_datagram(data, server.framing)
+        except FramingError as e:
+            server.metrics.parse_failures += 1
+            server._datagram_log.log("Malformed datagram from %s: %s", addr, e)
+            return
+
+        if self._limits_generation != server.limits_generation:
+            self._limiter = self._create_limiter()
+            self._limits_generation = server.limits_generation
+
+        handle_frame = server._handle_frame
+        limiter = self._limiter
+        if limiter is None:
+            for frame in frames:
+                handle_frame(frame, addr, received_at)
+            return
+
+        for frame in frames:
+            reason = limiter.try_acquire(received_at)
+            if reason is not None and not server._admit_overloaded(reason):
+                continue
+            handle_frame(frame, addr, received_at)
+
+    def error_received(self, exc: Exception) -> None:
+        """Log socket errors reported by the transport."""
+        _LOGGER.warning("UDP listener error: %s", exc)
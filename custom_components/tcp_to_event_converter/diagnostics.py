@@ -0,0 +1,78 @@
+"""Diagnostics support for the TCP to Event Converter integration."""
+
+from typing import Any, Dict
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DATA_DISPATCHER, DATA_SERVERS, DOMAIN
+from .metrics import IngestMetrics
+from .tcp_server import TCPServer
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> Dict[str, Any]:
+    """Return a snapshot of the server configuration and runtime metrics."""
+    domain_data = hass.data[DOMAIN]
+    servers: Dict[str, TCPServer] = domain_data[DATA_SERVERS]
+    server = servers[entry.entry_id]
+    dispatcher = domain_data[DATA_DISPATCHER]
+
+    return {
+        "entry": {
+            "data": dict(entry.data),
+            "options": dict(entry.options),
+        },
+        "server": {
+            "running": (
+                server.server is not None
+                or server.datagram_transport is not None
+                or server.worker_pool is not None
+            ),
+            "transport": server.transport,
+            "socket_path": server.socket_path,
+            "server_mode": server.server_mode,
+            "ingest_workers": server.ingest_workers,
+            "worker_pids": (
+                server.worker_pool.pids if server.worker_pool is not None else []
+            ),
+            "framing": server.framing,
+            "event_queue": {
+                "pending": server.event_queue.pending,
+                "max_batch": server.event_queue.max_batch,
+                "max_delay": server.event_queue.max_delay,
+            },
+            "ack_mode": server.ack_mode,
+            "active_connections": server._connection_count,
+            "max_connections": server.max_connections,
+            "admission": server.admission_stats,
+            "idle": server.idle_reaper.stats,
+            "routes": (
+                server.routing_table.count if server.routing_table is not None else 0
+            ),
+        },
+        "metrics": server.metrics.as_dict(),
+        "tls": server.tls_stats,
+        "drops": server.drop_counts,
+        "frame_cache": (
+            server.frame_cache.stats if server.frame_cache is not None else None
+        ),
+        "coalescer": (
+            server.coalescer.stats if server.coalescer is not None else None
+        ),
+        "spool": server.spool.stats if server.spool is not None else None,
+        "capture": server.capture.stats if server.capture is not None else None,
+        "all_listeners": {
+            "ports": sorted(listener.tcp_port for listener in servers.values()),
+            "metrics": IngestMetrics.combine(
+                listener.metrics for listener in servers.values()
+            ).as_dict(),
+            "dispatcher": {
+                "pending": dispatcher.pending,
+                "fired": dispatcher.fired_count,
+                "batches": dispatcher.batch_count,
+                "queue_size": dispatcher.queue_size,
+            },
+        },
+    }
@@ -0,0 +1,244 @@
+"""Batched event dispatch for the TCP to Event Converter integration.
+
+Parsing and event firing are decoupled by a bounded queue. Validated events
+are appended from the socket handlers and fired on the Home Assistant bus in
+batches, at most once per event loop iteration, so a burst of incoming
+messages cannot monopolise the loop with back-to-back bus dispatches.
+
+A single dispatcher is shared by all listeners of the integration and bounds
+the events they hold in total. Each listener queues its events in its own
+ListenerQueue with its own batching options; the dispatcher drains the
+queues whose batch is due in turn, and a listener that stops only fires its
+own events.
+
+Messages routed to a service call are queued like events and the call is
+scheduled, without waiting for it, when its turn comes.
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from homeassistant.core import HomeAssistant
+
+from .const import (
+    DEFAULT_DISPATCH_MAX_BATCH,
+    DEFAULT_DISPATCH_MAX_DELAY_MS,
+    DISPATCH_QUEUE_SIZE,
+)
+from .metrics import IngestMetrics
+from .routing import RouteTarget
+
+_LOGGER = logging.getLogger(__name__)
+
+# Queued event: (event type or service, event_data, received_at, listener metrics)
+_QueuedEvent = Tuple[RouteTarget, Dict[str, Any], float, Optional[IngestMetrics]]
+
+
+class ListenerQueue:
+    """Events of one listener waiting to be fired by the shared dispatcher.
+
+    The first event queued after an idle period makes the queue due either on
+    the next loop iteration or after ``max_delay`` seconds, or as soon as a
+    full batch is waiting. The dispatcher then fires at most ``max_batch`` of
+    its events per loop iteration until it is empty.
+    """
+
+    __slots__ = (
+        "_dispatcher",
+        "_events",
+        "max_batch",
+        "max_delay",
+        "_handle",
+        "_due",
+    )
+
+    def __init__(
+        self, dispatcher: "EventDispatcher", max_batch: int, max_delay_ms: int
+    ) -> None:
+        """Initialize the queue; use ``EventDispatcher.create_queue``.
+
+        Args:
+            dispatcher: Dispatcher firing the events
+            max_batch: Maximum number of events fired per loop iteration
+            max_delay_ms: Maximum time an event may wait to be batched (0 = next tick)
+        """
+        self._dispatcher = dispatcher
+        self._events: Deque[_QueuedEvent] = deque()
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._due: bool = False
+        self.configure(max_batch, max_delay_ms)
+
+    def configure(self, max_batch: int, max_delay_ms: int) -> None:
+        """Update the batching parameters.
+
+        Args:
+            max_batch: Maximum number of events fired per loop iteration
+            max_delay_ms: Maximum time an event may wait to be batched (0 = next tick)
+        """
+        self.max_batch = max_batch
+        self.max_delay: float = max_delay_ms / 1000.0
+
+    def enqueue(
+        self,
+        event_type: RouteTarget,
+        event_data: Dict[str, Any],
+        received_at: float,
+        metrics: Optional[IngestMetrics] = None,
+    ) -> bool:
+        """Queue an event for batched firing.
+
+        Args:
+            event_type: Event type to fire, or service to call instead
+            event_data: Event payload
+            received_at: Loop time at which the message was read
+            metrics: Metrics of the listener, updated when the event is fired
+
+        Returns:
+            True if the event was queued, False if the dispatcher is full
+        """
+        dispatcher = self._dispatcher
+        if dispatcher.pending >= dispatcher.queue_size:
+            return False
+
+        events = self._events
+        events.append((event_type, event_data, received_at, metrics))
+        dispatcher.pending += 1
+
+        if self._due:
+            return True
+        if self._handle is None:
+            if self.max_delay > 0:
+                self._handle = dispatcher.hass.loop.call_later(
+                    self.max_delay, self._set_due
+                )
+            else:
+                self._set_due()
+        elif len(events) >= self.max_batch:
+            # A full batch is ready, don't wait for the delay to expire
+            self._handle.cancel()
+            self._set_due()
+        return True
+
+    def evict_oldest(self) -> bool:
+        """Discard the oldest pending event of this listener.
+
+        Returns:
+            True if an event was discarded, False if the queue was empty
+        """
+        if not self._events:
+            return False
+        self._events.popleft()
+        self._dispatcher.pending -= 1
+        return True
+
+    def flush(self) -> None:
+        """Fire all pending events of this listener now."""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if self._events:
+            self._dispatcher._fire(self._events, len(self._events))
+
+    @property
+    def pending(self) -> int:
+        """Number of events of this listener waiting to be fired."""
+        return len(self._events)
+
+    def _set_due(self) -> None:
+        """Hand the queue to the dispatcher for draining."""
+        self._handle = None
+        self._due = True
+        self._dispatcher._add_due(self)
+
+
+class EventDispatcher:
+    """Fires the events of all listener queues in batches.
+
+    Queues whose batch is due are drained in turn, up to each queue's
+    ``max_batch`` events per loop iteration. Queues that still hold events
+    stay due and are drained again on the next iteration, letting socket
+    reads interleave with bus dispatch under sustained load.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, queue_size: int = DISPATCH_QUEUE_SIZE
+    ) -> None:
+        """Initialize the dispatcher.
+
+        Args:
+            hass: Home Assistant instance
+            queue_size: Maximum number of events held by all queues together
+                before new ones are refused
+        """
+        self.hass = hass
+        self.queue_size = queue_size
+        self.pending: int = 0
+        self._due: Deque[ListenerQueue] = deque()
+        self._handle: Optional[asyncio.Handle] = None
+        self.fired_count: int = 0
+        self.batch_count: int = 0
+
+    def create_queue(
+        self,
+        max_batch: int = DEFAULT_DISPATCH_MAX_BATCH,
+        max_delay_ms: int = DEFAULT_DISPATCH_MAX_DELAY_MS,
+    ) -> ListenerQueue:
+        """Create the queue of a listener.
+
+        Args:
+            max_batch: Maximum number of events fired per loop iteration
+            max_delay_ms: Maximum time an event may wait to be batched (0 = next tick)
+
+        Returns:
+            A new, empty queue
+        """
+        return ListenerQueue(self, max_batch, max_delay_ms)
+
+    def _add_due(self, queue: ListenerQueue) -> None:
+        """Schedule draining a queue whose batch is due."""
+        self._due.append(queue)
+        if self._handle is None:
+            self._handle = self.hass.loop.call_soon(self._drain)
+
+    def _drain(self) -> None:
+        """Fire up to one batch of every due queue."""
+        self._handle = None
+        due = self._due
+        for _ in range(len(due)):
+            queue = due.popleft()
+            events = queue._events
+            if events:
+                self._fire(events, min(len(events), queue.max_batch))
+            if events:
+                due.append(queue)
+            else:
+                queue._due = False
+
+        if due:
+            # More pending: yield to the loop, then continue on the next tick
+            self._handle = self.hass.loop.call_soon(self._drain)
+
+    def _fire(self, events: Deque[_QueuedEvent], count: int) -> None:
+        """Fire the oldest ``count`` events of a queue."""
+        hass = self.hass
+        fire = hass.bus.async_fire
+        now = hass.loop.time()
+
+        for _ in range(count):
+            event_type, event_data, received_at, metrics = events.popleft()
+            try:
+                if event_type.__class__ is str:
+                    fire(event_type, event_data)
+                else:
+                    event_type.call(hass)
+            except Exception as e:
+                _LOGGER.error("Error firing event %s: %s", event_type, e)
+            if metrics is not None:
+                metrics.events_fired += 1
+                metrics.latency.record(now - received_at)
+
+        self.pending -= count
+        self.fired_count += count
+        self.batch_count += 1
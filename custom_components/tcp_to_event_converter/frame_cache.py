@@ -0,0 +1,118 @@
+"""LRU cache of validated frames for the TCP to Event Converter integration.
+
+Real traffic is dominated by a small set of repeated device_id:button_id:action
+triples. The cache maps the raw frame bytes to the validated, interned field
+tuple and a prebuilt read-only event payload, so repeated frames skip
+decoding, splitting and validation entirely.
+"""
+
+import sys
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from homeassistant.util.read_only_dict import ReadOnlyDict
+
+from .const import DEFAULT_FRAME_CACHE_SIZE
+
+
+class CachedFrame(NamedTuple):
+    """Validated fields and the event payload built from them."""
+
+    fields: Tuple[str, str, str]
+    event_data: ReadOnlyDict
+
+
+def build_cached_frame(fields: Tuple[str, str, str]) -> CachedFrame:
+    """Intern validated fields and build their read-only event payload.
+
+    Args:
+        fields: Validated (device_id, button_id, action) values
+
+    Returns:
+        The CachedFrame for these fields
+    """
+    device_id, button_id, action = (sys.intern(field) for field in fields)
+    return CachedFrame(
+        (device_id, button_id, action),
+        ReadOnlyDict({
+            "device_id": device_id,
+            "button_id": button_id,
+            "action": action,
+        }),
+    )
+
+
+class FrameCache:
+    """Bounded least-recently-used cache keyed on raw frame bytes."""
+
+    __slots__ = ("max_size", "_entries", "hits", "misses", "evictions")
+
+    def __init__(self, max_size: int = DEFAULT_FRAME_CACHE_SIZE) -> None:
+        """Initialize the cache.
+
+        Args:
+            max_size: Maximum number of frames kept
+        """
+        self.max_size = max_size
+        self._entries: "OrderedDict[bytes, CachedFrame]" = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    def get(self, frame: bytes) -> Optional[CachedFrame]:
+        """Look up a frame, marking it as recently used.
+
+        Args:
+            frame: Raw frame bytes
+
+        Returns:
+            The cached entry, or None on a miss
+        """
+        entry = self._entries.get(frame)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(frame)
+        self.hits += 1
+        return entry
+
+    def put(self, frame: bytes, entry: CachedFrame) -> None:
+        """Store a validated frame, evicting the least recently used one if full.
+
+        Args:
+            frame: Raw frame bytes
+            entry: Validated entry for the frame
+        """
+        entries = self._entries
+        entries[frame] = entry
+        if len(entries) > self.max_size:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Remove all cached frames."""
+        self._entries.clear()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Cache size and hit/miss/eviction counters."""
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+def create_frame_cache(max_size: int) -> Optional[FrameCache]:
+    """Create a frame cache of the configured size.
+
+    Args:
+        max_size: Maximum number of frames kept (0 disables caching)
+
+    Returns:
+        A FrameCache, or None if caching is disabled
+    """
+    if max_size <= 0:
+        return None
+    return FrameCache(max_size)
@@ -0,0 +1,406 @@
+"""Incremental stream framers for the TCP to Event Converter integration.
+
+TCP is a byte stream, so a single read may contain several messages or only
+part of one. The framers in this module keep a reusable receive buffer per
+connection, return every complete frame found after each read and carry any
+trailing partial frame over to the next read.
+
+The read framing keeps the behaviour from before framing was configurable,
+where every read was one message: messages may be newline-terminated, but the
+end of a read also ends the last message, so senders that never send a
+terminator keep working.
+
+Datagrams always hold whole frames, so split_datagram splits them without
+keeping any state.
+"""
+
+import struct
+from typing import List, Tuple
+
+from .const import (
+    FRAMING_BINARY,
+    FRAMING_LENGTH_PREFIXED,
+    FRAMING_NEWLINE,
+    FRAMING_READ,
+    MAX_FRAME_SIZE,
+)
+
+# Length prefix used by the length-prefixed framer (unsigned 16-bit, big-endian)
+LENGTH_PREFIX = struct.Struct("!H")
+# Size of a binary record: 1-byte length + !HHB device, button and action ids
+BINARY_RECORD_SIZE: int = 6
+
+
+class FramingError(ValueError):
+    """Raised when a stream cannot be resynchronised and must be closed."""
+
+
+class NewlineFramer:
+    """Split a byte stream into newline-terminated frames.
+
+    Both ``\\n`` and ``\\r\\n`` terminators are accepted. A partial frame that
+    grows beyond ``max_frame_size`` without a terminator is discarded up to
+    the next newline so a misbehaving client cannot grow the buffer forever.
+    """
+
+    __slots__ = ("_buffer", "_max_frame_size", "_discarding", "overflow_count")
+
+    def __init__(self, max_frame_size: int = MAX_FRAME_SIZE) -> None:
+        """Initialize the framer.
+
+        Args:
+            max_frame_size: Maximum number of bytes allowed in a single frame
+        """
+        self._buffer = bytearray()
+        self._max_frame_size = max_frame_size
+        self._discarding = False
+        self.overflow_count = 0
+
+    def feed(self, data: bytes) -> List[bytes]:
+        """Append received data and return all complete frames.
+
+        Args:
+            data: Bytes received from the transport
+
+        Returns:
+            List of complete frames without their line terminators
+        """
+        buffer = self._buffer
+        scan_from = len(buffer)
+        buffer += data
+
+        frames: List[bytes] = []
+        start = 0
+        while True:
+            end = buffer.find(b"\n", scan_from)
+            if end < 0:
+                break
+            if self._discarding:
+                # Drop the tail of an oversized frame
+                self._discarding = False
+            elif end - start <= self._max_frame_size:
+                frame_end = end - 1 if end > start and buffer[end - 1] == 0x0D else end
+                frames.append(bytes(buffer[start:frame_end]))
+            else:
+                self.overflow_count += 1
+            start = scan_from = end + 1
+
+        if start:
+            del buffer[:start]
+
+        if len(buffer) > self._max_frame_size:
+            # No terminator in sight: drop what we have and skip to next newline
+            if not self._discarding:
+                self.overflow_count += 1
+                self._discarding = True
+            buffer.clear()
+
+        return frames
+
+    def flush(self) -> List[bytes]:
+        """Return any buffered partial frame, e.g. when the peer closes.
+
+        Returns:
+            List containing the trailing unterminated frame, if any
+        """
+        buffer = self._buffer
+        if self._discarding or not buffer:
+            self._discarding = False
+            buffer.clear()
+            return []
+        frame = bytes(buffer.rstrip(b"\r"))
+        buffer.clear()
+        return [frame]
+
+    @property
+    def buffered(self) -> int:
+        """Number of bytes currently held in the receive buffer."""
+        return len(self._buffer)
+
+
+class ReadFramer(NewlineFramer):
+    """Split a byte stream into lines, ending the last line with each read.
+
+    Nothing is carried over between reads, so a message split over two reads
+    becomes two frames; senders should terminate messages or switch to
+    newline framing.
+    """
+
+    __slots__ = ()
+
+    def feed(self, data: bytes) -> List[bytes]:
+        """Return every line of a read, including an unterminated last one.
+
+        Args:
+            data: Bytes received from the transport
+
+        Returns:
+            List of frames without their line terminators
+        """
+        frames = NewlineFramer.feed(self, data)
+        frames.extend(self.flush())
+        return frames
+
+
+class LengthPrefixedFramer:
+    """Split a byte stream into frames prefixed with a 2-byte length header.
+
+    Each frame is encoded as an unsigned 16-bit big-endian length followed by
+    that many payload bytes. Because an invalid length leaves no way to find
+    the next frame boundary, oversized frames raise FramingError.
+    """
+
+    __slots__ = ("_buffer", "_max_frame_size", "overflow_count")
+
+    def __init__(self, max_frame_size: int = MAX_FRAME_SIZE) -> None:
+        """Initialize the framer.
+
+        Args:
+            max_frame_size: Maximum number of payload bytes in a single frame
+        """
+        self._buffer = bytearray()
+        self._max_frame_size = max_frame_size
+        self.overflow_count = 0
+
+    def feed(self, data: bytes) -> List[bytes]:
+        """Append received data and return all complete frames.
+
+        Args:
+            data: Bytes received from the transport
+
+        Returns:
+            List of complete frame payloads
+
+        Raises:
+            FramingError: If a frame header announces an oversized payload
+        """
+        buffer = self._buffer
+        buffer += data
+
+        frames: List[bytes] = []
+        header_size = LENGTH_PREFIX.size
+        available = len(buffer)
+        offset = 0
+        while available - offset >= header_size:
+            (length,) = LENGTH_PREFIX.unpack_from(buffer, offset)
+            if length > self._max_frame_size:
+                self.overflow_count += 1
+                buffer.clear()
+                raise FramingError(
+                    f"frame length {length} exceeds maximum {self._max_frame_size}"
+                )
+            end = offset + header_size + length
+            if end > available:
+                break
+            frames.append(bytes(buffer[offset + header_size:end]))
+            offset = end
+
+        if offset:
+            del buffer[:offset]
+
+        return frames
+
+    def flush(self) -> List[bytes]:
+        """Discard any incomplete trailing frame.
+
+        A truncated length-prefixed frame is never valid, so nothing is
+        returned.
+
+        Returns:
+            An empty list
+        """
+        self._buffer.clear()
+        return []
+
+    @property
+    def buffered(self) -> int:
+        """Number of bytes currently held in the receive buffer."""
+        return len(self._buffer)
+
+
+class BinaryFramer:
+    """Split a byte stream into binary records with a 1-byte length header.
+
+    A record is its payload length followed by the payload, so every length
+    is valid and the stream can never desynchronise. Runs of standard
+    6-byte records, the normal case, are sliced without a per-record header
+    check.
+    """
+
+    __slots__ = ("_buffer", "overflow_count")
+
+    def __init__(self, max_frame_size: int = MAX_FRAME_SIZE) -> None:
+        """Initialize the framer.
+
+        Args:
+            max_frame_size: Unused, a 1-byte length cannot exceed it
+        """
+        self._buffer = bytearray()
+        self.overflow_count = 0
+
+    def feed(self, data: bytes) -> List[bytes]:
+        """Append received data and return all complete record payloads.
+
+        Args:
+            data: Bytes received from the transport
+
+        Returns:
+            List of complete record payloads
+        """
+        buffer = self._buffer
+        buffer += data
+        frames, offset = _split_binary(buffer)
+        if offset:
+            del buffer[:offset]
+        return frames
+
+    def flush(self) -> List[bytes]:
+        """Discard any incomplete trailing record.
+
+        Returns:
+            An empty list
+        """
+        self._buffer.clear()
+        return []
+
+    @property
+    def buffered(self) -> int:
+        """Number of bytes currently held in the receive buffer."""
+        return len(self._buffer)
+
+
+def _split_binary(buffer: bytes) -> Tuple[List[bytes], int]:
+    """Split complete binary records off the start of a buffer.
+
+    Args:
+        buffer: Received bytes
+
+    Returns:
+        Tuple of (record payloads, number of bytes consumed)
+    """
+    available = len(buffer)
+    record_size = BINARY_RECORD_SIZE
+    whole = available - available % record_size
+    if whole and buffer[0:whole:record_size].count(record_size - 1) == whole // record_size:
+        # Every header in the run announces a standard record: one copy of
+        # the run, then one slice per record
+        run = bytes(buffer[:whole])
+        frames = [run[i:i + record_size - 1] for i in range(1, whole, record_size)]
+        offset = whole
+    else:
+        frames = []
+        offset = 0
+
+    while offset < available:
+        end = offset + 1 + buffer[offset]
+        if end > available:
+            break
+        frames.append(bytes(buffer[offset + 1:end]))
+        offset = end
+
+    return frames, offset
+
+
+def split_datagram(
+    data: bytes, mode: str, max_frame_size: int = MAX_FRAME_SIZE
+) -> List[bytes]:
+    """Split one datagram into frames.
+
+    In newline and read mode the final frame does not need a terminator.
+    Oversized newline frames are skipped like in NewlineFramer.
+
+    Args:
+        data: Datagram payload
+        mode: One of the FRAMING_* constants
+        max_frame_size: Maximum number of bytes allowed in a single frame
+
+    Returns:
+        List of frames in datagram order
+
+    Raises:
+        FramingError: If a length-prefixed or binary datagram is truncated,
+            or a length-prefixed frame is oversized
+        ValueError: If the framing mode is unknown
+    """
+    if mode == FRAMING_NEWLINE or mode == FRAMING_READ:
+        frames = data.split(b"\n")
+        if not frames[-1]:
+            frames.pop()  # Terminated final frame
+        return [
+            frame[:-1] if frame[-1:] == b"\r" else frame
+            for frame in frames
+            if len(frame) <= max_frame_size
+        ]
+
+    if mode == FRAMING_LENGTH_PREFIXED:
+        frames = []
+        header_size = LENGTH_PREFIX.size
+        view = memoryview(data)
+        offset = 0
+        while offset < len(data):
+            if len(data) - offset < header_size:
+                raise FramingError("truncated length prefix")
+            (length,) = LENGTH_PREFIX.unpack_from(data, offset)
+            if length > max_frame_size:
+                raise FramingError(
+                    f"frame length {length} exceeds maximum {max_frame_size}"
+                )
+            end = offset + header_size + length
+            if end > len(data):
+                raise FramingError("truncated frame")
+            frames.append(bytes(view[offset + header_size:end]))
+            offset = end
+        return frames
+
+    if mode == FRAMING_BINARY:
+        frames, offset = _split_binary(data)
+        if offset != len(data):
+            raise FramingError("truncated binary record")
+        return frames
+
+    raise ValueError(f"Unknown framing mode: {mode}")
+
+
+def heartbeat_frame(mode: str) -> bytes:
+    """Encode an empty frame, used as a heartbeat, in a framing mode.
+
+    Args:
+        mode: One of the FRAMING_* constants
+
+    Returns:
+        The encoded empty frame
+
+    Raises:
+        ValueError: If the framing mode is unknown
+    """
+    if mode == FRAMING_NEWLINE or mode == FRAMING_READ:
+        return b"\n"
+    if mode == FRAMING_LENGTH_PREFIXED:
+        return LENGTH_PREFIX.pack(0)
+    if mode == FRAMING_BINARY:
+        return b"\x00"
+    raise ValueError(f"Unknown framing mode: {mode}")
+
+
+def create_framer(mode: str, max_frame_size: int = MAX_FRAME_SIZE):
+    """Create a framer for the configured framing mode.
+
+    Args:
+        mode: One of the FRAMING_* constants
+        max_frame_size: Maximum number of bytes allowed in a single frame
+
+    Returns:
+        A new framer instance
+
+    Raises:
+        ValueError: If the framing mode is unknown
+    """
+    if mode == FRAMING_NEWLINE:
+        return NewlineFramer(max_frame_size)
+    if mode == FRAMING_READ:
+        return ReadFramer(max_frame_size)
+    if mode == FRAMING_LENGTH_PREFIXED:
+        return LengthPrefixedFramer(max_frame_size)
+    if mode == FRAMING_BINARY:
+        return BinaryFramer(max_frame_size)
+    raise ValueError(f"Unknown framing mode: {mode}")
@@ -0,0 +1,81 @@
+"""Listening socket handoff between server instances.
+
+Reloading a config entry stops its TCPServer and starts a new one. Closing
+the listening socket in between refuses every connection attempted before
+the new server has bound the port again. With socket handoff enabled the
+stopping server parks its listening socket here instead: the socket stays
+bound and listening, so connections attempted meanwhile wait in the kernel's
+listen backlog, and the next server started on the same port adopts it and
+accepts them.
+
+A parked socket that is not adopted within SOCKET_HANDOFF_TIMEOUT (the entry
+was removed, or no longer listens on TCP) is closed.
+"""
+
+import asyncio
+import logging
+import socket
+from typing import Dict, Optional, Tuple
+
+from homeassistant.core import HomeAssistant
+
+from .const import DATA_HANDOFF, SOCKET_HANDOFF_TIMEOUT
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def park_socket(hass: HomeAssistant, port: int, sock: socket.socket) -> None:
+    """Keep a listening socket open for the next server on its port.
+
+    Args:
+        hass: Home Assistant instance
+        port: Port the socket is bound to
+        sock: Listening socket, no longer read by the event loop
+    """
+    stale = _take(hass, port)
+    if stale is not None:
+        stale.close()
+    parked = hass.data.setdefault(DATA_HANDOFF, {})
+    parked[port] = (
+        sock,
+        hass.loop.call_later(SOCKET_HANDOFF_TIMEOUT, _close_parked, hass, port),
+    )
+    _LOGGER.debug("Parked listening socket of port %d for the next server", port)
+
+
+def adopt_socket(hass: HomeAssistant, port: int) -> Optional[socket.socket]:
+    """Take over the listening socket parked for a port.
+
+    Args:
+        hass: Home Assistant instance
+        port: Port to listen on
+
+    Returns:
+        The parked socket, or None if there is none
+    """
+    sock = _take(hass, port)
+    if sock is not None:
+        _LOGGER.debug("Adopted parked listening socket of port %d", port)
+    return sock
+
+
+def _take(hass: HomeAssistant, port: int) -> Optional[socket.socket]:
+    """Remove the socket parked for a port and cancel its close timer."""
+    parked: Optional[Dict[int, Tuple[socket.socket, asyncio.TimerHandle]]] = (
+        hass.data.get(DATA_HANDOFF)
+    )
+    if not parked or port not in parked:
+        return None
+    sock, handle = parked.pop(port)
+    handle.cancel()
+    if not parked:
+        hass.data.pop(DATA_HANDOFF)
+    return sock
+
+
+def _close_parked(hass: HomeAssistant, port: int) -> None:
+    """Close the socket parked for a port if it was not adopted in time."""
+    sock = _take(hass, port)
+    if sock is not None:
+        sock.close()
+        _LOGGER.debug("Closed listening socket of port %d not adopted in time", port)
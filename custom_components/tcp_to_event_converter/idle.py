@@ -0,0 +1,209 @@
+"""Idle connection reaping, heartbeats and TCP keepalive.
+
+Wrapping every read in ``asyncio.wait_for`` creates a timeout handle (and a
+task switch) per read per connection. The IdleReaper instead only records the
+time of the last read and keeps one timer per connection on the server's
+shared TimerWheel. A timer that fires before its connection has been idle
+long enough is simply rescheduled, so a busy connection costs one wheel entry
+per idle period, however many reads it makes.
+
+Connections idle for the idle timeout are closed. Before that, with a
+heartbeat interval set, the server writes a heartbeat (an empty frame in the
+connection's framing) after each interval of silence, so clients can tell a
+quiet server from a dead one. Clients keep a connection open by sending
+heartbeats of their own, which are not fired as events.
+"""
+
+import logging
+import math
+import socket
+from typing import Any, Callable, Dict, Optional, Set
+
+from .const import TCP_KEEPALIVE_INTERVAL, TCP_KEEPALIVE_PROBES
+from .timer_wheel import TimerWheel, WheelTimer
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class IdleEntry:
+    """Activity of one connection watched by an IdleReaper."""
+
+    __slots__ = ("last_activity", "heartbeat_at", "timer", "on_idle", "write")
+
+    def __init__(
+        self,
+        now: float,
+        on_idle: Callable[[], bool],
+        write: Optional[Callable[[bytes], Any]],
+    ) -> None:
+        """Initialize the entry."""
+        # Updated by the connection on every read
+        self.last_activity = now
+        self.heartbeat_at = now
+        self.timer: Optional[WheelTimer] = None
+        self.on_idle = on_idle
+        self.write = write
+
+
+class IdleReaper:
+    """Closes idle connections and sends heartbeats using a TimerWheel."""
+
+    __slots__ = (
+        "_wheel",
+        "idle_timeout",
+        "heartbeat_interval",
+        "heartbeat",
+        "_entries",
+        "closed",
+        "heartbeats_sent",
+    )
+
+    def __init__(
+        self,
+        wheel: TimerWheel,
+        idle_timeout: float,
+        heartbeat_interval: float,
+        heartbeat: bytes,
+    ) -> None:
+        """Initialize the reaper.
+
+        Args:
+            wheel: Timer wheel shared with the rest of the server
+            idle_timeout: Seconds without reads before a connection is
+                closed (0 = never)
+            heartbeat_interval: Seconds without reads before a heartbeat is
+                written, repeated every interval (0 = no heartbeats)
+            heartbeat: Encoded heartbeat frame
+        """
+        self._wheel = wheel
+        self.idle_timeout = idle_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat = heartbeat
+        self._entries: Set[IdleEntry] = set()
+        self.closed: int = 0
+        self.heartbeats_sent: int = 0
+
+    def watch(
+        self,
+        on_idle: Callable[[], bool],
+        write: Optional[Callable[[bytes], Any]] = None,
+    ) -> IdleEntry:
+        """Start watching a new connection.
+
+        Args:
+            on_idle: Called when the connection has been idle for the idle
+                timeout; returns False to keep it open (e.g. while reading is
+                paused by the server itself)
+            write: Writes to the connection, or None to send no heartbeats
+
+        Returns:
+            The entry whose ``last_activity`` the connection updates on reads
+        """
+        now = self._wheel.time()
+        entry = IdleEntry(now, on_idle, write)
+        self._entries.add(entry)
+        self._schedule(entry, now)
+        return entry
+
+    def unwatch(self, entry: IdleEntry) -> None:
+        """Stop watching a closed connection."""
+        self._entries.discard(entry)
+        if entry.timer is not None:
+            self._wheel.cancel(entry.timer)
+            entry.timer = None
+
+    def configure(self, idle_timeout: float, heartbeat_interval: float) -> None:
+        """Change the idle timeout and heartbeat interval of every connection.
+
+        Args:
+            idle_timeout: Seconds without reads before a connection is
+                closed (0 = never)
+            heartbeat_interval: Seconds without reads before a heartbeat is
+                written (0 = no heartbeats)
+        """
+        if (idle_timeout, heartbeat_interval) == (self.idle_timeout, self.heartbeat_interval):
+            return
+        self.idle_timeout = idle_timeout
+        self.heartbeat_interval = heartbeat_interval
+        wheel = self._wheel
+        now = wheel.time()
+        for entry in self._entries:
+            if entry.timer is not None:
+                wheel.cancel(entry.timer)
+                entry.timer = None
+            self._schedule(entry, now)
+
+    @property
+    def watched(self) -> int:
+        """Number of connections being watched."""
+        return len(self._entries)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Counters for diagnostics."""
+        return {
+            "watched": self.watched,
+            "idle_timeout": self.idle_timeout,
+            "heartbeat_interval": self.heartbeat_interval,
+            "closed": self.closed,
+            "heartbeats_sent": self.heartbeats_sent,
+        }
+
+    def _schedule(self, entry: IdleEntry, now: float) -> None:
+        """Schedule the next check of an entry, if any is needed."""
+        due = math.inf
+        if self.idle_timeout:
+            due = entry.last_activity + self.idle_timeout
+        if self.heartbeat_interval and entry.write is not None:
+            due = min(
+                due,
+                max(entry.last_activity, entry.heartbeat_at) + self.heartbeat_interval,
+            )
+        if due != math.inf:
+            entry.timer = self._wheel.schedule(due - now, self._check, entry)
+
+    def _check(self, entry: IdleEntry) -> None:
+        """Close or heartbeat an entry that has been idle long enough."""
+        entry.timer = None
+        now = self._wheel.time()
+        idle_timeout = self.idle_timeout
+        if idle_timeout and now - entry.last_activity >= idle_timeout:
+            if entry.on_idle():
+                self.closed += 1
+                return
+            entry.last_activity = now
+        elif (
+            self.heartbeat_interval
+            and entry.write is not None
+            and now - max(entry.last_activity, entry.heartbeat_at)
+            >= self.heartbeat_interval
+        ):
+            entry.heartbeat_at = now
+            entry.write(self.heartbeat)
+            self.heartbeats_sent += 1
+        self._schedule(entry, now)
+
+
+def set_keepalive(sock: Any, idle: int) -> None:
+    """Enable TCP keepalive probes on a connected socket.
+
+    Options missing on the platform are skipped; errors are logged, not
+    raised, since keepalive is only an aid to detecting dead peers.
+
+    Args:
+        sock: Connected TCP socket
+        idle: Seconds of idleness before the first probe
+    """
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        # TCP_KEEPALIVE is the macOS name of TCP_KEEPIDLE
+        idle_option = getattr(socket, "TCP_KEEPIDLE", getattr(socket, "TCP_KEEPALIVE", None))
+        for option, value in (
+            (idle_option, idle),
+            (getattr(socket, "TCP_KEEPINTVL", None), TCP_KEEPALIVE_INTERVAL),
+            (getattr(socket, "TCP_KEEPCNT", None), TCP_KEEPALIVE_PROBES),
+        ):
+            if option is not None:
+                sock.setsockopt(socket.IPPROTO_TCP, option, value)
+    except OSError as e:
+        _LOGGER.debug("Could not enable TCP keepalive: %s", e)
@@ -0,0 +1,388 @@
+"""Ingest worker process for multi-core operation.
+
+Each worker binds the listening port with SO_REUSEPORT, so the kernel spreads
+incoming connections across workers. Workers frame and validate messages on
+their own event loop and ship compact batches of pre-validated events to the
+Home Assistant process over their stdout pipe. Connections are accepted
+through the same admission-controlled Listener as in Home Assistant, which
+also terminates TLS when a certificate is given.
+
+The records written to the pipe are defined in worker_wire. WorkerPool starts
+this module as a script rather than with ``python -m``, so that the package
+``__init__`` and Home Assistant are never imported into the workers; only
+modules without Home Assistant imports may be imported here.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import sys
+import time
+from typing import Any, Dict, List, Optional, Set
+
+if __name__ == "__main__" and not __package__:
+    # Started as a script: make the sibling modules importable as this
+    # package without running its __init__
+    import types
+
+    _DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+    if sys.path and os.path.abspath(sys.path[0]) == _DIRECTORY:
+        del sys.path[0]  # Don't let the sibling modules shadow top-level ones
+    __package__ = f"custom_components.{os.path.basename(_DIRECTORY)}"
+    _PACKAGE = types.ModuleType(__package__)
+    _PACKAGE.__path__ = [_DIRECTORY]
+    sys.modules[__package__] = _PACKAGE
+
+from .admission import AdmissionController, Listener, raise_open_file_limit
+from .const import (
+    DEFAULT_HEARTBEAT_INTERVAL,
+    DEFAULT_IDLE_TIMEOUT,
+    DEFAULT_MAX_CONNECTIONS,
+    DEFAULT_MAX_HANDSHAKES,
+    DEFAULT_READ_BUFFER_SIZE,
+    DEFAULT_TCP_KEEPALIVE,
+    FRAMING_MODES,
+    LISTEN_HOST,
+    MAX_FRAME_SIZE,
+    OPEN_FILE_HEADROOM,
+)
+from .framing import FramingError, create_framer, heartbeat_frame
+from .idle import IdleEntry, IdleReaper, set_keepalive
+from .metrics import HandshakeMetrics
+from .timer_wheel import TimerWheel
+from .tls import create_server_context
+from .validator import ValidationCode, validate_frame
+from .worker_wire import (
+    MSG_EVENTS,
+    MSG_HANDSHAKES,
+    MSG_READY,
+    MSG_STATS,
+    STATS,
+    TIMESTAMP,
+    encode_fields,
+    encode_handshakes,
+    encode_record,
+)
+
+# Seconds between counter updates sent to Home Assistant
+STATS_INTERVAL: float = 1.0
+# Maximum encoded events per EVENTS record
+MAX_EVENTS_PER_RECORD: int = 1000
+# Listen backlog of each worker socket
+WORKER_BACKLOG: int = 1024
+
+
+class WorkerIngest:
+    """Collects validated events and counters and writes them to the pipe."""
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        idle_reaper: IdleReaper,
+        tcp_keepalive: int,
+        read_buffer_size: int,
+    ) -> None:
+        """Initialize the collector."""
+        self.loop = loop
+        self.idle_reaper = idle_reaper
+        self.tcp_keepalive = tcp_keepalive
+        # Receive buffer shared by all connections of the worker
+        self.receive_buffer = memoryview(bytearray(read_buffer_size))
+        self.output: Optional[asyncio.WriteTransport] = None
+        self.listener: Optional[Listener] = None
+        self.transports: Set[asyncio.Transport] = set()
+        self.paused: bool = False
+        self._events: List[bytes] = []
+        self._event_count: int = 0
+        self._flush_handle: Optional[asyncio.Handle] = None
+        self._encoded: Dict[bytes, bytes] = {}
+        self.bytes_received: int = 0
+        self.messages_received: int = 0
+        self.parse_failures: int = 0
+        self.validation_failures: int = 0
+        self.connections_accepted: int = 0
+        self.connections_rejected: int = 0
+        self.connections: int = 0
+
+    def handle_frame(self, frame: bytes, received_at: float) -> None:
+        """Validate a frame and queue its encoded event."""
+        encoded = self._encoded.get(frame)
+        if encoded is None:
+            if not frame.strip():
+                return  # Heartbeat (blank lines count as one)
+            code, fields, _ = validate_frame(frame)
+            if code is not ValidationCode.OK:
+                self.messages_received += 1
+                if code in (ValidationCode.NOT_UTF8, ValidationCode.WRONG_PART_COUNT):
+                    self.parse_failures += 1
+                else:
+                    self.validation_failures += 1
+                return
+            encoded = encode_fields(fields)
+            if len(self._encoded) < MAX_EVENTS_PER_RECORD * 4:
+                self._encoded[frame] = encoded
+        self.messages_received += 1
+        self._events.append(TIMESTAMP.pack(received_at) + encoded)
+        self._event_count += 1
+        if self._flush_handle is None:
+            self._flush_handle = self.loop.call_soon(self.flush)
+        elif self._event_count >= MAX_EVENTS_PER_RECORD:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write all pending events as one EVENTS record."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._events:
+            self.output.write(encode_record(MSG_EVENTS, b"".join(self._events)))
+            self._events.clear()
+            self._event_count = 0
+
+    def pause(self) -> None:
+        """Stop reading from clients while Home Assistant catches up."""
+        self.paused = True
+        for transport in self.transports:
+            transport.pause_reading()
+
+    def resume(self) -> None:
+        """Resume reading from clients."""
+        self.paused = False
+        for transport in self.transports:
+            if not transport.is_closing():
+                transport.resume_reading()
+
+    def send_stats(self) -> None:
+        """Write counter deltas since the previous call and reschedule."""
+        self.output.write(encode_record(MSG_STATS, STATS.pack(
+            self.bytes_received,
+            self.messages_received,
+            self.parse_failures,
+            self.validation_failures,
+            self.connections_accepted,
+            self.connections_rejected,
+            self.connections,
+        )))
+        self.bytes_received = 0
+        self.messages_received = 0
+        self.parse_failures = 0
+        self.validation_failures = 0
+        self.connections_accepted = 0
+        self.connections_rejected = 0
+        handshakes = self.listener.handshake_metrics
+        if handshakes is not None and (handshakes.latency.count or handshakes.failed):
+            self.output.write(
+                encode_record(MSG_HANDSHAKES, encode_handshakes(handshakes))
+            )
+            self.listener.handshake_metrics = HandshakeMetrics()
+        self.loop.call_later(STATS_INTERVAL, self.send_stats)
+
+    def reject(self, reason: str, peer: Any) -> None:
+        """Count a connection refused by admission control."""
+        self.connections_rejected += 1
+
+
+class PipeProtocol(asyncio.Protocol):
+    """Write side of the pipe to Home Assistant, propagating backpressure."""
+
+    def __init__(self, ingest: WorkerIngest) -> None:
+        """Initialize the protocol."""
+        self._ingest = ingest
+        self.closed: asyncio.Future = ingest.loop.create_future()
+
+    def pause_writing(self) -> None:
+        """Pipe buffer is full: pause all client connections."""
+        self._ingest.pause()
+
+    def resume_writing(self) -> None:
+        """Pipe buffer drained: resume all client connections."""
+        self._ingest.resume()
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        """Record that everything written has been flushed or lost."""
+        if not self.closed.done():
+            self.closed.set_result(None)
+
+
+class WorkerProtocol(asyncio.BufferedProtocol):
+    """Connection handler running inside a worker process."""
+
+    __slots__ = (
+        "_ingest",
+        "_framer",
+        "_transport",
+        "_peer",
+        "_idle",
+        "_accepted",
+    )
+
+    def __init__(self, ingest: WorkerIngest, framing: str) -> None:
+        """Initialize the protocol."""
+        self._ingest = ingest
+        self._framer = create_framer(framing, MAX_FRAME_SIZE)
+        self._transport: Optional[asyncio.Transport] = None
+        self._peer = None
+        self._idle: Optional[IdleEntry] = None
+        self._accepted: bool = False
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        """Register a connection admitted by the listener."""
+        self._transport = transport
+        self._peer = transport.get_extra_info("peername")
+        ingest = self._ingest
+        self._accepted = True
+        ingest.connections_accepted += 1
+        ingest.connections += 1
+        ingest.transports.add(transport)
+        if ingest.paused:
+            transport.pause_reading()
+        if ingest.tcp_keepalive:
+            set_keepalive(transport.get_extra_info("socket"), ingest.tcp_keepalive)
+        self._idle = ingest.idle_reaper.watch(self._on_idle, transport.write)
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        """Read into the worker's shared receive buffer."""
+        return self._ingest.receive_buffer
+
+    def buffer_updated(self, nbytes: int) -> None:
+        """Frame and validate received data."""
+        ingest = self._ingest
+        received_at = time.monotonic()
+        self._idle.last_activity = received_at
+        ingest.bytes_received += nbytes
+        try:
+            frames = self._framer.feed(ingest.receive_buffer[:nbytes])
+        except FramingError:
+            ingest.parse_failures += 1
+            self._transport.close()
+            return
+        for frame in frames:
+            ingest.handle_frame(frame, received_at)
+
+    def eof_received(self) -> bool:
+        """Handle a final unterminated frame and close."""
+        received_at = time.monotonic()
+        for frame in self._framer.flush():
+            self._ingest.handle_frame(frame, received_at)
+        return False
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        """Release the connection."""
+        if not self._accepted:
+            return
+        self._accepted = False
+        self._ingest.connections -= 1
+        self._ingest.transports.discard(self._transport)
+        self._ingest.idle_reaper.unwatch(self._idle)
+        self._ingest.listener.release(self._peer)
+
+    def _on_idle(self) -> bool:
+        """Close the connection after the idle timeout unless reading is paused."""
+        if self._ingest.paused:
+            return False
+        self.eof_received()
+        self._transport.close()
+        return True
+
+
+def create_reuseport_socket(host: str, port: int) -> socket.socket:
+    """Create a listening TCP socket bound with SO_REUSEPORT.
+
+    Raises:
+        OSError: If the platform lacks SO_REUSEPORT or the bind fails
+    """
+    if not hasattr(socket, "SO_REUSEPORT"):
+        raise OSError("SO_REUSEPORT is not supported on this platform")
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind((host, port))
+        sock.listen(WORKER_BACKLOG)
+        sock.setblocking(False)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+async def run_worker(args: argparse.Namespace) -> None:
+    """Serve connections until Home Assistant closes our stdin."""
+    loop = asyncio.get_running_loop()
+    idle_reaper = IdleReaper(
+        TimerWheel(loop),
+        args.idle_timeout,
+        args.heartbeat_interval,
+        heartbeat_frame(args.framing),
+    )
+    ingest = WorkerIngest(loop, idle_reaper, args.tcp_keepalive, args.read_buffer_size)
+    raise_open_file_limit(args.max_connections + OPEN_FILE_HEADROOM)
+    output, pipe = await loop.connect_write_pipe(
+        lambda: PipeProtocol(ingest), os.fdopen(sys.stdout.fileno(), "wb", 0)
+    )
+    ingest.output = output
+
+    ssl_context = None
+    if args.tls_certfile:
+        ssl_context = create_server_context(args.tls_certfile, args.tls_keyfile)
+    sock = create_reuseport_socket(args.host, args.port)
+    listener = Listener(
+        loop,
+        sock,
+        lambda: WorkerProtocol(ingest, args.framing),
+        AdmissionController(args.max_connections, 0, 0, loop.time()),
+        False,
+        ingest.reject,
+        ssl_context,
+        args.max_handshakes,
+        HandshakeMetrics() if ssl_context is not None else None,
+    )
+    ingest.listener = listener
+    listener.start()
+    output.write(encode_record(MSG_READY))
+    loop.call_later(STATS_INTERVAL, ingest.send_stats)
+
+    # Home Assistant holds the other end of stdin; EOF means we must exit
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(
+        lambda: asyncio.StreamReaderProtocol(reader), sys.stdin
+    )
+    await reader.read()
+
+    listener.close()
+    for transport in list(ingest.transports):
+        transport.close()
+    ingest.flush()
+    ingest.send_stats()
+    output.close()
+    await pipe.closed
+
+
+def main() -> None:
+    """Parse arguments and run the worker."""
+    parser = argparse.ArgumentParser(description="TCP to Event Converter ingest worker")
+    parser.add_argument("--host", default=LISTEN_HOST)
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--framing", choices=FRAMING_MODES, required=True)
+    parser.add_argument("--max-connections", type=int, default=DEFAULT_MAX_CONNECTIONS)
+    parser.add_argument("--read-buffer-size", type=int, default=DEFAULT_READ_BUFFER_SIZE)
+    parser.add_argument("--idle-timeout", type=int, default=DEFAULT_IDLE_TIMEOUT)
+    parser.add_argument("--heartbeat-interval", type=int, default=DEFAULT_HEARTBEAT_INTERVAL)
+    parser.add_argument("--tcp-keepalive", type=int, default=DEFAULT_TCP_KEEPALIVE)
+    parser.add_argument("--tls-certfile", default="")
+    parser.add_argument("--tls-keyfile", default="")
+    parser.add_argument("--max-handshakes", type=int, default=DEFAULT_MAX_HANDSHAKES)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, stream=sys.stderr)
+    try:
+        asyncio.run(run_worker(args))
+    except OSError as e:
+        print(f"Ingest worker failed on port {args.port}: {e}", file=sys.stderr)
+        # The exit status carries the errno back to WorkerPool
+        sys.exit(e.errno or 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Logging helpers for the per-message hot path.
+
+Log arguments are wrapped so that sanitizing only happens when a record is
+actually emitted, and LogSampler caps how many lines a noisy log site can
+produce per interval so heavy traffic does not spend its CPU on logging.
+"""
+
+import logging
+import time
+from typing import Any, Union
+
+from .const import LOG_SAMPLE_INTERVAL
+
+# Maximum length of a sanitized message in the logs
+MAX_LOG_LENGTH: int = 200
+
+
+def sanitize_for_log(message: str, max_length: int = MAX_LOG_LENGTH) -> str:
+    """Sanitize a message for safe logging.
+
+    Removes control characters and limits length to prevent:
+    - Log injection attacks
+    - Log file bloat
+    - Terminal control sequence abuse
+
+    Args:
+        message: The message to sanitize
+        max_length: Maximum number of characters kept
+
+    Returns:
+        Sanitized message safe for logging
+    """
+    truncated = len(message) > max_length
+    if truncated:
+        # Only the part that ends up in the log needs sanitizing
+        message = message[:max_length]
+
+    if not message.isprintable():
+        # Replace tabs, newlines and other control characters to prevent log injection
+        message = "".join(
+            char if char.isprintable() else (" " if char in "\t\n" else "?")
+            for char in message
+        )
+
+    if truncated:
+        message += "... (truncated)"
+
+    return message
+
+
+class LazySanitized:
+    """Log argument that decodes and sanitizes its value only when formatted."""
+
+    __slots__ = ("_value", "_max_length")
+
+    def __init__(
+        self, value: Union[bytes, str], max_length: int = MAX_LOG_LENGTH
+    ) -> None:
+        """Wrap a raw value.
+
+        Args:
+            value: Raw frame bytes or decoded message
+            max_length: Maximum number of characters kept
+        """
+        self._value = value
+        self._max_length = max_length
+
+    def __str__(self) -> str:
+        """Return the sanitized value."""
+        value = self._value
+        if isinstance(value, bytes):
+            value = value.decode("utf-8", "replace")
+        return sanitize_for_log(value.strip(), self._max_length)
+
+
+class LogSampler:
+    """Emit at most ``max_per_interval`` records per interval from one log site.
+
+    Records over the limit are counted and summarized in a single line when
+    the next interval starts. A limit of 0 logs every record.
+    """
+
+    __slots__ = (
+        "_logger",
+        "_level",
+        "max_per_interval",
+        "_interval",
+        "_window_start",
+        "_count",
+        "_suppressed",
+    )
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        level: int,
+        max_per_interval: int = 0,
+        interval: float = LOG_SAMPLE_INTERVAL,
+    ) -> None:
+        """Initialize the sampler.
+
+        Args:
+            logger: Logger to emit records to
+            level: Level of the records
+            max_per_interval: Maximum records per interval (0 = unlimited)
+            interval: Sampling interval in seconds
+        """
+        self._logger = logger
+        self._level = level
+        self.max_per_interval = max_per_interval
+        self._interval = interval
+        self._window_start: float = 0.0
+        self._count: int = 0
+        self._suppressed: int = 0
+
+    def log(self, msg: str, *args: Any) -> None:
+        """Log a record unless the level is disabled or the sample is full.
+
+        Args:
+            msg: Log message format string
+            *args: Format arguments, only formatted if the record is emitted
+        """
+        logger = self._logger
+        if not logger.isEnabledFor(self._level):
+            return
+
+        if self.max_per_interval <= 0:
+            logger.log(self._level, msg, *args)
+            return
+
+        now = time.monotonic()
+        if now - self._window_start >= self._interval:
+            if self._suppressed:
+                logger.log(
+                    self._level,
+                    "%d similar log messages suppressed in the last %d seconds",
+                    self._suppressed, self._interval
+                )
+            self._window_start = now
+            self._count = 0
+            self._suppressed = 0
+
+        if self._count < self.max_per_interval:
+            self._count += 1
+            logger.log(self._level, msg, *args)
+        else:
+            self._suppressed += 1
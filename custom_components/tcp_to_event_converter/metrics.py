@@ -0,0 +1,199 @@
+"""Runtime instrumentation for the TCP to Event Converter integration.
+
+Counters are plain integer attributes incremented inline in the ingest path
+and latencies are recorded into fixed-bucket histograms, so instrumentation
+costs a few attribute updates per message. Snapshots are exposed through the
+sensor platform and the config entry diagnostics.
+"""
+
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+# Upper bounds (seconds) of the socket read to async_fire latency buckets
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+)
+# Upper bounds (seconds) of the TLS handshake latency buckets
+HANDSHAKE_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+
+class LatencyHistogram:
+    """Fixed-bucket histogram of latencies in seconds."""
+
+    __slots__ = ("bounds", "counts", "count", "total", "max")
+
+    def __init__(self, bounds: Sequence[float] = LATENCY_BUCKETS) -> None:
+        """Initialize an empty histogram.
+
+        Args:
+            bounds: Sorted bucket upper bounds in seconds; an overflow
+                bucket is added for larger values
+        """
+        self.bounds: Tuple[float, ...] = tuple(bounds)
+        self.counts: List[int] = [0] * (len(self.bounds) + 1)
+        self.count: int = 0
+        self.total: float = 0.0
+        self.max: float = 0.0
+
+    def record(self, value: float) -> None:
+        """Record one latency sample.
+
+        Args:
+            value: Latency in seconds
+        """
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, fraction: float) -> float:
+        """Estimate a percentile as the upper bound of its bucket.
+
+        Args:
+            fraction: Percentile as a fraction, e.g. 0.99
+
+        Returns:
+            Latency in seconds (0.0 if nothing has been recorded)
+        """
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target:
+                if index < len(self.bounds):
+                    return min(self.bounds[index], self.max)
+                return self.max
+        return self.max
+
+    def add(self, other: "LatencyHistogram") -> None:
+        """Accumulate the samples of a histogram with the same buckets.
+
+        Args:
+            other: Histogram to add into this one
+        """
+        for index, bucket_count in enumerate(other.counts):
+            self.counts[index] += bucket_count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Histogram contents for diagnostics."""
+        labels = [f"le_{bound}" for bound in self.bounds] + ["le_inf"]
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            "p50": self.percentile(0.5),
+            "p99": self.percentile(0.99),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class IngestMetrics:
+    """Counters and latency histogram for one TCP listener."""
+
+    __slots__ = (
+        "bytes_received",
+        "messages_received",
+        "parse_failures",
+        "validation_failures",
+        "events_fired",
+        "connections_accepted",
+        "connections_rejected",
+        "latency",
+    )
+
+    def __init__(self) -> None:
+        """Initialize all counters to zero."""
+        self.bytes_received: int = 0
+        self.messages_received: int = 0
+        self.parse_failures: int = 0
+        self.validation_failures: int = 0
+        self.events_fired: int = 0
+        self.connections_accepted: int = 0
+        self.connections_rejected: int = 0
+        self.latency = LatencyHistogram()
+
+    @classmethod
+    def combine(cls, metrics: Iterable["IngestMetrics"]) -> "IngestMetrics":
+        """Sum the metrics of several listeners.
+
+        Args:
+            metrics: Metrics to combine
+
+        Returns:
+            A new IngestMetrics holding the totals
+        """
+        total = cls()
+        for item in metrics:
+            for name in cls.__slots__:
+                if name != "latency":
+                    setattr(total, name, getattr(total, name) + getattr(item, name))
+            total.latency.add(item.latency)
+        return total
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Counter values and latency histogram for diagnostics."""
+        return {
+            "bytes_received": self.bytes_received,
+            "messages_received": self.messages_received,
+            "parse_failures": self.parse_failures,
+            "validation_failures": self.validation_failures,
+            "events_fired": self.events_fired,
+            "connections_accepted": self.connections_accepted,
+            "connections_rejected": self.connections_rejected,
+            "latency": self.latency.as_dict(),
+        }
+
+
+class HandshakeMetrics:
+    """TLS handshake counters and latency histogram for one listener."""
+
+    __slots__ = ("resumed", "failed", "latency")
+
+    def __init__(self) -> None:
+        """Initialize all counters to zero."""
+        self.resumed: int = 0
+        self.failed: int = 0
+        self.latency = LatencyHistogram(HANDSHAKE_BUCKETS)
+
+    def record(self, value: float, resumed: bool) -> None:
+        """Record a completed handshake.
+
+        Args:
+            value: Time from accepting the connection to the end of the
+                handshake, in seconds
+            resumed: Whether a previous session was resumed
+        """
+        self.latency.record(value)
+        if resumed:
+            self.resumed += 1
+
+    def add(self, other: "HandshakeMetrics") -> None:
+        """Accumulate the counters of another listener or worker.
+
+        Args:
+            other: Metrics to add into these
+        """
+        self.resumed += other.resumed
+        self.failed += other.failed
+        self.latency.add(other.latency)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Counter values, resumption rate and latency histogram for diagnostics."""
+        completed = self.latency.count
+        return {
+            "completed": completed,
+            "resumed": self.resumed,
+            "resumption_rate": self.resumed / completed if completed else 0.0,
+            "failed": self.failed,
+            "latency": self.latency.as_dict(),
+        }
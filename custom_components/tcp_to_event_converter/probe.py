@@ -0,0 +1,106 @@
+"""Port availability probing for the config flow.
+
+Before creating an entry the config flow checks that its port can be bound.
+probe_port binds the port on every given address in a single executor job,
+and when the port is taken probes the ports after it in the same job, so the
+flow can suggest the first free one without a round trip per port.
+
+The socket bound for a free port is not closed: it is kept listening so that
+no other process can take the port before the listener starts, and the
+config flow parks it for TCPServer.start to adopt (see handoff.py).
+"""
+
+import errno
+import socket
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from .const import MAX_PORT
+
+# Error codes of the config flow for bind failures
+ERROR_PORT_IN_USE: str = "port_in_use"
+ERROR_PORT_PRIVILEGED: str = "port_privileged"
+ERROR_CANNOT_BIND: str = "cannot_bind"
+
+# Bind errors meaning the address itself is not available on this host
+_UNAVAILABLE_ERRNOS = (errno.EAFNOSUPPORT, errno.EADDRNOTAVAIL)
+
+
+class PortProbe(NamedTuple):
+    """Result of probing a port."""
+
+    error: Optional[str]  # Config flow error code, None if the port is free
+    sock: Optional[socket.socket]  # Listening socket reserving a free port
+    suggested_port: Optional[int]  # First free port after a port in use
+
+
+def probe_port(
+    port: int, addresses: Sequence[str], backlog: int, search: int
+) -> PortProbe:
+    """Check that a port can be bound on every address.
+
+    Blocking; run it in an executor.
+
+    Args:
+        port: Port to probe
+        addresses: Addresses the port must be free on; addresses not
+            available on this host (e.g. IPv6 when it is disabled) are skipped
+        backlog: Listen backlog of the reserving socket
+        search: Number of ports after a port in use to probe for a suggestion
+
+    Returns:
+        The probe result; a free port is reserved by a non-blocking socket
+        listening on the first address
+    """
+    error, sockets = _bind_all(port, addresses, backlog)
+    if error is None:
+        for extra in sockets[1:]:
+            extra.close()
+        if not sockets:
+            return PortProbe(ERROR_CANNOT_BIND, None, None)
+        sockets[0].setblocking(False)
+        return PortProbe(None, sockets[0], None)
+
+    suggested_port = None
+    if error == ERROR_PORT_IN_USE:
+        for candidate in range(port + 1, min(port + search, MAX_PORT) + 1):
+            candidate_error, candidate_sockets = _bind_all(candidate, addresses, backlog)
+            for sock in candidate_sockets:
+                sock.close()
+            if candidate_error is None and candidate_sockets:
+                suggested_port = candidate
+                break
+    return PortProbe(error, None, suggested_port)
+
+
+def _bind_all(
+    port: int, addresses: Sequence[str], backlog: int
+) -> Tuple[Optional[str], List[socket.socket]]:
+    """Bind a port on every available address.
+
+    Returns:
+        The error code of the first failed bind, or None, and the sockets
+        bound (none if a bind failed)
+    """
+    sockets: List[socket.socket] = []
+    for address in addresses:
+        family = socket.AF_INET6 if ":" in address else socket.AF_INET
+        try:
+            sockets.append(
+                socket.create_server((address, port), family=family, backlog=backlog)
+            )
+        except OSError as e:
+            if e.errno in _UNAVAILABLE_ERRNOS:
+                continue
+            for sock in sockets:
+                sock.close()
+            return _error_code(e), []
+    return None, sockets
+
+
+def _error_code(error: OSError) -> str:
+    """Config flow error code of a bind failure."""
+    if error.errno == errno.EADDRINUSE:
+        return ERROR_PORT_IN_USE
+    if error.errno == errno.EACCES:
+        return ERROR_PORT_PRIVILEGED
+    return ERROR_CANNOT_BIND
@@ -0,0 +1,342 @@
+"""Low-overhead asyncio.BufferedProtocol connection handler.
+
+In protocol server mode each connection is a TCPEventProtocol instance driven
+directly by the event loop's read callbacks. There is no task per connection
+and no timeout handle per read: idle connections are closed by the server's
+IdleReaper, which only needs the time of the last read.
+
+Reads go straight into the server's preallocated receive buffer, shared by
+all connections, instead of into a new bytes object per read, and the state
+kept per connection is limited to a few slots, so tens of thousands of
+mostly idle connections cost little memory beyond their kernel socket.
+"""
+
+import asyncio
+import logging
+from typing import TYPE_CHECKING, List, Optional, Tuple, Union
+
+from .ack import NACK_OVERLOADED
+from .const import (
+    OVERLOAD_DISCONNECT,
+    OVERLOAD_PAUSE,
+)
+from .framing import FramingError, create_framer
+from .idle import IdleEntry
+
+if TYPE_CHECKING:
+    from .tcp_server import TCPServer
+
+_LOGGER = logging.getLogger(__name__)
+
+
+# Backlog of a connection that is not paused by the rate limiter
+_NO_BACKLOG: Tuple = ()
+
+
+class TCPEventProtocol(asyncio.BufferedProtocol):
+    """Protocol handling a single client connection for a TCPServer."""
+
+    __slots__ = (
+        "_server",
+        "_loop",
+        "_transport",
+        "_addr",
+        "_connection",
+        "_framer",
+        "_limiter",
+        "_limits_generation",
+        "_idle",
+        "_backlog",
+        "_resume_handle",
+        "_write_paused",
+        "_accepted",
+        "_acks",
+        "_handle_frame",
+    )
+
+    def __init__(self, server: "TCPServer") -> None:
+        """Initialize the protocol.
+
+        Args:
+            server: The TCPServer this connection belongs to
+        """
+        self._server = server
+        self._loop = server.hass.loop
+        self._transport: Optional[asyncio.Transport] = None
+        self._addr = None
+        self._connection: int = 0
+        self._framer = create_framer(server.framing)
+        self._limiter = None
+        self._limits_generation: int = 0
+        self._idle: Optional[IdleEntry] = None
+        # Frames waiting for the rate limiter; a list only while paused
+        self._backlog: Union[List[Tuple[bytes, float]], Tuple] = _NO_BACKLOG
+        self._resume_handle: Optional[asyncio.TimerHandle] = None
+        # Set while the transport's write buffer is over its high-water mark
+        self._write_paused: bool = False
+        self._accepted: bool = False
+        self._acks = None
+        self._handle_frame = server._handle_frame
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        """Register the connection or reject it if the limit is reached."""
+        server = self._server
+        self._transport = transport
+        # Unix socket peers are unnamed; log the listening path instead
+        self._addr = transport.get_extra_info("peername") or server.socket_path
+
+        if server._connection_count >= server.max_connections:
+            server.metrics.connections_rejected += 1
+            _LOGGER.warning(
+                "Connection limit reached (%d/%d), rejecting connection from %s",
+                server._connection_count, server.max_connections, self._addr
+            )
+            transport.close()
+            return
+
+        self._accepted = True
+        server._connection_count += 1
+        server.metrics.connections_accepted += 1
+        server.protocols.add(self)
+        self._connection = next(server.connection_ids)
+        if server.capture is not None:
+            server.capture.opened(self._connection, self._addr, self._loop.time())
+        self._limiter = server._create_rate_limiter()
+        self._limits_generation = server.limits_generation
+        self._acks = server._create_ack_tracker()
+        if self._acks is not None:
+            self._handle_frame = self._acks.handle
+        self._idle = server._watch_connection(transport, self._on_idle)
+        if server.announcement is not None:
+            transport.write(server.announcement)
+        _LOGGER.info("Connection established from %s", self._addr)
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        """Return the server's shared receive buffer to read into.
+
+        The transport hands every read to buffer_updated right away, before
+        any other connection reads, so one buffer serves all connections.
+        """
+        return self._server.receive_buffer
+
+    def buffer_updated(self, nbytes: int) -> None:
+        """Frame received data and handle every complete frame."""
+        received_at = self._loop.time()
+        self._idle.last_activity = received_at
+        server = self._server
+        server.metrics.bytes_received += nbytes
+        if server.capture is not None:
+            server.capture.data(
+                self._connection, received_at, server.receive_buffer[:nbytes]
+            )
+
+        try:
+            # The framer copies what it keeps out of the shared buffer
+            frames = self._framer.feed(server.receive_buffer[:nbytes])
+        except FramingError as e:
+            server.metrics.parse_failures += 1
+            _LOGGER.warning(
+                "Framing error from %s, closing connection: %s", self._addr, e
+            )
+            self._transport.close()
+            return
+
+        if self._limits_generation != server.limits_generation and not self._backlog:
+            # Rate limits changed; frames waiting in the backlog keep the old limiter
+            self._limiter = server._create_rate_limiter()
+            self._limits_generation = server.limits_generation
+
+        if self._backlog:
+            # Still paused by the rate limiter: keep arrival order
+            self._backlog.extend((frame, received_at) for frame in frames)
+        elif self._limiter is None:
+            handle_frame = self._handle_frame
+            addr = self._addr
+            for frame in frames:
+                handle_frame(frame, addr, received_at)
+        else:
+            self._handle_limited_frames(frames, received_at)
+
+        if self._acks is not None:
+            self._write_acks()
+
+    def pause_writing(self) -> None:
+        """Stop reading while the client does not read what is written to it.
+
+        Without this a pipelining client that never reads its replies would
+        make the transport buffer acknowledgements without limit.
+        """
+        self._write_paused = True
+        self._transport.pause_reading()
+
+    def resume_writing(self) -> None:
+        """Resume reading once the write buffer has drained.
+
+        Reading stays paused while the rate limiter holds frames back.
+        """
+        self._write_paused = False
+        if not self._backlog and not self._transport.is_closing():
+            self._transport.resume_reading()
+
+    def eof_received(self) -> bool:
+        """Accept a final unterminated message and let the transport close."""
+        _LOGGER.info("Connection from %s closed by peer", self._addr)
+        self._handle_frames_on_close()
+        return False
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        """Release connection resources."""
+        # The peer address from connection_made: a closed TLS transport no
+        # longer reports it
+        self._server._release_connection(self._addr)
+        if not self._accepted:
+            return
+        self._accepted = False
+
+        self._server.idle_reaper.unwatch(self._idle)
+        if self._resume_handle is not None:
+            self._resume_handle.cancel()
+            self._resume_handle = None
+        self._backlog = _NO_BACKLOG
+
+        server = self._server
+        server.protocols.discard(self)
+        server._connection_closed()
+        if server.capture is not None:
+            server.capture.closed(self._connection, self._loop.time())
+
+        if exc is not None:
+            _LOGGER.warning("Connection error from %s: %s", self._addr, exc)
+        _LOGGER.info("Connection with %s closed", self._addr)
+
+    def drain(self) -> None:
+        """Stop reading, handle every frame already received and close.
+
+        Frames held back by the rate limiter are handled too, since they
+        have been read already. The transport closes once its acknowledgements
+        have been written.
+        """
+        transport = self._transport
+        if transport is None or transport.is_closing():
+            return
+        transport.pause_reading()
+        if self._resume_handle is not None:
+            self._resume_handle.cancel()
+            self._resume_handle = None
+        handle_frame = self._handle_frame
+        addr = self._addr
+        for frame, received_at in self._backlog:
+            handle_frame(frame, addr, received_at)
+        self._backlog = _NO_BACKLOG
+        self._handle_frames_on_close()
+        transport.close()
+
+    def abort(self) -> None:
+        """Close the connection immediately, discarding unsent data."""
+        if self._transport is not None:
+            self._transport.abort()
+
+    def _on_idle(self) -> bool:
+        """Close the connection after the idle timeout.
+
+        Returns:
+            False if reading is paused by the rate limiter, which is not idleness
+        """
+        if self._backlog:
+            return False
+        _LOGGER.debug(
+            "Idle timeout (%s seconds) from %s, closing connection",
+            self._server.idle_reaper.idle_timeout, self._addr
+        )
+        self._handle_frames_on_close()
+        self._transport.close()
+        return True
+
+    def _handle_frames_on_close(self) -> None:
+        """Handle any frame still buffered when the connection goes away."""
+        received_at = self._loop.time()
+        for frame in self._framer.flush():
+            self._handle_frame(frame, self._addr, received_at)
+        if self._acks is not None:
+            self._write_acks()
+
+    def _write_acks(self) -> None:
+        """Acknowledge the frames handled since the last reply in one write."""
+        reply = self._acks.reply()
+        if reply and not self._transport.is_closing():
+            self._transport.write(reply)
+
+    def _handle_limited_frames(self, frames: List[bytes], received_at: float) -> None:
+        """Handle frames subject to rate limiting and the overload policy.
+
+        Args:
+            frames: Complete frames in arrival order
+            received_at: Loop time at which the frames were read
+        """
+        server = self._server
+        limiter = self._limiter
+        policy = server.overload_policy
+        addr = self._addr
+
+        for index, frame in enumerate(frames):
+            reason = limiter.try_acquire(received_at)
+            if reason is not None:
+                if policy == OVERLOAD_PAUSE:
+                    self._pause(frames[index:], received_at)
+                    return
+                if policy == OVERLOAD_DISCONNECT:
+                    server._record_overload_disconnect(reason, addr)
+                    if self._acks is not None:
+                        self._write_acks()
+                    self._transport.close()
+                    return
+                if not server._admit_overloaded(reason):
+                    if self._acks is not None:
+                        self._acks.reject(frame, NACK_OVERLOADED)
+                    continue
+
+            self._handle_frame(frame, addr, received_at)
+
+    def _pause(self, frames: List[bytes], received_at: float) -> None:
+        """Stop reading until the rate limiter admits the remaining frames.
+
+        Args:
+            frames: Frames that could not be admitted yet
+            received_at: Loop time at which the frames were read
+        """
+        self._backlog = [(frame, received_at) for frame in frames]
+        self._transport.pause_reading()
+        self._schedule_resume()
+
+    def _schedule_resume(self) -> None:
+        """Schedule a resume attempt for when a token becomes available."""
+        now = self._loop.time()
+        self._resume_handle = self._loop.call_at(
+            now + self._limiter.time_until_available(now), self._resume
+        )
+
+    def _resume(self) -> None:
+        """Handle backlogged frames and resume reading once admitted."""
+        self._resume_handle = None
+        backlog = self._backlog
+        limiter = self._limiter
+        handle_frame = self._handle_frame
+        addr = self._addr
+        now = self._loop.time()
+
+        handled = 0
+        for frame, received_at in backlog:
+            if limiter.try_acquire(now) is not None:
+                break
+            handle_frame(frame, addr, received_at)
+            handled += 1
+        del backlog[:handled]
+        if self._acks is not None:
+            self._write_acks()
+
+        if backlog:
+            self._schedule_resume()
+            return
+        self._backlog = _NO_BACKLOG
+        if not self._write_paused and not self._transport.is_closing():
+            self._transport.resume_reading()
@@ -0,0 +1,144 @@
+"""Token bucket rate limiting for the TCP to Event Converter ingest path."""
+
+from typing import Optional
+
+from .const import RATE_LIMIT_BURST_SECONDS
+
+# Drop reasons reported by RateLimiter.try_acquire
+DROP_CONNECTION_RATE: str = "connection_rate"
+DROP_GLOBAL_RATE: str = "global_rate"
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at ``rate`` tokens/second.
+
+    Time is passed in explicitly (normally ``loop.time()``) so that a single
+    clock read can be shared by several buckets.
+    """
+
+    __slots__ = ("rate", "capacity", "_tokens", "_updated")
+
+    def __init__(self, rate: float, capacity: float, now: float) -> None:
+        """Initialize a full bucket.
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum number of tokens (burst size)
+            now: Current monotonic time in seconds
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = now
+
+    def _refill(self, now: float) -> None:
+        """Add the tokens accumulated since the last update."""
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def try_consume(self, now: float) -> bool:
+        """Take one token if available.
+
+        Args:
+            now: Current monotonic time in seconds
+
+        Returns:
+            True if a token was taken, False if the bucket is empty
+        """
+        self._refill(now)
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            return True
+        return False
+
+    def refund(self) -> None:
+        """Return a token taken by try_consume."""
+        self._tokens = min(self.capacity, self._tokens + 1.0)
+
+    def time_until_available(self, now: float) -> float:
+        """Seconds until at least one token is available.
+
+        Args:
+            now: Current monotonic time in seconds
+
+        Returns:
+            Wait time in seconds (0.0 if a token is available now)
+        """
+        self._refill(now)
+        missing = 1.0 - self._tokens
+        if missing <= 0:
+            return 0.0
+        return missing / self.rate
+
+
+def create_bucket(rate: float, now: float) -> Optional[TokenBucket]:
+    """Create a token bucket for a messages/second limit.
+
+    Args:
+        rate: Allowed messages per second (0 or less disables limiting)
+        now: Current monotonic time in seconds
+
+    Returns:
+        A TokenBucket, or None if the limit is disabled
+    """
+    if rate <= 0:
+        return None
+    return TokenBucket(rate, max(1.0, rate * RATE_LIMIT_BURST_SECONDS), now)
+
+
+class RateLimiter:
+    """Per-connection limiter that also draws from a shared global bucket."""
+
+    __slots__ = ("connection_bucket", "global_bucket")
+
+    def __init__(
+        self,
+        connection_bucket: Optional[TokenBucket],
+        global_bucket: Optional[TokenBucket],
+    ) -> None:
+        """Initialize the limiter.
+
+        Args:
+            connection_bucket: Bucket owned by this connection, if limited
+            global_bucket: Bucket shared by all connections, if limited
+        """
+        self.connection_bucket = connection_bucket
+        self.global_bucket = global_bucket
+
+    def try_acquire(self, now: float) -> Optional[str]:
+        """Take a token from every configured bucket.
+
+        Args:
+            now: Current monotonic time in seconds
+
+        Returns:
+            None if the frame is admitted, otherwise the drop reason
+        """
+        connection_bucket = self.connection_bucket
+        if connection_bucket is not None and not connection_bucket.try_consume(now):
+            return DROP_CONNECTION_RATE
+
+        global_bucket = self.global_bucket
+        if global_bucket is not None and not global_bucket.try_consume(now):
+            if connection_bucket is not None:
+                connection_bucket.refund()
+            return DROP_GLOBAL_RATE
+
+        return None
+
+    def time_until_available(self, now: float) -> float:
+        """Seconds until every configured bucket has a token.
+
+        Args:
+            now: Current monotonic time in seconds
+
+        Returns:
+            Wait time in seconds
+        """
+        wait = 0.0
+        for bucket in (self.connection_bucket, self.global_bucket):
+            if bucket is not None:
+                wait = max(wait, bucket.time_until_available(now))
+        return wait
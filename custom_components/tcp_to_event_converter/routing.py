@@ -0,0 +1,278 @@
+"""Per-device routing of events to event types or service calls.
+
+By default every message is fired as the listener's event type, so every
+automation listening to it wakes up for every press. A RoutingTable loaded
+from the integration options maps messages to their own event type, or
+straight to a service call, instead.
+
+Each route matches device_id, button_id and action. device_id and button_id
+match exactly or, with a trailing ``*``, by prefix; any field left out
+matches everything. Routes are compiled once:
+
+* routes matching all three fields exactly go into a dict keyed on the triple
+* all other routes go into a trie over device_id whose nodes hold a trie over
+  button_id, whose nodes hold the routes by action
+
+A lookup tries the dict first, then walks the tries preferring the longest
+device_id match, then the longest button_id match, then an exact action over
+any action. Results are memoised per triple, so repeated messages cost one
+dict lookup.
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Union
+
+from homeassistant.core import HomeAssistant
+
+from .const import EVENT_TYPE_PATTERN, MAX_ROUTE_MEMO_SIZE
+from .validator import FIELD_NAMES, Fields, ValidationCode, validate_field
+
+_EVENT_TYPE_MATCH = re.compile(EVENT_TYPE_PATTERN).match
+_SERVICE_MATCH = re.compile(r"^[a-z0-9_]+\.[a-z0-9_]+$").match
+_PREFIX = "*"
+# Key of the routes matching any action in a button node
+_ANY_ACTION = None
+
+
+class ServiceRoute:
+    """Service called instead of firing an event."""
+
+    __slots__ = ("domain", "service", "data")
+
+    def __init__(self, service: str, data: Mapping[str, Any]) -> None:
+        """Initialize the route.
+
+        Args:
+            service: Service as ``domain.service``
+            data: Service data passed with every call
+        """
+        self.domain, self.service = service.split(".", 1)
+        self.data: Dict[str, Any] = dict(data)
+
+    def call(self, hass: HomeAssistant) -> None:
+        """Schedule the service call without waiting for it."""
+        hass.async_create_task(
+            hass.services.async_call(self.domain, self.service, self.data)
+        )
+
+    def __repr__(self) -> str:
+        """Service name for log messages."""
+        return f"service {self.domain}.{self.service}"
+
+
+# Event type to fire, or service to call, for a message
+RouteTarget = Union[str, ServiceRoute]
+
+
+class _TrieNode:
+    """Node of a device_id or button_id trie."""
+
+    __slots__ = ("children", "exact", "prefix")
+
+    def __init__(self) -> None:
+        """Initialize an empty node."""
+        self.children: Dict[str, "_TrieNode"] = {}
+        # Value for keys ending here, and for keys starting with this prefix
+        self.exact: Any = None
+        self.prefix: Any = None
+
+
+class _Trie:
+    """Character trie matching keys exactly or by prefix."""
+
+    __slots__ = ("_root",)
+
+    def __init__(self) -> None:
+        """Initialize an empty trie."""
+        self._root = _TrieNode()
+
+    def setdefault(self, pattern: str, factory: Any) -> Any:
+        """Return the value of a pattern, creating it with ``factory()`` if new.
+
+        Args:
+            pattern: Exact key, or prefix followed by ``*``
+            factory: Creates the value of a new pattern
+        """
+        is_prefix = pattern.endswith(_PREFIX)
+        if is_prefix:
+            pattern = pattern[:-1]
+        node = self._root
+        for char in pattern:
+            child = node.children.get(char)
+            if child is None:
+                child = node.children[char] = _TrieNode()
+            node = child
+        attr = "prefix" if is_prefix else "exact"
+        value = getattr(node, attr)
+        if value is None:
+            value = factory()
+            setattr(node, attr, value)
+        return value
+
+    def matches(self, key: str) -> List[Any]:
+        """Values of every pattern matching a key, most specific first."""
+        found = []
+        node = self._root
+        if node.prefix is not None:
+            found.append(node.prefix)
+        for char in key:
+            node = node.children.get(char)
+            if node is None:
+                break
+            if node.prefix is not None:
+                found.append(node.prefix)
+        else:
+            if node.exact is not None:
+                found.append(node.exact)
+        found.reverse()
+        return found
+
+
+class RoutingTable:
+    """Compiled routes from message fields to route targets."""
+
+    __slots__ = ("_exact", "_trie", "_memo", "count")
+
+    def __init__(self, routes: List[Tuple[Tuple[Optional[str], ...], RouteTarget]]) -> None:
+        """Compile the routes.
+
+        Args:
+            routes: (device pattern, button pattern, action) patterns with
+                their targets; None matches anything. Earlier routes win
+                over later routes with the same patterns
+        """
+        self._exact: Dict[Fields, RouteTarget] = {}
+        self._trie = _Trie()
+        self._memo: Dict[Fields, Optional[RouteTarget]] = {}
+        self.count = len(routes)
+        for (device, button, action), target in routes:
+            if (
+                device is not None and not device.endswith(_PREFIX)
+                and button is not None and not button.endswith(_PREFIX)
+                and action is not None
+            ):
+                self._exact.setdefault((device, button, action), target)
+                continue
+            buttons = self._trie.setdefault(device or _PREFIX, _Trie)
+            actions = buttons.setdefault(button or _PREFIX, dict)
+            actions.setdefault(action, target)
+
+    @classmethod
+    def from_json(cls, text: str) -> "RoutingTable":
+        """Load a routing table from its JSON configuration.
+
+        The configuration is a list of routes, each an object with optional
+        ``device_id``, ``button_id`` and ``action`` and either an
+        ``event_type`` or a ``service`` (``domain.service``) with optional
+        ``data``, e.g. ``[{"device_id": "garage_*", "event_type":
+        "garage_button"}, {"device_id": "hall", "action": "double_press",
+        "service": "light.toggle", "data": {"entity_id": "light.hall"}}]``.
+
+        Args:
+            text: JSON text; empty text gives an empty table
+
+        Returns:
+            The compiled table
+
+        Raises:
+            ValueError: If the JSON is malformed or a route is invalid
+        """
+        if not text.strip():
+            return cls([])
+        try:
+            config = json.loads(text)
+        except ValueError as e:
+            raise ValueError(f"routes are not valid JSON: {e}") from None
+        if not isinstance(config, list):
+            raise ValueError("routes must be a JSON list")
+        return cls([_load_route(index, route) for index, route in enumerate(config)])
+
+    def lookup(self, fields: Fields) -> Optional[RouteTarget]:
+        """Find the target of a message.
+
+        Args:
+            fields: (device_id, button_id, action) of the message
+
+        Returns:
+            The target of the most specific matching route, or None
+        """
+        try:
+            return self._memo[fields]
+        except KeyError:
+            pass
+        target = self._exact.get(fields)
+        if target is None:
+            target = self._match(fields)
+        memo = self._memo
+        if len(memo) >= MAX_ROUTE_MEMO_SIZE:
+            memo.clear()
+        memo[fields] = target
+        return target
+
+    def _match(self, fields: Fields) -> Optional[RouteTarget]:
+        """Walk the tries for the most specific matching route."""
+        device_id, button_id, action = fields
+        for buttons in self._trie.matches(device_id):
+            for actions in buttons.matches(button_id):
+                target = actions.get(action)
+                if target is None:
+                    target = actions.get(_ANY_ACTION)
+                if target is not None:
+                    return target
+        return None
+
+
+def create_routing_table(text: str) -> Optional[RoutingTable]:
+    """Create the routing table of a listener.
+
+    Returns:
+        A RoutingTable, or None if no routes are configured
+
+    Raises:
+        ValueError: If the routes are invalid
+    """
+    table = RoutingTable.from_json(text)
+    return table if table.count else None
+
+
+def _load_route(
+    index: int, route: Any
+) -> Tuple[Tuple[Optional[str], ...], RouteTarget]:
+    """Load and validate one route of a routing configuration.
+
+    Raises:
+        ValueError: If the route is invalid
+    """
+    if not isinstance(route, dict):
+        raise ValueError(f"route {index} must be an object")
+
+    patterns: List[Optional[str]] = []
+    for name in FIELD_NAMES:
+        pattern = route.get(name)
+        if pattern == _PREFIX:
+            pattern = None
+        if pattern is not None:
+            value = pattern
+            # Only device_id and button_id take prefixes
+            if name != "action" and isinstance(value, str) and value.endswith(_PREFIX):
+                value = value[:-1]
+            if not isinstance(value, str) or validate_field(value) is not ValidationCode.OK:
+                raise ValueError(f"route {index}: invalid {name} {pattern!r}")
+        patterns.append(pattern)
+
+    event_type = route.get("event_type")
+    service = route.get("service")
+    if (event_type is None) == (service is None):
+        raise ValueError(f"route {index}: needs either event_type or service")
+    if event_type is not None:
+        if not isinstance(event_type, str) or not _EVENT_TYPE_MATCH(event_type):
+            raise ValueError(f"route {index}: invalid event_type {event_type!r}")
+        return tuple(patterns), event_type
+
+    if not isinstance(service, str) or not _SERVICE_MATCH(service):
+        raise ValueError(f"route {index}: invalid service {service!r}")
+    data = route.get("data", {})
+    if not isinstance(data, dict):
+        raise ValueError(f"route {index}: data must be an object")
+    return tuple(patterns), ServiceRoute(service, data)
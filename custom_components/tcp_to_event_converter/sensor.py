@@ -0,0 +1,204 @@
+"""Sensor platform exposing TCP to Event Converter runtime metrics."""
+
+from datetime import timedelta
+from typing import Any, Callable, Optional, Tuple
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory, UnitOfTime
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .const import DATA_SERVERS, DOMAIN
+from .tcp_server import DROP_DISCONNECTED, TCPServer
+
+# Metrics are cheap counters, polling them is enough
+SCAN_INTERVAL = timedelta(seconds=30)
+
+# Unit of the throughput sensor
+UNIT_MESSAGES_PER_SECOND: str = "msg/s"
+
+ValueFn = Callable[[TCPServer], Any]
+
+
+def _messages_dropped(server: TCPServer) -> int:
+    """Total messages dropped for any reason."""
+    return sum(
+        count for reason, count in server.drop_counts.items()
+        if reason != DROP_DISCONNECTED
+    )
+
+
+def _latency_ms(fraction: float) -> ValueFn:
+    """Build a value function for a read-to-fire latency percentile in ms."""
+    def value(server: TCPServer) -> float:
+        return round(server.metrics.latency.percentile(fraction) * 1000, 3)
+    return value
+
+
+def _counter(
+    key: str, name: str, value_fn: ValueFn, diagnostic: bool = False
+) -> Tuple[SensorEntityDescription, ValueFn]:
+    """Build the description of a monotonically increasing counter sensor."""
+    return (
+        SensorEntityDescription(
+            key=key,
+            name=name,
+            state_class=SensorStateClass.TOTAL_INCREASING,
+            entity_category=EntityCategory.DIAGNOSTIC if diagnostic else None,
+        ),
+        value_fn,
+    )
+
+
+SENSORS: Tuple[Tuple[SensorEntityDescription, ValueFn], ...] = (
+    _counter(
+        "messages_received", "Messages received",
+        lambda server: server.metrics.messages_received,
+    ),
+    _counter(
+        "events_fired", "Events fired",
+        lambda server: server.metrics.events_fired,
+    ),
+    _counter(
+        "parse_failures", "Parse failures",
+        lambda server: server.metrics.parse_failures, diagnostic=True,
+    ),
+    _counter(
+        "validation_failures", "Validation failures",
+        lambda server: server.metrics.validation_failures, diagnostic=True,
+    ),
+    _counter(
+        "connections_rejected", "Rejected connections",
+        lambda server: server.metrics.connections_rejected, diagnostic=True,
+    ),
+    _counter(
+        "messages_dropped", "Dropped messages",
+        _messages_dropped, diagnostic=True,
+    ),
+    (
+        SensorEntityDescription(
+            key="active_connections",
+            name="Active connections",
+            state_class=SensorStateClass.MEASUREMENT,
+        ),
+        lambda server: server._connection_count,
+    ),
+    (
+        SensorEntityDescription(
+            key="latency_p50",
+            name="Latency p50",
+            device_class=SensorDeviceClass.DURATION,
+            native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+            state_class=SensorStateClass.MEASUREMENT,
+            entity_category=EntityCategory.DIAGNOSTIC,
+        ),
+        _latency_ms(0.5),
+    ),
+    (
+        SensorEntityDescription(
+            key="latency_p99",
+            name="Latency p99",
+            device_class=SensorDeviceClass.DURATION,
+            native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+            state_class=SensorStateClass.MEASUREMENT,
+            entity_category=EntityCategory.DIAGNOSTIC,
+        ),
+        _latency_ms(0.99),
+    ),
+)
+
+THROUGHPUT_SENSOR = SensorEntityDescription(
+    key="message_rate",
+    name="Message rate",
+    native_unit_of_measurement=UNIT_MESSAGES_PER_SECOND,
+    state_class=SensorStateClass.MEASUREMENT,
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up metric sensors for a config entry."""
+    server: TCPServer = hass.data[DOMAIN][DATA_SERVERS][entry.entry_id]
+
+    entities = [
+        TcpMetricSensor(server, entry, description, value_fn)
+        for description, value_fn in SENSORS
+    ]
+    entities.append(TcpMessageRateSensor(server, entry, THROUGHPUT_SENSOR))
+    async_add_entities(entities)
+
+
+class TcpMetricSensor(SensorEntity):
+    """Sensor reporting one value derived from the server metrics."""
+
+    _attr_has_entity_name = True
+
+    def __init__(
+        self,
+        server: TCPServer,
+        entry: ConfigEntry,
+        description: SensorEntityDescription,
+        value_fn: Optional[ValueFn] = None,
+    ) -> None:
+        """Initialize the sensor.
+
+        Args:
+            server: TCP server whose metrics are reported
+            entry: Config entry the sensor belongs to
+            description: Entity description
+            value_fn: Function computing the sensor value from the server
+        """
+        self._server = server
+        self._value_fn = value_fn
+        self.entity_description = description
+        self._attr_unique_id = f"{entry.entry_id}_{description.key}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, entry.entry_id)},
+            name=entry.title,
+        )
+
+    @property
+    def native_value(self) -> Any:
+        """Return the current metric value."""
+        return self._value_fn(self._server)
+
+
+class TcpMessageRateSensor(TcpMetricSensor):
+    """Sensor reporting messages received per second since the last update."""
+
+    def __init__(
+        self,
+        server: TCPServer,
+        entry: ConfigEntry,
+        description: SensorEntityDescription,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(server, entry, description)
+        self._last_count: int = server.metrics.messages_received
+        self._last_time: float = server.hass.loop.time()
+        self._rate: float = 0.0
+
+    async def async_update(self) -> None:
+        """Compute the message rate over the last polling interval."""
+        count = self._server.metrics.messages_received
+        now = self._server.hass.loop.time()
+        elapsed = now - self._last_time
+        if elapsed > 0:
+            self._rate = round((count - self._last_count) / elapsed, 2)
+        self._last_count = count
+        self._last_time = now
+
+    @property
+    def native_value(self) -> float:
+        """Return the most recent message rate."""
+        return self._rate
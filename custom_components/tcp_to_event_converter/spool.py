@@ -0,0 +1,491 @@
+"""Durable on-disk spool for events that cannot be fired right away.
+
+While Home Assistant is starting, or while the dispatch queue is full because
+the bus cannot keep up, validated events are appended to the spool instead of
+being dropped and are replayed in order once the bus catches up. Events still
+spooled at shutdown, or when Home Assistant crashed, are replayed on the next
+start.
+
+The spool is a directory of preallocated, memory-mapped segment files, so
+appending an event is a copy into the page cache without a system call. Each
+record carries a sequence number and a CRC-32 of its payload; when the spool
+is opened every segment is scanned up to its first torn or corrupt record. A
+separate memory-mapped checkpoint holds the sequence number of the next event
+to replay. Segments are deleted once replayed and their number is bounded by
+the configured spool size.
+
+Segment layout:
+
+    header:  !4sI  magic, version
+    record:  !IIQ  payload length, CRC-32 of the payload, sequence number,
+                   followed by the encoded (device_id, button_id, action)
+
+A zero payload length marks the end of the records in a segment.
+"""
+
+import logging
+import mmap
+import os
+import struct
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from .const import SPOOL_SEGMENT_SIZE
+from .validator import Fields
+from .worker_wire import decode_fields, encode_fields
+
+_LOGGER = logging.getLogger(__name__)
+
+SEGMENT_HEADER = struct.Struct("!4sI")
+SEGMENT_MAGIC = b"TESP"
+SEGMENT_VERSION = 1
+RECORD_HEADER = struct.Struct("!IIQ")
+# Sequence number of the next event to replay
+CHECKPOINT = struct.Struct("!Q")
+CHECKPOINT_FILE = "checkpoint"
+SEGMENT_SUFFIX = ".seg"
+
+
+class _Segment:
+    """One memory-mapped segment file."""
+
+    __slots__ = ("path", "file", "map", "end")
+
+    def __init__(self, path: str, file: Any, segment_map: mmap.mmap, end: int) -> None:
+        """Initialize the segment.
+
+        Args:
+            path: Segment file path
+            file: Open segment file
+            segment_map: Writable mapping of the whole file
+            end: Offset just past the last record
+        """
+        self.path = path
+        self.file = file
+        self.map = segment_map
+        self.end = end
+
+    @classmethod
+    def create(cls, path: str, size: int) -> "_Segment":
+        """Create and preallocate an empty segment (blocking).
+
+        Raises:
+            OSError: If the file cannot be created or mapped
+        """
+        file = open(path, "w+b")
+        try:
+            file.truncate(size)
+            segment_map = mmap.mmap(file.fileno(), size)
+        except BaseException:
+            file.close()
+            os.unlink(path)
+            raise
+        SEGMENT_HEADER.pack_into(segment_map, 0, SEGMENT_MAGIC, SEGMENT_VERSION)
+        return cls(path, file, segment_map, SEGMENT_HEADER.size)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["_Segment"]:
+        """Map an existing segment (blocking).
+
+        Returns:
+            The segment, or None if the file is not a valid segment
+        """
+        file = open(path, "r+b")
+        size = os.fstat(file.fileno()).st_size
+        if size <= SEGMENT_HEADER.size:
+            file.close()
+            return None
+        segment_map = mmap.mmap(file.fileno(), size)
+        if SEGMENT_HEADER.unpack_from(segment_map) != (SEGMENT_MAGIC, SEGMENT_VERSION):
+            segment_map.close()
+            file.close()
+            return None
+        return cls(path, file, segment_map, SEGMENT_HEADER.size)
+
+    def scan(self) -> List[Tuple[int, int]]:
+        """Find the intact records and set ``end`` past the last of them.
+
+        Stops at the end marker, at a record whose CRC does not match and at
+        a break in the sequence numbers, so a torn write ends the segment.
+
+        Returns:
+            List of (offset, sequence number) of the intact records
+        """
+        segment_map = self.map
+        size = len(segment_map)
+        records = []
+        offset = SEGMENT_HEADER.size
+        expected = None
+        while offset + RECORD_HEADER.size <= size:
+            length, crc, seq = RECORD_HEADER.unpack_from(segment_map, offset)
+            start = offset + RECORD_HEADER.size
+            if not length or start + length > size or (
+                expected is not None and seq != expected
+            ):
+                break
+            if zlib.crc32(segment_map[start:start + length]) != crc:
+                break
+            records.append((offset, seq))
+            offset = start + length
+            expected = seq + 1
+        self.end = offset
+        return records
+
+    def truncate_tail(self) -> None:
+        """Zero everything after the last record so appends start cleanly."""
+        tail = len(self.map) - self.end
+        if tail:
+            self.map[self.end:] = bytes(tail)
+
+    def close(self, delete: bool = False) -> None:
+        """Unmap and close the segment, optionally deleting its file."""
+        self.map.close()
+        self.file.close()
+        if delete:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+
+class Spool:
+    """Append-only event spool with in-order replay.
+
+    Only ``open``, ``create_segment``, ``extend`` and ``close`` block on file
+    I/O and are meant to run in an executor; appending and reading only touch
+    the memory-mapped segments. Before the active segment fills up, the
+    server prepares the next one in an executor (see ``standby_needed``).
+    Rotating never creates a segment itself: if the active segment is full
+    before the next one is ready, appends fail with ``awaiting_standby`` set
+    until ``set_standby`` installs it.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int,
+        segment_size: int,
+        checkpoint_file: Any,
+        checkpoint_map: mmap.mmap,
+    ) -> None:
+        """Initialize an empty spool; use ``open`` to load one from disk.
+
+        Args:
+            directory: Spool directory
+            max_bytes: Maximum total size of the segment files
+            segment_size: Size of each segment file
+            checkpoint_file: Open checkpoint file
+            checkpoint_map: Writable mapping of the checkpoint file
+        """
+        self.directory = directory
+        self.segment_size = segment_size
+        self.max_segments = max(2, max_bytes // segment_size)
+        self._checkpoint_file = checkpoint_file
+        self._checkpoint = checkpoint_map
+        self._segments: List[_Segment] = []
+        self._standby: Optional[_Segment] = None
+        self._standby_pending = False
+        self._next_index = 0
+        self._next_seq = 0
+        self._read_seq = 0
+        self._read_offset = SEGMENT_HEADER.size
+        self._pending = 0
+        self._closed = False
+        self.awaiting_standby: bool = False
+        self.spooled: int = 0
+        self.replayed: int = 0
+
+    @classmethod
+    def open(
+        cls, directory: str, max_bytes: int, segment_size: int = SPOOL_SEGMENT_SIZE
+    ) -> "Spool":
+        """Open or create the spool in a directory (blocking).
+
+        Replayed segments, and segments that hold no intact records, are
+        deleted. The spool continues in its newest segment.
+
+        Args:
+            directory: Spool directory, created if missing
+            max_bytes: Maximum total size of the segment files
+            segment_size: Size of each segment file; reduced so that at least
+                two segments fit in ``max_bytes``
+
+        Returns:
+            The opened spool
+
+        Raises:
+            OSError: If the directory or its files cannot be created or mapped
+        """
+        os.makedirs(directory, exist_ok=True)
+        segment_size = max(
+            SEGMENT_HEADER.size + RECORD_HEADER.size + 256,
+            min(segment_size, max_bytes // 2),
+        )
+
+        checkpoint_path = os.path.join(directory, CHECKPOINT_FILE)
+        checkpoint_file = open(
+            checkpoint_path, "r+b" if os.path.exists(checkpoint_path) else "w+b"
+        )
+        if os.fstat(checkpoint_file.fileno()).st_size < CHECKPOINT.size:
+            checkpoint_file.truncate(CHECKPOINT.size)
+        checkpoint_map = mmap.mmap(checkpoint_file.fileno(), CHECKPOINT.size)
+        spool = cls(directory, max_bytes, segment_size, checkpoint_file, checkpoint_map)
+        spool._load()
+        return spool
+
+    def _load(self) -> None:
+        """Load the existing segments (blocking)."""
+        read_seq = CHECKPOINT.unpack_from(self._checkpoint)[0]
+        loaded = []
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(SEGMENT_SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                self._next_index = max(self._next_index, int(name[:-len(SEGMENT_SUFFIX)]) + 1)
+            except ValueError:
+                pass
+            segment = _Segment.load(path)
+            records = segment.scan() if segment is not None else []
+            if not records:
+                _LOGGER.debug("Removing empty or invalid spool segment %s", path)
+                if segment is not None:
+                    segment.close()
+                os.unlink(path)
+                continue
+            loaded.append((records[0][1], records, segment))
+
+        # Segments are ordered by the sequence numbers they hold, not by name
+        loaded.sort(key=lambda item: item[0])
+        next_seq = read_seq
+        for _, records, segment in loaded:
+            next_seq = max(next_seq, records[-1][1] + 1)
+            unread = [offset for offset, seq in records if seq >= read_seq]
+            if not unread:
+                segment.close(delete=True)
+                continue
+            if not self._segments:
+                self._read_offset = unread[0]
+            self._segments.append(segment)
+            self._pending += len(unread)
+
+        self._next_seq = next_seq
+        if self._segments:
+            self._read_seq = read_seq
+            self._segments[-1].truncate_tail()
+        else:
+            self._read_seq = next_seq
+            self._read_offset = SEGMENT_HEADER.size
+            self._segments.append(_Segment.create(self._reserve_path(), self.segment_size))
+        self._write_checkpoint()
+
+    @property
+    def pending(self) -> int:
+        """Number of spooled events not yet replayed."""
+        return self._pending
+
+    @property
+    def standby_needed(self) -> bool:
+        """Whether the next segment should be prepared ahead of time."""
+        return (
+            self._standby is None
+            and not self._standby_pending
+            and (len(self._segments) < self.max_segments or not self._pending)
+            and self._segments[-1].end * 2 >= len(self._segments[-1].map)
+        )
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Counters for diagnostics."""
+        return {
+            "pending": self._pending,
+            "spooled": self.spooled,
+            "replayed": self.replayed,
+            "segments": len(self._segments),
+            "segment_size": self.segment_size,
+            "max_segments": self.max_segments,
+            "next_sequence": self._next_seq,
+        }
+
+    def append(self, fields: Fields) -> bool:
+        """Append a validated event.
+
+        Args:
+            fields: Validated (device_id, button_id, action)
+
+        Returns:
+            True if the event was spooled, False if the spool is full or the
+            next segment is not ready yet (``awaiting_standby``)
+        """
+        payload = encode_fields(fields)
+        length = len(payload)
+        segment = self._segments[-1]
+        # A segment loaded from disk may be shorter than segment_size
+        if segment.end + RECORD_HEADER.size + length > len(segment.map):
+            segment = self._rotate()
+            if segment is None:
+                return False
+
+        offset = segment.end
+        start = offset + RECORD_HEADER.size
+        segment_map = segment.map
+        segment_map[start:start + length] = payload
+        # The header goes in last so a torn write leaves the end marker intact
+        RECORD_HEADER.pack_into(
+            segment_map, offset, length, zlib.crc32(payload), self._next_seq
+        )
+        segment.end = start + length
+        self._next_seq += 1
+        self._pending += 1
+        self.spooled += 1
+        return True
+
+    def read(self, limit: int) -> List[Fields]:
+        """Take up to ``limit`` of the oldest spooled events for replay.
+
+        Replayed events are removed from the spool and fully replayed
+        segments are deleted.
+
+        Args:
+            limit: Maximum number of events
+
+        Returns:
+            Fields of the events, oldest first
+        """
+        events: List[Fields] = []
+        count = min(limit, self._pending)
+        if count <= 0:
+            return events
+
+        segments = self._segments
+        segment = segments[0]
+        offset = self._read_offset
+        unpack_from = RECORD_HEADER.unpack_from
+        seq = self._read_seq
+        while len(events) < count:
+            if offset >= segment.end:
+                # Only a segment other than the active one can be exhausted here
+                segments.pop(0).close(delete=True)
+                segment = segments[0]
+                offset = SEGMENT_HEADER.size
+            length, _, seq = unpack_from(segment.map, offset)
+            start = offset + RECORD_HEADER.size
+            offset = start + length
+            events.append(decode_fields(segment.map[start:offset]))
+
+        self._read_offset = offset
+        self._read_seq = seq + 1
+        self._pending -= count
+        self.replayed += count
+        self._write_checkpoint()
+        return events
+
+    def reserve_standby(self) -> str:
+        """Reserve the path of the next segment for ``create_segment``."""
+        self._standby_pending = True
+        return self._reserve_path()
+
+    def create_segment(self, path: str) -> _Segment:
+        """Create a preallocated segment (blocking, may run in an executor).
+
+        Raises:
+            OSError: If the file cannot be created or mapped
+        """
+        return _Segment.create(path, self.segment_size)
+
+    def set_standby(self, segment: Optional[_Segment]) -> None:
+        """Install a segment prepared by ``create_segment`` as the next one.
+
+        Args:
+            segment: The prepared segment, or None if preparing it failed
+        """
+        self._standby_pending = False
+        if segment is None:
+            return
+        if self._closed or self._standby is not None:
+            segment.close(delete=True)
+            return
+        self._standby = segment
+        self.awaiting_standby = False
+
+    def extend(self, events: List[Fields]) -> int:
+        """Append events, creating segments as needed (blocking).
+
+        Used at shutdown for events that were waiting for the next segment.
+
+        Args:
+            events: Validated events, oldest first
+
+        Returns:
+            Number of events spooled before the spool was full
+        """
+        count = 0
+        for fields in events:
+            if not self.append(fields):
+                if not self.awaiting_standby:
+                    break
+                self.set_standby(self.create_segment(self.reserve_standby()))
+                if not self.append(fields):
+                    break
+            count += 1
+        return count
+
+    def sync(self) -> None:
+        """Write the mapped segments and checkpoint to disk (blocking)."""
+        for segment in self._segments:
+            segment.map.flush()
+        self._checkpoint.flush()
+
+    def close(self) -> None:
+        """Sync and close the spool (blocking).
+
+        Unreplayed events stay on disk and are replayed after the next open.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self.sync()
+        for segment in self._segments:
+            segment.close(delete=segment.end == SEGMENT_HEADER.size)
+        self._segments.clear()
+        if self._standby is not None:
+            self._standby.close(delete=True)
+            self._standby = None
+        self._checkpoint.close()
+        self._checkpoint_file.close()
+
+    def _rotate(self) -> Optional[_Segment]:
+        """Make the standby segment the active one.
+
+        Returns:
+            The new segment, or None if the spool is full or the standby
+            segment is not ready yet
+        """
+        segments = self._segments
+        if self._pending and len(segments) >= self.max_segments:
+            return None
+        segment = self._standby
+        if segment is None:
+            # Creating it here would block the event loop
+            self.awaiting_standby = True
+            return None
+        self._standby = None
+
+        if not self._pending:
+            # Everything has been replayed: the old segments can go
+            for old in segments:
+                old.close(delete=True)
+            segments.clear()
+            self._read_offset = SEGMENT_HEADER.size
+        segments.append(segment)
+        return segment
+
+    def _reserve_path(self) -> str:
+        """Return the path for a new segment file."""
+        index = self._next_index
+        self._next_index += 1
+        return os.path.join(self.directory, f"{index:010d}{SEGMENT_SUFFIX}")
+
+    def _write_checkpoint(self) -> None:
+        """Record the sequence number of the next event to replay."""
+        CHECKPOINT.pack_into(self._checkpoint, 0, self._read_seq)
@@ -1,26 +1,173 @@
 """TCP Server for receiving and converting messages to Home Assistant events."""
 
 import asyncio
+import contextlib
+import functools
+import itertools
 import logging
-import re
-from typing import Optional, Set
+import os
+import socket
+import ssl
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Mapping, Optional, Set, Tuple, Union
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CoreState, HomeAssistant
 
+from .ack import NACK_OVERLOADED, AckTracker, create_ack_tracker
+from .admission import (
+    AdmissionController,
+    Listener,
+    create_listen_socket,
+    open_file_limit,
+)
+from .binary import BinaryRegistry
+from .capture import Capture
 from .const import (
+    CAPTURE_DIRECTORY,
+    CONF_ACCEPT_RATE,
+    CONF_ACK_MODE,
+    CONF_BINARY_REGISTRY,
+    CONF_CAPTURE_SIZE_MB,
+    CONF_DEDUPE_WINDOW_MS,
+    CONF_DISPATCH_MAX_BATCH,
+    CONF_DISPATCH_MAX_DELAY_MS,
+    CONF_FRAME_CACHE_SIZE,
+    CONF_FRAMING,
+    CONF_DOUBLE_PRESS_MS,
+    CONF_GESTURES,
+    CONF_HEARTBEAT_INTERVAL,
+    CONF_IDLE_TIMEOUT,
+    CONF_INGEST_WORKERS,
+    CONF_LISTEN_BACKLOG,
+    CONF_LOG_SAMPLE_LIMIT,
+    CONF_LONG_PRESS_MS,
+    CONF_MAX_CONNECTIONS,
+    CONF_MAX_CONNECTIONS_PER_SOURCE,
+    CONF_MAX_HANDSHAKES,
+    CONF_OVERLOAD_POLICY,
+    CONF_PAUSE_ACCEPTING,
+    CONF_RATE_LIMIT_CONNECTION,
+    CONF_RATE_LIMIT_GLOBAL,
+    CONF_READ_BUFFER_SIZE,
+    CONF_ROUTES,
+    CONF_SERVER_MODE,
+    CONF_SOCKET_HANDOFF,
+    CONF_SOCKET_PATH,
+    CONF_SPOOL_SIZE_MB,
+    CONF_TCP_KEEPALIVE,
+    CONF_TLS_CERTFILE,
+    CONF_TLS_KEYFILE,
+    CONF_TRANSPORT,
+    DEFAULT_ACCEPT_RATE,
+    DEFAULT_ACK_MODE,
+    DEFAULT_CAPTURE_SIZE_MB,
+    DEFAULT_DEDUPE_WINDOW_MS,
+    DEFAULT_DISPATCH_MAX_BATCH,
+    DEFAULT_DISPATCH_MAX_DELAY_MS,
+    DEFAULT_FRAME_CACHE_SIZE,
+    DEFAULT_DOUBLE_PRESS_MS,
+    DEFAULT_GESTURES,
+    DEFAULT_HEARTBEAT_INTERVAL,
+    DEFAULT_IDLE_TIMEOUT,
+    DEFAULT_INGEST_WORKERS,
+    DEFAULT_LISTEN_BACKLOG,
+    DEFAULT_LOG_SAMPLE_LIMIT,
+    DEFAULT_LONG_PRESS_MS,
+    DEFAULT_MAX_CONNECTIONS,
+    DEFAULT_MAX_CONNECTIONS_PER_SOURCE,
+    DEFAULT_MAX_HANDSHAKES,
+    DEFAULT_OVERLOAD_POLICY,
+    DEFAULT_PAUSE_ACCEPTING,
+    DEFAULT_RATE_LIMIT_CONNECTION,
+    DEFAULT_RATE_LIMIT_GLOBAL,
+    DEFAULT_READ_BUFFER_SIZE,
+    DEFAULT_SERVER_MODE,
+    DEFAULT_SOCKET_HANDOFF,
+    DEFAULT_SOCKET_PATH,
+    DEFAULT_SPOOL_SIZE_MB,
+    DEFAULT_TCP_KEEPALIVE,
+    DEFAULT_TRANSPORT,
     EXPECTED_MESSAGE_PARTS,
-    MAX_FIELD_LENGTH,
-    FIELD_VALIDATION_PATTERN,
-    MAX_CONNECTIONS,
-    READ_TIMEOUT,
+    FRAMING_BINARY,
+    LEGACY_FRAMING,
+    LISTEN_HOST,
+    OPEN_FILE_HEADROOM,
+    OVERLOAD_DISCONNECT,
+    OVERLOAD_DROP_OLDEST,
+    OVERLOAD_PAUSE,
+    SERVER_MODE_PROTOCOL,
+    SHUTDOWN_TIMEOUT,
+    SOCKET_PERMISSIONS,
+    SPOOL_BACKLOG_SIZE,
+    SPOOL_DIRECTORY,
+    SPOOL_REPLAY_INTERVAL,
+    TRANSPORT_TCP,
+    TRANSPORT_UDP,
+    TRANSPORT_UNIX,
+)
+from .coalesce import EventCoalescer, create_coalescer
+from .datagram import UDPEventProtocol
+from .dispatch import EventDispatcher, ListenerQueue
+from .frame_cache import CachedFrame, FrameCache, build_cached_frame, create_frame_cache
+from .framing import FramingError, create_framer, heartbeat_frame
+from .handoff import adopt_socket, park_socket
+from .idle import IdleEntry, IdleReaper, set_keepalive
+from .log_utils import LazySanitized, LogSampler
+from .metrics import HandshakeMetrics, IngestMetrics
+from .protocol import TCPEventProtocol
+from .rate_limit import (
+    DROP_CONNECTION_RATE,
+    DROP_GLOBAL_RATE,
+    RateLimiter,
+    TokenBucket,
+    create_bucket,
 )
+from .routing import RouteTarget, RoutingTable, create_routing_table
+from .spool import Spool
+from .timer_wheel import TimerWheel
+from .tls import async_get_server_context
+from .validator import Fields, ValidationCode, describe_error, validate_frame
+from .workers import WorkerPool
 
 _LOGGER = logging.getLogger(__name__)
 
-# Buffer size for reading from TCP connections
-BUFFER_SIZE: int = 1024
-# Timeout for graceful shutdown
-SHUTDOWN_TIMEOUT: float = 5.0
+# Drop reasons for events refused or evicted by a full dispatch queue
+DROP_QUEUE_FULL: str = "queue_full"
+DROP_QUEUE_EVICTED: str = "queue_evicted"
+# Drop reasons for events refused by a full spool, or while its next segment
+# is prepared and the overload policy does not hold them
+DROP_SPOOL_FULL: str = "spool_full"
+DROP_SPOOL_ROTATING: str = "spool_rotating"
+# Drop reason for connections closed by the disconnect overload policy
+DROP_DISCONNECTED: str = "disconnected"
+# Validation codes counted as parse failures rather than validation failures
+_PARSE_FAILURE_CODES = (
+    ValidationCode.NOT_UTF8,
+    ValidationCode.WRONG_PART_COUNT,
+    ValidationCode.SHORT_RECORD,
+)
+# Options that change how the server listens, with their defaults; changing
+# any of them restarts the server
+_RESTART_OPTIONS: Dict[str, Any] = {
+    CONF_TRANSPORT: DEFAULT_TRANSPORT,
+    CONF_SOCKET_PATH: "",
+    CONF_SERVER_MODE: DEFAULT_SERVER_MODE,
+    CONF_FRAMING: LEGACY_FRAMING,
+    CONF_BINARY_REGISTRY: "",
+    CONF_INGEST_WORKERS: DEFAULT_INGEST_WORKERS,
+    CONF_SPOOL_SIZE_MB: DEFAULT_SPOOL_SIZE_MB,
+    CONF_TLS_CERTFILE: "",
+    CONF_TLS_KEYFILE: "",
+}
+# Options passed to ingest worker processes when they start
+_WORKER_OPTIONS: Dict[str, Any] = {
+    CONF_MAX_CONNECTIONS: DEFAULT_MAX_CONNECTIONS,
+    CONF_READ_BUFFER_SIZE: DEFAULT_READ_BUFFER_SIZE,
+    CONF_MAX_HANDSHAKES: DEFAULT_MAX_HANDSHAKES,
+    CONF_IDLE_TIMEOUT: DEFAULT_IDLE_TIMEOUT,
+    CONF_HEARTBEAT_INTERVAL: DEFAULT_HEARTBEAT_INTERVAL,
+    CONF_TCP_KEEPALIVE: DEFAULT_TCP_KEEPALIVE,
+}
 
 
 class TCPServer:
@@ -29,25 +176,364 @@ class TCPServer:
     This server listens for TCP connections and processes incoming messages
     in the format: device_id:button_id:action
 
+    Messages are framed per connection (newline-terminated by default, or
+    length-prefixed), so several messages may arrive in a single read.
+
     Each valid message is converted to a Home Assistant event with validated
-    and sanitized data.
+    and sanitized data. Events are queued and fired in batches by an
+    EventDispatcher so socket reads and bus dispatch are decoupled.
+
+    Optional per-connection and global token bucket rate limits protect the
+    event bus from flooding clients; what happens to excess messages is
+    selected by the overload policy. Validated frames are kept in an LRU
+    FrameCache so repeated messages skip validation entirely.
+
+    Two connection handler implementations are available: the default
+    stream mode runs one asyncio task per connection on top of
+    StreamReader/StreamWriter, while protocol mode drives a TCPEventProtocol
+    per connection from loop callbacks for lower per-connection overhead.
+
+    With ingest workers configured the server does not listen itself: a
+    WorkerPool of SO_REUSEPORT processes accepts connections, frames and
+    validates messages, and hands pre-validated events back to this server's
+    queue. Rate limits and the connection handler option do not apply then.
+
+    Besides TCP the server can listen on UDP, where every datagram carries one
+    or more frames, or on an AF_UNIX stream socket for co-located senders,
+    which uses the same connection handlers as TCP.
+
+    Binary framing replaces text validation with resolving the integer ids of
+    each record through a BinaryRegistry; the registry is announced to every
+    stream client when it connects.
+
+    With a TLS certificate configured, TCP connections are wrapped in TLS by
+    the Listener (or by the ingest workers) before either handler sees them.
+
+    With traffic capture enabled, every read is recorded by a Capture with
+    its arrival time and connection id for replaying offline.
     """
 
-    def __init__(self, hass: HomeAssistant, tcp_port: int, event_type: str) -> None:
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        tcp_port: int,
+        event_type: str,
+        options: Optional[Mapping[str, Any]] = None,
+        dispatcher: Optional[EventDispatcher] = None,
+    ) -> None:
         """Initialize the TCP server.
 
         Args:
             hass: Home Assistant instance
             tcp_port: Port number to listen on
             event_type: Event type to fire for incoming messages
+            options: Optional config entry options (framing, batching, limits, ...)
+            dispatcher: Dispatcher shared with other listeners; a private one
+                is created if omitted
+
+        Raises:
+            ValueError: If binary framing is configured with an invalid
+                registry, or the routes are invalid
         """
+        options = options or {}
         self.hass = hass
         self.tcp_port = tcp_port
         self.event_type = event_type
-        self.server: Optional[asyncio.Server] = None
-        self.client_tasks: Set[asyncio.Task] = set()
+        self.framing: str = options.get(CONF_FRAMING, LEGACY_FRAMING)
+        self.server_mode: str = options.get(CONF_SERVER_MODE, DEFAULT_SERVER_MODE)
+        self.transport: str = options.get(CONF_TRANSPORT, DEFAULT_TRANSPORT)
+        # Empty until a unix listener starts with the default path
+        self.socket_path: str = options.get(CONF_SOCKET_PATH, "")
+        # Listener for tcp, asyncio.Server for unix
+        self.server: Optional[Union[Listener, asyncio.Server]] = None
+        self.datagram_transport: Optional[asyncio.DatagramTransport] = None
+        self.ingest_workers: int = options.get(
+            CONF_INGEST_WORKERS, DEFAULT_INGEST_WORKERS
+        )
+        self.tls_certfile: str = options.get(CONF_TLS_CERTFILE, "")
+        self.tls_keyfile: str = options.get(CONF_TLS_KEYFILE, "")
+        self.ssl_context: Optional[ssl.SSLContext] = None
+        self.worker_pool: Optional[WorkerPool] = None
+        # Stream handler tasks with the reader and writer of their connection
+        self.client_tasks: Dict[
+            asyncio.Task, Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+        ] = {}
+        self.protocols: Set[TCPEventProtocol] = set()
         self._connection_count: int = 0
-        self._field_pattern = re.compile(FIELD_VALIDATION_PATTERN)
+        # Ids of stream connections in traffic captures; datagrams use 0
+        self.connection_ids = itertools.count(1)
+        self.capture: Optional[Capture] = None
+        # Replaced captures still writing out their buffer, awaited on stop
+        self._closing_captures: Set[asyncio.Task] = set()
+        # Set on stop: connections finish what they have read, then close
+        self._drain_requested = asyncio.Event()
+        self._all_closed: Optional[asyncio.Future] = None
+        self._global_bucket: Optional[TokenBucket] = None
+        # Bumped when rate limits change so connections replace their limiter
+        self.limits_generation: int = 0
+        self.metrics = IngestMetrics()
+        self.tls_metrics: Optional[HandshakeMetrics] = (
+            HandshakeMetrics() if self._uses_tls else None
+        )
+        self._event_log = LogSampler(_LOGGER, logging.INFO)
+        # One sampler per warning site, so a flood of one kind of warning
+        # cannot use up the lines of the others
+        self._reject_log = LogSampler(_LOGGER, logging.WARNING)
+        self._rate_limit_log = LogSampler(_LOGGER, logging.WARNING)
+        self._queue_full_log = LogSampler(_LOGGER, logging.WARNING)
+        self._spool_full_log = LogSampler(_LOGGER, logging.WARNING)
+        self._decode_log = LogSampler(_LOGGER, logging.WARNING)
+        self._format_log = LogSampler(_LOGGER, logging.WARNING)
+        self._validation_log = LogSampler(_LOGGER, logging.WARNING)
+        self._datagram_log = LogSampler(_LOGGER, logging.WARNING)
+        self._log_samplers = (
+            self._event_log,
+            self._reject_log,
+            self._rate_limit_log,
+            self._queue_full_log,
+            self._spool_full_log,
+            self._decode_log,
+            self._format_log,
+            self._validation_log,
+            self._datagram_log,
+        )
+        self.binary_registry: Optional[BinaryRegistry] = None
+        self.announcement: Optional[bytes] = None
+        self._validate = validate_frame
+        if self.framing == FRAMING_BINARY:
+            self.binary_registry = BinaryRegistry.from_json(
+                options.get(CONF_BINARY_REGISTRY, "")
+            )
+            self.announcement = self.binary_registry.announcement()
+            self._validate = self.binary_registry.resolve
+        self.routing_table: Optional[RoutingTable] = None
+        self.frame_cache: Optional[FrameCache] = None
+        self.timer_wheel = TimerWheel(hass.loop)
+        self.coalescer: Optional[EventCoalescer] = None
+        self.idle_reaper = IdleReaper(self.timer_wheel, 0, 0, heartbeat_frame(self.framing))
+        self._drop_counts: Dict[str, int] = {
+            DROP_CONNECTION_RATE: 0,
+            DROP_GLOBAL_RATE: 0,
+            DROP_QUEUE_FULL: 0,
+            DROP_QUEUE_EVICTED: 0,
+            DROP_SPOOL_FULL: 0,
+            DROP_SPOOL_ROTATING: 0,
+            DROP_DISCONNECTED: 0,
+        }
+        self.spool_size: int = (
+            options.get(CONF_SPOOL_SIZE_MB, DEFAULT_SPOOL_SIZE_MB) * 1024 * 1024
+        )
+        self.spool: Optional[Spool] = None
+        self._replay_handle: Optional[asyncio.TimerHandle] = None
+        self._preparing_segment: bool = False
+        # Events waiting for the next spool segment, oldest first
+        self._spool_backlog: Deque[Fields] = deque()
+        self.dispatcher = dispatcher if dispatcher is not None else EventDispatcher(hass)
+        # This listener's events, batched with its own options
+        self.event_queue: ListenerQueue = self.dispatcher.create_queue()
+        self._options: Optional[Dict[str, Any]] = None
+        self._configure(options)
+
+    def apply_options(self, options: Mapping[str, Any]) -> bool:
+        """Apply changed options to the running server.
+
+        Everything except the options in _RESTART_OPTIONS (and, with ingest
+        workers, _WORKER_OPTIONS) is applied without closing the listening
+        socket or any connection.
+
+        Args:
+            options: The new config entry options
+
+        Returns:
+            False if an option that requires a restart changed, in which case
+            nothing was applied
+
+        Raises:
+            ValueError: If the routes are invalid
+        """
+        restart_options = dict(_RESTART_OPTIONS)
+        if self.worker_pool is not None:
+            restart_options.update(_WORKER_OPTIONS)
+        for key, default in restart_options.items():
+            if options.get(key, default) != self._options.get(key, default):
+                _LOGGER.debug("Option %s changed, restart required", key)
+                return False
+        self._configure(options)
+        return True
+
+    def _configure(self, options: Mapping[str, Any]) -> None:
+        """Apply the options that can change while the server is running.
+
+        Shared state is replaced or retuned in place; connections pick up new
+        rate limits on their next read, and new acknowledgement and keepalive
+        settings when they connect.
+
+        Raises:
+            ValueError: If the routes are invalid
+        """
+        previous = self._options
+
+        def changed(*keys: str) -> bool:
+            return previous is None or any(
+                options.get(key) != previous.get(key) for key in keys
+            )
+
+        if changed(CONF_ROUTES):
+            # First, so that invalid routes leave the server unchanged
+            self.routing_table = create_routing_table(options.get(CONF_ROUTES, ""))
+        self._options = dict(options)
+
+        self.overload_policy: str = options.get(
+            CONF_OVERLOAD_POLICY, DEFAULT_OVERLOAD_POLICY
+        )
+        self.rate_limit_connection: int = options.get(
+            CONF_RATE_LIMIT_CONNECTION, DEFAULT_RATE_LIMIT_CONNECTION
+        )
+        self.rate_limit_global: int = options.get(
+            CONF_RATE_LIMIT_GLOBAL, DEFAULT_RATE_LIMIT_GLOBAL
+        )
+        if previous is not None and changed(
+            CONF_RATE_LIMIT_CONNECTION, CONF_RATE_LIMIT_GLOBAL
+        ):
+            self._global_bucket = create_bucket(
+                self.rate_limit_global, self.hass.loop.time()
+            )
+            self.limits_generation += 1
+
+        log_sample_limit = options.get(CONF_LOG_SAMPLE_LIMIT, DEFAULT_LOG_SAMPLE_LIMIT)
+        for sampler in self._log_samplers:
+            sampler.max_per_interval = log_sample_limit
+
+        if changed(CONF_CAPTURE_SIZE_MB):
+            self._replace_capture(
+                options.get(CONF_CAPTURE_SIZE_MB, DEFAULT_CAPTURE_SIZE_MB)
+            )
+        if changed(CONF_FRAME_CACHE_SIZE):
+            self.frame_cache = create_frame_cache(
+                options.get(CONF_FRAME_CACHE_SIZE, DEFAULT_FRAME_CACHE_SIZE)
+            )
+        if changed(
+            CONF_DEDUPE_WINDOW_MS, CONF_GESTURES, CONF_DOUBLE_PRESS_MS, CONF_LONG_PRESS_MS
+        ):
+            if self.coalescer is not None:
+                # Fire undecided gestures with the old settings
+                self.coalescer.flush()
+            self.coalescer = create_coalescer(
+                self.timer_wheel,
+                self._emit_event,
+                options.get(CONF_DEDUPE_WINDOW_MS, DEFAULT_DEDUPE_WINDOW_MS),
+                options.get(CONF_GESTURES, DEFAULT_GESTURES),
+                options.get(CONF_DOUBLE_PRESS_MS, DEFAULT_DOUBLE_PRESS_MS),
+                options.get(CONF_LONG_PRESS_MS, DEFAULT_LONG_PRESS_MS),
+            )
+
+        self.read_buffer_size: int = options.get(
+            CONF_READ_BUFFER_SIZE, DEFAULT_READ_BUFFER_SIZE
+        )
+        if changed(CONF_READ_BUFFER_SIZE):
+            # Protocol mode connections all read into this one buffer
+            self.receive_buffer: memoryview = memoryview(
+                bytearray(self.read_buffer_size)
+            )
+        self.idle_timeout: int = options.get(CONF_IDLE_TIMEOUT, DEFAULT_IDLE_TIMEOUT)
+        self.tcp_keepalive: int = options.get(CONF_TCP_KEEPALIVE, DEFAULT_TCP_KEEPALIVE)
+        self.idle_reaper.configure(
+            self.idle_timeout,
+            options.get(CONF_HEARTBEAT_INTERVAL, DEFAULT_HEARTBEAT_INTERVAL),
+        )
+        self.ack_mode: bool = options.get(CONF_ACK_MODE, DEFAULT_ACK_MODE)
+
+        self.max_connections: int = options.get(
+            CONF_MAX_CONNECTIONS, DEFAULT_MAX_CONNECTIONS
+        )
+        if changed(CONF_MAX_CONNECTIONS):
+            self._check_open_file_limit()
+        self.listen_backlog: int = options.get(
+            CONF_LISTEN_BACKLOG, DEFAULT_LISTEN_BACKLOG
+        )
+        self.accept_rate: int = options.get(CONF_ACCEPT_RATE, DEFAULT_ACCEPT_RATE)
+        self.max_connections_per_source: int = options.get(
+            CONF_MAX_CONNECTIONS_PER_SOURCE, DEFAULT_MAX_CONNECTIONS_PER_SOURCE
+        )
+        self.pause_accepting: bool = options.get(
+            CONF_PAUSE_ACCEPTING, DEFAULT_PAUSE_ACCEPTING
+        )
+        self.socket_handoff: bool = options.get(
+            CONF_SOCKET_HANDOFF, DEFAULT_SOCKET_HANDOFF
+        )
+        self.max_handshakes: int = options.get(
+            CONF_MAX_HANDSHAKES, DEFAULT_MAX_HANDSHAKES
+        )
+        if isinstance(self.server, Listener):
+            self.server.admission.configure(
+                self.max_connections,
+                self.max_connections_per_source,
+                self.accept_rate,
+                self.hass.loop.time(),
+            )
+            self.server.configure(
+                self.listen_backlog, self.pause_accepting, self.max_handshakes
+            )
+
+        self.event_queue.configure(
+            options.get(CONF_DISPATCH_MAX_BATCH, DEFAULT_DISPATCH_MAX_BATCH),
+            options.get(CONF_DISPATCH_MAX_DELAY_MS, DEFAULT_DISPATCH_MAX_DELAY_MS),
+        )
+
+    def _replace_capture(self, size_mb: int) -> None:
+        """Start, stop or resize the traffic capture.
+
+        The previous capture writes out what it has buffered in the
+        background; stop() waits for it.
+
+        Args:
+            size_mb: Total size of the capture files in MiB (0 = disabled)
+        """
+        previous = self.capture
+        self.capture = None
+        if previous is not None:
+            task = self.hass.loop.create_task(previous.close())
+            self._closing_captures.add(task)
+            task.add_done_callback(self._closing_captures.discard)
+        if not size_mb:
+            return
+        if self._uses_workers:
+            _LOGGER.warning(
+                "Traffic is not captured with ingest workers, which read it in "
+                "their own processes"
+            )
+            return
+        self.capture = Capture(
+            self.hass,
+            self.hass.config.path(CAPTURE_DIRECTORY.format(port=self.tcp_port)),
+            size_mb * 1024 * 1024,
+            self.transport,
+            self.framing,
+        )
+
+    async def _close_capture(self) -> None:
+        """Stop capturing traffic and write out the buffered records."""
+        capture = self.capture
+        if capture is not None:
+            self.capture = None
+            await capture.close()
+        if self._closing_captures:
+            await asyncio.gather(*self._closing_captures)
+
+    def _check_open_file_limit(self) -> None:
+        """Warn if the process may not open a file descriptor per connection.
+
+        The limit is shared by all of Home Assistant, so it is left to the
+        administrator instead of being raised here.
+        """
+        needed = self.max_connections + OPEN_FILE_HEADROOM
+        limit = open_file_limit()
+        if limit is not None and limit < needed:
+            _LOGGER.warning(
+                "The open file limit (%d) is too low for %d connections on port %d; "
+                "raise it (ulimit -n) to at least %d",
+                limit, self.max_connections, self.tcp_port, needed
+            )
 
     async def start(self) -> None:
         """Start the TCP server.
@@ -56,75 +542,407 @@ class TCPServer:
             OSError: If the port is already in use or cannot be bound
             asyncio.TimeoutError: If server startup times out
         """
+        self._global_bucket = create_bucket(
+            self.rate_limit_global, self.hass.loop.time()
+        )
+
+        if self.ingest_workers and (
+            self.transport != TRANSPORT_TCP or self.binary_registry is not None
+        ):
+            _LOGGER.warning(
+                "Ingest workers are only used with the tcp transport and text "
+                "framing, ignoring them"
+            )
+        if self.ack_mode and (
+            self.transport == TRANSPORT_UDP or self._uses_workers
+        ):
+            _LOGGER.warning(
+                "Acknowledgements are only sent on tcp and unix connections "
+                "handled by Home Assistant, not sending them"
+            )
+        if self.tls_certfile and not self._uses_tls:
+            _LOGGER.warning(
+                "TLS is only used with the tcp transport, ignoring the certificate"
+            )
+
+        # Listening socket handed over by the previous server on this port
+        parked = adopt_socket(self.hass, self.tcp_port)
+        if parked is not None and (
+            self.transport != TRANSPORT_TCP or self._uses_workers
+        ):
+            # No longer listening on it; free the port for the new listener
+            parked.close()
+            parked = None
+
         try:
-            self.server = await asyncio.start_server(
-                self.handle_connection, "0.0.0.0", self.tcp_port
+            if self._uses_tls:
+                # Also checks the certificate before ingest workers load it
+                self.ssl_context = await async_get_server_context(
+                    self.hass, self.tls_certfile, self.tls_keyfile
+                )
+            if self.spool_size:
+                await self._open_spool()
+            if self.transport == TRANSPORT_UDP:
+                await self._start_udp()
+                return
+            if self.transport == TRANSPORT_UNIX:
+                await self._start_unix()
+                return
+            if self._uses_workers:
+                await self._start_workers()
+                return
+            self._start_listener(parked)
+            _LOGGER.info(
+                "TCP Server started on port %d (%s mode%s)",
+                self.tcp_port, self.server_mode, ", TLS" if self._uses_tls else ""
             )
-            _LOGGER.info("TCP Server started on port %d", self.tcp_port)
         except OSError as e:
             _LOGGER.error(
                 "Failed to start TCP server on port %d: %s (errno: %d)",
                 self.tcp_port, e, e.errno if hasattr(e, 'errno') else -1
             )
+            await self._close_spool()
             raise
         except asyncio.TimeoutError as e:
             _LOGGER.error("Timeout starting TCP server on port %d", self.tcp_port)
+            await self._close_spool()
             raise
         except Exception as e:
             _LOGGER.error(
                 "Unexpected error starting TCP server on port %d: %s",
                 self.tcp_port, e
             )
+            await self._close_spool()
             raise
 
+    def _start_listener(self, sock: Optional[socket.socket] = None) -> None:
+        """Start listening on the configured TCP port with admission control.
+
+        Args:
+            sock: Listening socket to adopt instead of binding a new one
+
+        Raises:
+            OSError: If the port is already in use or cannot be bound
+        """
+        loop = self.hass.loop
+        if self.server_mode == SERVER_MODE_PROTOCOL:
+            protocol_factory = lambda: TCPEventProtocol(self)  # noqa: E731
+        else:
+            protocol_factory = self._create_stream_protocol
+        admission = AdmissionController(
+            self.max_connections,
+            self.max_connections_per_source,
+            self.accept_rate,
+            loop.time(),
+        )
+        if sock is None:
+            sock = create_listen_socket(LISTEN_HOST, self.tcp_port, self.listen_backlog)
+        else:
+            sock.listen(self.listen_backlog)
+        listener = Listener(
+            loop,
+            sock,
+            protocol_factory,
+            admission,
+            self.pause_accepting,
+            self._on_connection_rejected,
+            self.ssl_context,
+            self.max_handshakes,
+            self.tls_metrics,
+        )
+        listener.start()
+        self.server = listener
+
+    def _create_stream_protocol(self) -> asyncio.StreamReaderProtocol:
+        """Create the stream protocol of an admitted connection, as start_server does."""
+        return asyncio.StreamReaderProtocol(asyncio.StreamReader(), self._spawn_handler)
+
+    def _spawn_handler(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Start the connection handler task.
+
+        The task is created here rather than by StreamReaderProtocol so that
+        cancelling it on stop is not reported as an unhandled exception.
+        """
+        self.hass.loop.create_task(self.handle_connection(reader, writer))
+
+    def _on_connection_rejected(self, reason: str, peer: Any) -> None:
+        """Count and log a connection refused by admission control."""
+        self.metrics.connections_rejected += 1
+        self._reject_log.log("Rejected connection from %s (%s)", peer, reason)
+
+    def _release_connection(self, peer: Any) -> None:
+        """Release the admission of a closed TCP connection.
+
+        Args:
+            peer: Peer address of the connection
+        """
+        if isinstance(self.server, Listener):
+            self.server.release(peer)
+
+    @property
+    def admission_stats(self) -> Optional[Dict[str, Any]]:
+        """Admission control counters of the TCP listener, if running."""
+        if isinstance(self.server, Listener):
+            return self.server.stats
+        return None
+
+    @property
+    def tls_stats(self) -> Optional[Dict[str, Any]]:
+        """TLS handshake counters of the TCP listener or its workers, if TLS is on."""
+        if self.tls_metrics is None:
+            return None
+        return self.tls_metrics.as_dict()
+
+    @property
+    def _uses_tls(self) -> bool:
+        """Whether TCP connections are wrapped in TLS."""
+        return bool(self.tls_certfile) and self.transport == TRANSPORT_TCP
+
+    @property
+    def _uses_workers(self) -> bool:
+        """Whether connections are handled by ingest worker processes."""
+        return bool(self.ingest_workers) and (
+            self.transport == TRANSPORT_TCP and self.binary_registry is None
+        )
+
+    async def _open_spool(self) -> None:
+        """Open the on-disk spool and start replaying events left in it.
+
+        Raises:
+            OSError: If the spool directory or its files cannot be created
+        """
+        directory = self.hass.config.path(SPOOL_DIRECTORY.format(port=self.tcp_port))
+        self.spool = await self.hass.async_add_executor_job(
+            Spool.open, directory, self.spool_size
+        )
+        if self.spool.pending:
+            _LOGGER.info(
+                "Replaying %d spooled events on port %d",
+                self.spool.pending, self.tcp_port
+            )
+            self._schedule_replay()
+
+    async def _close_spool(self) -> None:
+        """Stop replaying and close the spool, keeping unreplayed events on disk."""
+        if self._replay_handle is not None:
+            self._replay_handle.cancel()
+            self._replay_handle = None
+        spool = self.spool
+        if spool is None:
+            return
+        self.spool = None
+        backlog = list(self._spool_backlog)
+        self._spool_backlog.clear()
+        if backlog:
+            spooled = await self.hass.async_add_executor_job(spool.extend, backlog)
+            if spooled < len(backlog):
+                self._drop_counts[DROP_SPOOL_FULL] += len(backlog) - spooled
+        await self.hass.async_add_executor_job(spool.close)
+        if spool.pending:
+            _LOGGER.info(
+                "Kept %d spooled events on port %d for the next start",
+                spool.pending, self.tcp_port
+            )
+
+    async def _start_udp(self) -> None:
+        """Start listening for datagrams on the configured port.
+
+        Raises:
+            OSError: If the port cannot be bound
+        """
+        self.datagram_transport, _ = await self.hass.loop.create_datagram_endpoint(
+            lambda: UDPEventProtocol(self), local_addr=(LISTEN_HOST, self.tcp_port)
+        )
+        _LOGGER.info("UDP listener started on port %d", self.tcp_port)
+
+    async def _start_unix(self) -> None:
+        """Start listening on the configured Unix domain socket path.
+
+        Without a configured path the socket is created in a directory of
+        its own under the config directory. A stale socket file left by a
+        previous run is replaced, and the socket is restricted to the Home
+        Assistant user and group.
+
+        Raises:
+            OSError: If the socket cannot be created
+        """
+        if not self.socket_path:
+            self.socket_path = self.hass.config.path(
+                DEFAULT_SOCKET_PATH.format(port=self.tcp_port)
+            )
+            await self.hass.async_add_executor_job(
+                functools.partial(
+                    os.makedirs, os.path.dirname(self.socket_path), exist_ok=True
+                )
+            )
+        if self.server_mode == SERVER_MODE_PROTOCOL:
+            self.server = await self.hass.loop.create_unix_server(
+                lambda: TCPEventProtocol(self), self.socket_path
+            )
+        else:
+            self.server = await asyncio.start_unix_server(
+                self.handle_connection, self.socket_path
+            )
+        os.chmod(self.socket_path, SOCKET_PERMISSIONS)
+        _LOGGER.info(
+            "Unix socket listener started on %s (%s mode)",
+            self.socket_path, self.server_mode
+        )
+
+    async def _start_workers(self) -> None:
+        """Start the SO_REUSEPORT ingest worker processes instead of listening.
+
+        Raises:
+            OSError: If a worker cannot bind the port
+            asyncio.TimeoutError: If a worker does not start in time
+        """
+        if self.rate_limit_connection or self.rate_limit_global:
+            _LOGGER.warning(
+                "Rate limits are not applied when ingest workers are enabled"
+            )
+        pool = WorkerPool(self, self.ingest_workers)
+        await pool.start()
+        self.worker_pool = pool
+        _LOGGER.info(
+            "TCP Server started on port %d (%d ingest workers)",
+            self.tcp_port, self.ingest_workers
+        )
+
     async def stop(self) -> None:
-        """Stop the server and cancel all client connections.
+        """Stop the server, draining its connections within SHUTDOWN_TIMEOUT.
 
         Performs graceful shutdown by:
-        1. Stopping acceptance of new connections
-        2. Cancelling all active client tasks
-        3. Waiting for tasks to complete (with timeout)
-        4. Closing the server socket
+        1. Stopping acceptance of new connections; with socket handoff the
+           listening socket is parked for the next server on this port
+        2. Draining every connection in parallel: reading stops, frames
+           already received are handled and acknowledged, and the
+           connection is closed
+        3. Aborting connections still open at the deadline
+        4. Firing undecided gestures and any events this listener still has
+           queued; spooled events stay on disk for the next start
+
+        Ingest workers are asked to stop instead, and their remaining events
+        are queued and fired before this returns. A UDP listener only has its
+        transport closed, and a Unix socket listener removes its socket file.
         """
+        if self.worker_pool is not None:
+            pool = self.worker_pool
+            self.worker_pool = None
+            await pool.stop()
+            self._flush_events()
+            await self._close_spool()
+            await self._close_capture()
+            _LOGGER.info("TCP Server stopped")
+            return
+
+        if self.datagram_transport is not None:
+            transport = self.datagram_transport
+            self.datagram_transport = None
+            transport.close()
+            self._flush_events()
+            await self._close_spool()
+            await self._close_capture()
+            _LOGGER.info("UDP listener stopped")
+            return
+
         if self.server is None:
             return  # Already stopped
 
         server = self.server
         self.server = None  # Mark as stopped to prevent double-stop
+        loop = self.hass.loop
+        deadline = loop.time() + SHUTDOWN_TIMEOUT
 
         # First, stop accepting new connections
-        server.close()
+        if (
+            isinstance(server, Listener)
+            and self.socket_handoff
+            and self.hass.state in (CoreState.starting, CoreState.running)
+        ):
+            park_socket(self.hass, self.tcp_port, server.detach())
+        else:
+            server.close()
         _LOGGER.debug("TCP Server closed to new connections")
+        if isinstance(server, Listener):
+            # Let connections still being set up register, so they are drained too
+            await self._wait(server.wait_closed(), deadline)
+        await self._drain(deadline)
+        if not isinstance(server, Listener) and not await self._wait(
+            server.wait_closed(), deadline
+        ):
+            _LOGGER.warning("Server did not close within %s seconds", SHUTDOWN_TIMEOUT)
 
-        # Cancel all active client connection tasks
-        if self.client_tasks:
-            _LOGGER.debug("Cancelling %d active client connections", len(self.client_tasks))
-            for task in self.client_tasks:
-                if not task.done():
-                    task.cancel()
+        # Fire whatever the connections queued before they were closed
+        self._flush_events()
+        await self._close_spool()
+        await self._close_capture()
 
-            # Wait for all client tasks to finish (with timeout)
-            try:
-                await asyncio.wait_for(
-                    asyncio.gather(*self.client_tasks, return_exceptions=True),
-                    timeout=SHUTDOWN_TIMEOUT
-                )
-            except asyncio.TimeoutError:
-                _LOGGER.warning(
-                    "Some client connections did not close within %s seconds",
-                    SHUTDOWN_TIMEOUT
-                )
+        if self.transport == TRANSPORT_UNIX:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self.socket_path)
 
-        # Wait for server to fully close (with timeout)
+        _LOGGER.info("TCP Server stopped")
+
+    async def _drain(self, deadline: float) -> None:
+        """Drain every connection in parallel, aborting those left at the deadline.
+
+        Args:
+            deadline: Loop time by which all connections must be closed
+        """
+        self._drain_requested.set()
+        if not self._connection_count:
+            return
+        _LOGGER.debug("Draining %d active client connections", self._connection_count)
+        self._all_closed = self.hass.loop.create_future()
+        for reader, writer in self.client_tasks.values():
+            # The handler reads what is buffered, then sees end of stream
+            writer.transport.pause_reading()
+            reader.feed_eof()
+        for protocol in list(self.protocols):
+            protocol.drain()
+        if await self._wait(asyncio.shield(self._all_closed), deadline):
+            return
+
+        _LOGGER.warning(
+            "%d client connections did not close within %s seconds, aborting them",
+            self._connection_count, SHUTDOWN_TIMEOUT
+        )
+        for task, (_, writer) in list(self.client_tasks.items()):
+            writer.transport.abort()
+            task.cancel()
+        for protocol in list(self.protocols):
+            protocol.abort()
+        # Aborted connections close on the next loop iterations
+        await self._all_closed
+
+    async def _wait(self, awaitable: Any, deadline: float) -> bool:
+        """Wait for an awaitable until a deadline.
+
+        Returns:
+            True if it finished in time
+        """
         try:
-            await asyncio.wait_for(server.wait_closed(), timeout=SHUTDOWN_TIMEOUT)
+            await asyncio.wait_for(awaitable, max(0.0, deadline - self.hass.loop.time()))
         except asyncio.TimeoutError:
-            _LOGGER.warning(
-                "Server did not close within %s seconds",
-                SHUTDOWN_TIMEOUT
-            )
+            return False
+        return True
 
-        _LOGGER.info("TCP Server stopped")
+    @property
+    def draining(self) -> bool:
+        """Whether the server is stopping and draining its connections."""
+        return self._drain_requested.is_set()
+
+    def _connection_closed(self) -> None:
+        """Count a closed connection, waking a drain waiting for the last one."""
+        self._connection_count -= 1
+        if (
+            not self._connection_count
+            and self._all_closed is not None
+            and not self._all_closed.done()
+        ):
+            self._all_closed.set_result(None)
 
     async def handle_connection(
         self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
@@ -135,33 +953,38 @@ class TCPServer:
 
         Args:
             reader: Stream reader for receiving data
-            writer: Stream writer for sending data (currently unused)
+            writer: Stream writer for sending data
         """
+        peer = writer.get_extra_info("peername")
         # Check connection limit before accepting
-        if self._connection_count >= MAX_CONNECTIONS:
-            addr = writer.get_extra_info("peername")
+        if self._connection_count >= self.max_connections:
+            self.metrics.connections_rejected += 1
             _LOGGER.warning(
                 "Connection limit reached (%d/%d), rejecting connection from %s",
-                self._connection_count, MAX_CONNECTIONS, addr
+                self._connection_count, self.max_connections, peer
             )
             try:
                 writer.close()
                 await writer.wait_closed()
             except Exception as e:
                 _LOGGER.debug("Error closing rejected connection: %s", e)
+            finally:
+                self._release_connection(peer)
             return
 
         self._connection_count += 1
+        self.metrics.connections_accepted += 1
         task = asyncio.current_task()
         if task:
-            self.client_tasks.add(task)
+            self.client_tasks[task] = (reader, writer)
 
         try:
             await self._handle_connection_impl(reader, writer)
         finally:
-            self._connection_count -= 1
+            self._connection_closed()
+            self._release_connection(peer)
             if task:
-                self.client_tasks.discard(task)
+                self.client_tasks.pop(task, None)
 
     async def _handle_connection_impl(
         self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
@@ -169,51 +992,88 @@ class TCPServer:
         """Internal connection handler implementation.
 
         Processes incoming messages with validation and sanitization:
-        - Enforces read timeouts
+        - Closes idle connections through the idle reaper
         - Validates message format
         - Sanitizes field contents
         - Fires Home Assistant events
 
         Args:
             reader: Stream reader for receiving data
-            writer: Stream writer for connection management
+            writer: Stream writer for acknowledgements and connection management
         """
-        addr = writer.get_extra_info("peername")
+        # Unix socket peers are unnamed; log the listening path instead
+        addr = writer.get_extra_info("peername") or self.socket_path
         _LOGGER.info("Connection established from %s", addr)
+        connection = next(self.connection_ids)
+        if self.capture is not None:
+            self.capture.opened(connection, addr, self.hass.loop.time())
+
+        def on_idle() -> bool:
+            _LOGGER.debug(
+                "Idle timeout (%s seconds) from %s, closing connection",
+                self.idle_timeout, addr
+            )
+            writer.close()
+            return True
+
+        idle = self._watch_connection(writer.transport, on_idle)
+        framer = create_framer(self.framing)
+        limiter = self._create_rate_limiter()
+        limits_generation = self.limits_generation
+        acks = self._create_ack_tracker()
+        handle_frame = acks.handle if acks is not None else self._handle_frame
+        if self.announcement is not None:
+            writer.write(self.announcement)
+        metrics = self.metrics
+        loop = self.hass.loop
+        received_at = loop.time()
 
         try:
             while True:
-                # Read with timeout to prevent hung connections
-                try:
-                    data = await asyncio.wait_for(
-                        reader.read(BUFFER_SIZE),
-                        timeout=READ_TIMEOUT
-                    )
-                except asyncio.TimeoutError:
-                    _LOGGER.debug(
-                        "Read timeout (%s seconds) from %s, closing connection",
-                        READ_TIMEOUT, addr
-                    )
-                    break
-
+                # Hung connections are closed by the idle reaper, ending the read
+                data = await reader.read(self.read_buffer_size)
                 if not data:
-                    _LOGGER.info("Connection from %s closed by peer", addr)
+                    if not writer.is_closing() and not self.draining:
+                        _LOGGER.info("Connection from %s closed by peer", addr)
                     break
 
-                # Decode and validate UTF-8
-                try:
-                    raw_payload = data.decode("utf-8").strip()
-                except UnicodeDecodeError:
-                    _LOGGER.warning("Received non-UTF-8 data from %s", addr)
-                    continue
+                received_at = loop.time()
+                idle.last_activity = received_at
+                metrics.bytes_received += len(data)
+                if self.capture is not None:
+                    self.capture.data(connection, received_at, data)
+                if limits_generation != self.limits_generation:
+                    limiter = self._create_rate_limiter()
+                    limits_generation = self.limits_generation
 
-                # Sanitize for logging to prevent log injection
-                safe_payload = self._sanitize_for_log(raw_payload)
-                _LOGGER.debug("Received raw payload from %s: %s", addr, safe_payload)
+                # Process every complete frame; partial frames stay buffered
+                frames = framer.feed(data)
+                if limiter is None:
+                    for frame in frames:
+                        handle_frame(frame, addr, received_at)
+                elif not await self._handle_limited_frames(
+                    frames, limiter, writer, addr, received_at, acks
+                ):
+                    break
+                else:
+                    # Time spent paused by the rate limiter is not idleness
+                    idle.last_activity = loop.time()
+                if acks is not None:
+                    # One write acknowledges everything from this read; stop
+                    # reading while a client that does not read its replies
+                    # lets them pile up
+                    reply = acks.reply()
+                    if reply:
+                        writer.write(reply)
+                        await writer.drain()
 
-                # Process the message
-                self._process_message(raw_payload, addr)
+            # Accept a final unterminated message before closing
+            for frame in framer.flush():
+                handle_frame(frame, addr, received_at)
 
+        except FramingError as e:
+            metrics.parse_failures += 1
+            _LOGGER.warning("Framing error from %s, closing connection: %s", addr, e)
         except asyncio.CancelledError:
             _LOGGER.debug("Connection handler for %s cancelled", addr)
             raise  # Re-raise to properly propagate cancellation
@@ -224,125 +1084,501 @@ class TCPServer:
         except Exception as e:
             _LOGGER.error("Unexpected error handling connection from %s: %s", addr, e)
         finally:
+            self.idle_reaper.unwatch(idle)
+            if self.capture is not None:
+                self.capture.closed(connection, loop.time())
             try:
+                if acks is not None and not writer.is_closing():
+                    reply = acks.reply()
+                    if reply:
+                        writer.write(reply)
                 writer.close()
                 await writer.wait_closed()
             except Exception as e:
                 _LOGGER.debug("Error closing writer for %s: %s", addr, e)
             _LOGGER.info("Connection with %s closed", addr)
 
-    def _process_message(self, raw_payload: str, addr: tuple) -> None:
-        """Process and validate an incoming message.
+    def _watch_connection(
+        self, transport: asyncio.BaseTransport, on_idle: Callable[[], bool]
+    ) -> IdleEntry:
+        """Apply the idle policies to a new stream connection.
+
+        Args:
+            transport: Transport of the connection
+            on_idle: Closes the connection after the idle timeout, see
+                IdleReaper.watch
+
+        Returns:
+            The idle entry whose ``last_activity`` must be updated on reads
+        """
+        if self.tcp_keepalive and self.transport == TRANSPORT_TCP:
+            set_keepalive(transport.get_extra_info("socket"), self.tcp_keepalive)
+        # ACK replies already tell senders that the server is alive
+        write = None if self.ack_mode else transport.write
+        return self.idle_reaper.watch(on_idle, write)
+
+    def _create_rate_limiter(self) -> Optional[RateLimiter]:
+        """Create the rate limiter for a new connection.
+
+        Returns:
+            A RateLimiter, or None if no rate limit is configured
+        """
+        connection_bucket = create_bucket(
+            self.rate_limit_connection, self.hass.loop.time()
+        )
+        if connection_bucket is None and self._global_bucket is None:
+            return None
+        return RateLimiter(connection_bucket, self._global_bucket)
+
+    def _create_ack_tracker(self) -> Optional[AckTracker]:
+        """Create the acknowledgement tracker for a new connection.
+
+        Returns:
+            An AckTracker, or None if ack mode is disabled
+        """
+        return create_ack_tracker(
+            self.ack_mode,
+            self._handle_frame,
+            self._record_bad_sequence,
+            self.binary_registry is not None,
+        )
+
+    async def _handle_limited_frames(
+        self,
+        frames: List[bytes],
+        limiter: RateLimiter,
+        writer: asyncio.StreamWriter,
+        addr: tuple,
+        received_at: float,
+        acks: Optional[AckTracker] = None,
+    ) -> bool:
+        """Handle frames subject to rate limiting and the overload policy.
+
+        Args:
+            frames: Complete frames from the latest read
+            limiter: Rate limiter of this connection
+            writer: Stream writer, used for transport flow control
+            addr: Client address for logging
+            received_at: Loop time at which the frames were read
+            acks: Acknowledgement tracker of this connection, if in ack mode
+
+        Returns:
+            False if the connection should be closed, True otherwise
+        """
+        loop = self.hass.loop
+        policy = self.overload_policy
+        handle_frame = acks.handle if acks is not None else self._handle_frame
+
+        for frame in frames:
+            reason = limiter.try_acquire(loop.time())
+            if reason is not None:
+                if policy == OVERLOAD_PAUSE:
+                    await self._pause_until_admitted(limiter, writer)
+                elif policy == OVERLOAD_DISCONNECT:
+                    self._record_overload_disconnect(reason, addr)
+                    return False
+                elif not self._admit_overloaded(reason):
+                    if acks is not None:
+                        acks.reject(frame, NACK_OVERLOADED)
+                    continue
+
+            handle_frame(frame, addr, received_at)
+
+        return True
+
+    def _admit_overloaded(self, reason: str) -> bool:
+        """Apply the drop overload policies to a frame over the rate limit.
+
+        Args:
+            reason: Drop reason returned by the rate limiter
+
+        Returns:
+            True if the frame should still be handled, False if it was dropped
+        """
+        if self.overload_policy == OVERLOAD_DROP_OLDEST and self.event_queue.evict_oldest():
+            # The evicted queued event makes room for the newer one
+            self._drop_counts[DROP_QUEUE_EVICTED] += 1
+            return True
+        self._drop_counts[reason] += 1
+        return False
+
+    def _record_overload_disconnect(self, reason: str, addr: tuple) -> None:
+        """Count and log a connection closed by the disconnect overload policy.
+
+        Args:
+            reason: Drop reason returned by the rate limiter
+            addr: Client address for logging
+        """
+        self._drop_counts[reason] += 1
+        self._drop_counts[DROP_DISCONNECTED] += 1
+        self._rate_limit_log.log(
+            "Rate limit exceeded (%s) by %s, closing connection", reason, addr
+        )
+
+    async def _pause_until_admitted(
+        self, limiter: RateLimiter, writer: asyncio.StreamWriter
+    ) -> None:
+        """Stop reading from the transport until the limiter admits a frame.
+
+        While reading is paused the kernel receive buffer fills up and TCP
+        flow control slows the sender down instead of messages being lost.
+
+        Args:
+            limiter: Rate limiter of this connection
+            writer: Stream writer whose transport is paused
+        """
+        loop = self.hass.loop
+        transport = writer.transport
+        transport.pause_reading()
+        try:
+            # A draining connection handles everything it has already read
+            while not self.draining and limiter.try_acquire(loop.time()) is not None:
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(
+                        self._drain_requested.wait(),
+                        limiter.time_until_available(loop.time()),
+                    )
+        finally:
+            if not transport.is_closing() and not self.draining:
+                transport.resume_reading()
+
+    @property
+    def drop_counts(self) -> Dict[str, int]:
+        """Number of messages dropped or connections closed, by reason."""
+        return dict(self._drop_counts)
+
+    def _handle_frame(
+        self, frame: bytes, addr: tuple, received_at: float
+    ) -> int:
+        """Validate a single frame (or find it in the frame cache) and queue its event.
 
         Expected format: device_id:button_id:action
 
         Args:
-            raw_payload: The raw message string
+            frame: One complete frame as produced by the framer
             addr: Client address for logging
+            received_at: Loop time at which the frame was read
+
+        Returns:
+            ValidationCode.OK if the frame was accepted, NACK_OVERLOADED if
+            its event was dropped, otherwise the reason it was rejected
         """
-        # Split with maxsplit to handle potential extra colons in data
-        parts = raw_payload.split(":", maxsplit=EXPECTED_MESSAGE_PARTS - 1)
+        cache = self.frame_cache
+        cached = cache.get(frame) if cache is not None else None
 
-        if len(parts) != EXPECTED_MESSAGE_PARTS:
-            _LOGGER.warning(
-                "Invalid message format from %s: expected %d parts, got %d: %s",
-                addr, EXPECTED_MESSAGE_PARTS, len(parts),
-                self._sanitize_for_log(raw_payload)
+        if cached is None:
+            if not frame or (self.binary_registry is None and not frame.strip()):
+                return ValidationCode.OK  # Heartbeat (blank lines count as one)
+            code, fields, detail = self._validate(frame)
+
+            if code is not ValidationCode.OK:
+                self.metrics.messages_received += 1
+                self._log_invalid_frame(frame, code, detail, addr)
+                return code
+
+            cached = build_cached_frame(fields)
+            if cache is not None:
+                cache.put(frame, cached)
+
+        self.metrics.messages_received += 1
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug(
+                "Received raw payload from %s: %s", addr, LazySanitized(frame)
             )
-            return
 
-        device_id, button_id, action_type = parts
+        if not self._submit_event(cached, received_at, addr):
+            return NACK_OVERLOADED
+        return ValidationCode.OK
 
-        # Validate and sanitize each field
-        try:
-            validated_device_id = self._validate_field(device_id, "device_id")
-            validated_button_id = self._validate_field(button_id, "button_id")
-            validated_action = self._validate_field(action_type, "action")
-        except ValueError as e:
-            _LOGGER.warning("Message validation failed from %s: %s", addr, e)
-            return
+    def _submit_event(self, cached: CachedFrame, received_at: float, addr: tuple) -> bool:
+        """Queue a validated event, through the coalescer if one is enabled.
 
-        # Create event data and fire event
-        event_data = {
-            "device_id": validated_device_id,
-            "button_id": validated_button_id,
-            "action": validated_action,
-        }
+        Args:
+            cached: Validated fields and event payload
+            received_at: Loop time at which the message was read
+            addr: Client address for logging
 
-        _LOGGER.info(
-            "Firing event %s with data: %s",
-            self.event_type, event_data
+        Returns:
+            False if the event was dropped, True otherwise (always True with
+            the coalescer, which decides what to emit later)
+        """
+        if self.coalescer is not None:
+            self.coalescer.submit(cached, received_at, addr)
+            return True
+        return self._emit_event(cached.event_data, received_at, addr)
+
+    def _emit_event(
+        self, event_data: Dict[str, Any], received_at: float, addr: tuple
+    ) -> bool:
+        """Log and queue an event, of the event type or service it is routed to.
+
+        Returns:
+            False if the event was dropped, True otherwise
+        """
+        target = self._route(event_data)
+        self._event_log.log(
+            "Firing event %s with data: %s" if target.__class__ is str
+            else "Calling %s for %s",
+            target, event_data
         )
-        self.hass.bus.async_fire(self.event_type, event_data)
+        return self._enqueue_event(target, event_data, received_at, addr)
 
-    def _validate_field(self, field: str, field_name: str) -> str:
-        """Validate and sanitize a message field.
+    def _route(self, event_data: Dict[str, Any]) -> RouteTarget:
+        """Find the event type or service call of an event.
 
-        Validation rules:
-        - Maximum length of MAX_FIELD_LENGTH characters
-        - Only alphanumeric, underscore, and hyphen characters
-        - Pattern: ^[a-zA-Z0-9_-]+$
+        Returns:
+            The target of the matching route, otherwise this server's event type
+        """
+        routing_table = self.routing_table
+        if routing_table is None:
+            return self.event_type
+        target = routing_table.lookup(
+            (event_data["device_id"], event_data["button_id"], event_data["action"])
+        )
+        return self.event_type if target is None else target
+
+    def _flush_events(self) -> None:
+        """Fire undecided gestures and everything still queued on shutdown."""
+        if self.coalescer is not None:
+            self.coalescer.flush()
+        self.timer_wheel.close()
+        self.event_queue.flush()
+
+    def _enqueue_event(
+        self,
+        event_type: RouteTarget,
+        event_data: Dict[str, Any],
+        received_at: float,
+        addr: tuple,
+    ) -> bool:
+        """Queue a validated event, applying the overload policy if the queue is full.
+
+        With the spool enabled, events are spooled instead while Home
+        Assistant is not running, while the queue is full, and while earlier
+        events are still waiting in the spool so that order is preserved.
 
         Args:
-            field: The field value to validate
-            field_name: Name of the field for error messages
+            event_type: Event type to fire, or service to call instead
+            event_data: Event payload
+            received_at: Loop time at which the message was read
+            addr: Client address for logging
 
         Returns:
-            The validated field value (stripped)
-
-        Raises:
-            ValueError: If validation fails
+            False if the event was dropped, True if it was queued or spooled
         """
-        # Strip whitespace
-        field = field.strip()
+        event_queue = self.event_queue
+        spool = self.spool
+        if spool is not None and (
+            spool.pending
+            or self._spool_backlog
+            or self.hass.state is not CoreState.running
+        ):
+            return self._spool_event(spool, event_data, addr)
 
-        # Check for empty field
-        if not field:
-            raise ValueError(f"{field_name} cannot be empty")
+        if event_queue.enqueue(event_type, event_data, received_at, self.metrics):
+            return True
 
-        # Check maximum length
-        if len(field) > MAX_FIELD_LENGTH:
-            raise ValueError(
-                f"{field_name} exceeds maximum length "
-                f"({len(field)} > {MAX_FIELD_LENGTH}): {field[:20]}..."
-            )
+        if spool is not None:
+            return self._spool_event(spool, event_data, addr)
 
-        # Validate character set
-        if not self._field_pattern.match(field):
-            raise ValueError(
-                f"{field_name} contains invalid characters "
-                f"(must match {FIELD_VALIDATION_PATTERN}): {field[:20]}..."
+        if self.overload_policy == OVERLOAD_DROP_OLDEST and event_queue.evict_oldest():
+            self._drop_counts[DROP_QUEUE_EVICTED] += 1
+            event_queue.enqueue(event_type, event_data, received_at, self.metrics)
+            return True
+
+        self._drop_counts[DROP_QUEUE_FULL] += 1
+        self._queue_full_log.log(
+            "Event queue full (%d pending), dropping event from %s",
+            self.dispatcher.pending, addr
+        )
+        return False
+
+    def _spool_event(self, spool: Spool, event_data: Dict[str, Any], addr: tuple) -> bool:
+        """Append an event to the spool and make sure it will be replayed.
+
+        Args:
+            spool: The open spool
+            event_data: Event payload
+            addr: Client address for logging
+
+        Returns:
+            False if the event was dropped, True otherwise
+        """
+        fields = (event_data["device_id"], event_data["button_id"], event_data["action"])
+        if self._spool_backlog or not spool.append(fields):
+            if self._spool_backlog or spool.awaiting_standby:
+                return self._hold_for_spool(spool, fields, addr)
+            self._drop_counts[DROP_SPOOL_FULL] += 1
+            self._spool_full_log.log(
+                "Event spool full (%d pending), dropping event from %s",
+                spool.pending, addr
             )
+            return False
 
-        return field
+        if spool.standby_needed and not self._preparing_segment:
+            self._prepare_spool_segment(spool)
+        self._schedule_replay()
+        return True
 
-    @staticmethod
-    def _sanitize_for_log(message: str) -> str:
-        """Sanitize a message for safe logging.
+    def _hold_for_spool(self, spool: Spool, fields: Fields, addr: tuple) -> bool:
+        """Handle an event that arrived while the next spool segment is prepared.
 
-        Removes control characters and limits length to prevent:
-        - Log injection attacks
-        - Log file bloat
-        - Terminal control sequence abuse
+        With the pause overload policy the event waits in memory and is
+        spooled once the segment is ready; otherwise it is dropped.
 
         Args:
-            message: The message to sanitize
+            spool: The open spool
+            fields: Validated (device_id, button_id, action)
+            addr: Client address for logging
 
         Returns:
-            Sanitized message safe for logging
+            False if the event was dropped, True if it is waiting
+        """
+        if spool.standby_needed and not self._preparing_segment:
+            self._prepare_spool_segment(spool)
+        backlog = self._spool_backlog
+        if self.overload_policy == OVERLOAD_PAUSE and len(backlog) < SPOOL_BACKLOG_SIZE:
+            backlog.append(fields)
+            return True
+        self._drop_counts[DROP_SPOOL_ROTATING] += 1
+        self._spool_full_log.log(
+            "Next spool segment not ready (%d events waiting), dropping event from %s",
+            len(backlog), addr
+        )
+        return False
+
+    def _spool_backlog_events(self, spool: Spool) -> None:
+        """Spool the events that waited for the segment that is now ready."""
+        backlog = self._spool_backlog
+        while backlog and spool.append(backlog[0]):
+            backlog.popleft()
+        if backlog and not spool.awaiting_standby:
+            self._drop_counts[DROP_SPOOL_FULL] += len(backlog)
+            _LOGGER.warning(
+                "Event spool full, dropped %d events waiting for it", len(backlog)
+            )
+            backlog.clear()
+        if spool.standby_needed and not self._preparing_segment:
+            self._prepare_spool_segment(spool)
+        self._schedule_replay()
+
+    def _prepare_spool_segment(self, spool: Spool) -> None:
+        """Create the next spool segment in the executor before it is needed."""
+        self._preparing_segment = True
+        future = self.hass.async_add_executor_job(
+            spool.create_segment, spool.reserve_standby()
+        )
+
+        def _done(future: asyncio.Future) -> None:
+            self._preparing_segment = False
+            if future.cancelled() or future.exception() is not None:
+                _LOGGER.warning(
+                    "Failed to prepare spool segment: %s",
+                    None if future.cancelled() else future.exception()
+                )
+                # Waiting events stay held; the next event retries, and
+                # shutdown spools them in any case
+                spool.set_standby(None)
+                return
+            spool.set_standby(future.result())
+            if self.spool is spool and self._spool_backlog:
+                self._spool_backlog_events(spool)
+
+        future.add_done_callback(_done)
+
+    def _schedule_replay(self, delay: float = SPOOL_REPLAY_INTERVAL) -> None:
+        """Schedule the next replay of spooled events unless one is pending."""
+        if self._replay_handle is None:
+            self._replay_handle = self.hass.loop.call_later(delay, self._replay)
+
+    def _replay(self) -> None:
+        """Move spooled events to the dispatch queue once the bus has caught up.
+
+        Events are only replayed while Home Assistant is running and the
+        dispatch queue holds less than one batch, so replay never competes
+        with a backlog of live events.
         """
-        # Remove control characters (except tab and newline, then replace those too)
-        sanitized = "".join(
-            char if char.isprintable() or char in ("\t", "\n") else "?"
-            for char in message
+        self._replay_handle = None
+        spool = self.spool
+        if spool is None or not spool.pending:
+            return
+
+        dispatcher = self.dispatcher
+        event_queue = self.event_queue
+        room = min(
+            event_queue.max_batch - event_queue.pending,
+            dispatcher.queue_size - dispatcher.pending,
         )
+        if self.hass.state is CoreState.running and room > 0:
+            now = self.hass.loop.time()
+            for fields in spool.read(room):
+                event_data = build_cached_frame(fields).event_data
+                event_queue.enqueue(
+                    self._route(event_data), event_data, now, self.metrics
+                )
+            if spool.pending:
+                # Keep pace with the dispatcher, which drains one batch per tick
+                self._schedule_replay(0)
+                return
+        if spool.pending:
+            self._schedule_replay()
+        else:
+            _LOGGER.debug("Spool on port %d replayed", self.tcp_port)
 
-        # Replace tabs and newlines with spaces to prevent log injection
-        sanitized = sanitized.replace("\t", " ").replace("\n", " ").replace("\r", " ")
+    def _process_message(self, raw_payload: str, addr: tuple) -> None:
+        """Process and validate an already decoded message.
 
-        # Limit length for logging
-        max_log_length = 200
-        if len(sanitized) > max_log_length:
-            sanitized = sanitized[:max_log_length] + "... (truncated)"
+        Args:
+            raw_payload: The raw message string
+            addr: Client address for logging
+        """
+        self._handle_frame(raw_payload.encode("utf-8"), addr, self.hass.loop.time())
+
+    def _record_bad_sequence(self, frame: bytes, addr: tuple) -> None:
+        """Count and log a frame whose sequence number is malformed.
+
+        Args:
+            frame: The rejected frame, including its prefix
+            addr: Client address for logging
+        """
+        self.metrics.messages_received += 1
+        self.metrics.parse_failures += 1
+        self._format_log.log(
+            "Invalid sequence number from %s: %s", addr, LazySanitized(frame)
+        )
 
-        return sanitized
+    def _log_invalid_frame(
+        self,
+        frame: bytes,
+        code: ValidationCode,
+        detail: Optional[str],
+        addr: tuple,
+    ) -> None:
+        """Log why a frame was rejected.
+
+        Args:
+            frame: The rejected frame
+            code: Validation result code
+            detail: Detail returned by the validator
+            addr: Client address for logging
+        """
+        if code in _PARSE_FAILURE_CODES:
+            self.metrics.parse_failures += 1
+        else:
+            self.metrics.validation_failures += 1
+
+        if code is ValidationCode.NOT_UTF8:
+            self._decode_log.log("Received non-UTF-8 data from %s", addr)
+            return
+
+        if code is ValidationCode.WRONG_PART_COUNT:
+            self._format_log.log(
+                "Invalid message format from %s: expected %d parts, got %s: %s",
+                addr, EXPECTED_MESSAGE_PARTS, detail, LazySanitized(frame)
+            )
+            return
+
+        self._validation_log.log(
+            "Message validation failed from %s: %s: %s",
+            addr, describe_error(code, detail), LazySanitized(frame, 20)
+        )
@@ -0,0 +1,172 @@
+"""Hashed timer wheel for large numbers of short, mostly cancelled timers.
+
+Scheduling one loop timer (or one task) per key costs a heap entry and a
+handle per timer. The wheel instead hashes every timer into one of a fixed
+number of slots by its expiry tick and drives all of them from a single loop
+timer that is only armed while timers are pending, and only for the next
+occupied slot, so long timers (idle connections) do not wake the loop every
+tick. Scheduling and cancelling are O(1); timers fire at tick granularity,
+never early.
+"""
+
+import asyncio
+import logging
+import math
+from typing import Any, Callable, List, Optional
+
+from .const import TIMER_WHEEL_SLOTS, TIMER_WHEEL_TICK
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class WheelTimer:
+    """A timer scheduled on a TimerWheel."""
+
+    __slots__ = ("tick", "callback", "args", "cancelled")
+
+    def __init__(self, tick: int, callback: Callable[..., Any], args: tuple) -> None:
+        """Initialize the timer."""
+        self.tick = tick
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+
+class TimerWheel:
+    """Timers hashed into slots by expiry tick and driven by one loop timer."""
+
+    __slots__ = (
+        "_loop",
+        "_tick",
+        "_slots",
+        "_origin",
+        "_current",
+        "_pending",
+        "_handle",
+        "_armed_tick",
+    )
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        tick: float = TIMER_WHEEL_TICK,
+        slots: int = TIMER_WHEEL_SLOTS,
+    ) -> None:
+        """Initialize the wheel.
+
+        Args:
+            loop: Event loop driving the wheel
+            tick: Timer resolution in seconds
+            slots: Number of slots; timers further away than one rotation
+                stay in their slot until their tick comes round
+        """
+        self._loop = loop
+        self._tick = tick
+        self._slots: List[List[WheelTimer]] = [[] for _ in range(slots)]
+        self._origin = loop.time()
+        self._current = 0
+        self._pending = 0
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._armed_tick = 0
+
+    def time(self) -> float:
+        """Current time of the wheel's event loop."""
+        return self._loop.time()
+
+    def __len__(self) -> int:
+        """Number of pending timers."""
+        return self._pending
+
+    def schedule(
+        self, delay: float, callback: Callable[..., Any], *args: Any
+    ) -> WheelTimer:
+        """Call ``callback(*args)`` once ``delay`` seconds have passed.
+
+        Args:
+            delay: Delay in seconds
+            callback: Function to call
+            *args: Arguments for the callback
+
+        Returns:
+            The timer, which can be passed to cancel
+        """
+        now = self._loop.time()
+        if self._handle is None:
+            # Idle wheel: jump straight to the present instead of replaying ticks
+            self._current = int((now - self._origin) / self._tick)
+        tick = max(
+            self._current + 1,
+            math.ceil((now + delay - self._origin) / self._tick),
+        )
+        timer = WheelTimer(tick, callback, args)
+        self._slots[tick % len(self._slots)].append(timer)
+        self._pending += 1
+        if self._handle is None:
+            self._arm()
+        elif tick < self._armed_tick:
+            self._handle.cancel()
+            self._arm()
+        return timer
+
+    def cancel(self, timer: WheelTimer) -> None:
+        """Cancel a pending timer; cancelling twice or after firing is a no-op."""
+        if not timer.cancelled:
+            timer.cancelled = True
+            self._pending -= 1
+            # The timer stays in its slot until due; don't keep its arguments
+            # (e.g. a closed connection) alive until then
+            timer.args = ()
+
+    def close(self) -> None:
+        """Drop every pending timer without calling it."""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        for slot in self._slots:
+            for timer in slot:
+                timer.cancelled = True
+            slot.clear()
+        self._pending = 0
+
+    def _arm(self) -> None:
+        """Schedule the loop timer for the next occupied slot."""
+        slots = self._slots
+        size = len(slots)
+        # At most one rotation ahead: a slot holds timers of later rotations too
+        for tick in range(self._current + 1, self._current + size + 1):
+            if slots[tick % size]:
+                break
+        self._armed_tick = tick
+        self._handle = self._loop.call_at(self._origin + tick * self._tick, self._on_tick)
+
+    def _on_tick(self) -> None:
+        """Fire every timer due up to the current time."""
+        target = int((self._loop.time() - self._origin) / self._tick)
+        slots = self._slots
+        while self._current < target and self._pending:
+            self._current += 1
+            current = self._current
+            index = current % len(slots)
+            slot = slots[index]
+            if not slot:
+                continue
+            keep = []
+            # Timers scheduled by callbacks are appended to the slot being
+            # iterated; they are always due on a later tick and are kept
+            for timer in slot:
+                if timer.cancelled:
+                    continue
+                if timer.tick > current:
+                    keep.append(timer)
+                    continue
+                timer.cancelled = True
+                self._pending -= 1
+                try:
+                    timer.callback(*timer.args)
+                except Exception:  # pylint: disable=broad-except
+                    _LOGGER.exception("Error in timer callback %s", timer.callback)
+            slots[index] = keep
+        self._current = max(self._current, target)
+        self._handle = None
+        if self._pending:
+            self._arm()
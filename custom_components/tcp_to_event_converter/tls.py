@@ -0,0 +1,85 @@
+"""TLS termination for the TCP listener.
+
+With a certificate configured the listener wraps every admitted connection in
+TLS itself, so senders need no separate TLS terminator in front of Home
+Assistant. The handshake runs on the event loop of the process accepting the
+connection: the Listener caps how many handshakes are in progress at once and
+leaves further connections in the listen backlog during a reconnect storm,
+and with ingest workers the handshakes run in the worker processes instead.
+
+Clients that reconnect often resume their previous session (TLS 1.3 session
+tickets, or the session cache or tickets of TLS 1.2) instead of repeating the
+full handshake. Ticket keys and the session cache belong to the SSL context,
+so contexts are kept in hass.data per certificate and reused by the listener
+started after a reload; a renewed certificate (changed files) gets a new one.
+"""
+
+import os
+import ssl
+from typing import TYPE_CHECKING, Tuple
+
+from .const import DATA_TLS_CONTEXTS
+
+if TYPE_CHECKING:
+    from homeassistant.core import HomeAssistant
+
+
+def create_server_context(certfile: str, keyfile: str) -> ssl.SSLContext:
+    """Create the server SSL context for a certificate.
+
+    Blocking; run it in an executor.
+
+    Args:
+        certfile: PEM file with the certificate chain, and the private key
+            unless keyfile is given
+        keyfile: PEM file with the private key (empty = in certfile)
+
+    Returns:
+        A TLS 1.2+ server context issuing session tickets
+
+    Raises:
+        OSError: If a file cannot be read (ssl.SSLError if it is invalid)
+    """
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    context.load_cert_chain(certfile, keyfile or None)
+    return context
+
+
+async def async_get_server_context(
+    hass: "HomeAssistant", certfile: str, keyfile: str
+) -> ssl.SSLContext:
+    """Return the server SSL context for a certificate, reusing a cached one.
+
+    The cached context is reused as long as the certificate and key files
+    are unchanged, so sessions issued before a reload can be resumed after
+    it.
+
+    Args:
+        hass: Home Assistant instance
+        certfile: PEM file with the certificate chain
+        keyfile: PEM file with the private key (empty = in certfile)
+
+    Raises:
+        OSError: If a file cannot be read (ssl.SSLError if it is invalid)
+    """
+    stamp = await hass.async_add_executor_job(_file_stamp, certfile, keyfile)
+    contexts = hass.data.setdefault(DATA_TLS_CONTEXTS, {})
+    cached = contexts.get((certfile, keyfile))
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    context = await hass.async_add_executor_job(
+        create_server_context, certfile, keyfile
+    )
+    contexts[(certfile, keyfile)] = (stamp, context)
+    return context
+
+
+def _file_stamp(*paths: str) -> Tuple[Tuple[int, int], ...]:
+    """Modification time and size of every non-empty path."""
+    stamps = []
+    for path in paths:
+        if path:
+            stat = os.stat(path)
+            stamps.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(stamps)
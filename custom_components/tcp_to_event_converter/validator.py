@@ -0,0 +1,139 @@
+"""Single-pass message validation for the TCP to Event Converter integration.
+
+Valid messages only contain ASCII characters, so a complete frame is decoded
+once as ASCII and checked with a single compiled pattern that also captures
+the three fields.
+Only frames rejected by the fast path go through the slower per-field
+diagnosis that determines why they are invalid. Results are reported as
+error codes rather than exceptions.
+"""
+
+import re
+from enum import IntEnum
+from typing import Optional, Tuple
+
+from .const import (
+    EXPECTED_MESSAGE_PARTS,
+    FIELD_VALIDATION_PATTERN,
+    MAX_FIELD_LENGTH,
+)
+
+# Names of the message fields, in wire order
+FIELD_NAMES: Tuple[str, str, str] = ("device_id", "button_id", "action")
+
+_FIELD = r"([A-Za-z0-9_-]{1,%d})" % MAX_FIELD_LENGTH
+_FRAME_MATCH = re.compile(
+    r"\s*" + r"\s*:\s*".join([_FIELD] * EXPECTED_MESSAGE_PARTS) + r"\s*",
+    re.ASCII,
+).fullmatch
+_FIELD_MATCH = re.compile(FIELD_VALIDATION_PATTERN).match
+
+Fields = Tuple[str, str, str]
+
+
+class ValidationCode(IntEnum):
+    """Result of validating a frame."""
+
+    OK = 0
+    NOT_UTF8 = 1
+    WRONG_PART_COUNT = 2
+    EMPTY_FIELD = 3
+    FIELD_TOO_LONG = 4
+    INVALID_CHARACTERS = 5
+    SHORT_RECORD = 6
+    UNKNOWN_ID = 7
+
+
+def validate_frame(frame: bytes) -> Tuple[ValidationCode, Optional[Fields], Optional[str]]:
+    """Validate a raw device_id:button_id:action frame.
+
+    Args:
+        frame: One complete frame as produced by the framer
+
+    Returns:
+        Tuple of (code, fields, detail). On success ``fields`` holds the
+        stripped field values; on failure ``detail`` names the offending
+        field or part count.
+    """
+    if frame.count(b":") == EXPECTED_MESSAGE_PARTS - 1:
+        try:
+            match = _FRAME_MATCH(frame.decode("ascii"))
+        except UnicodeDecodeError:
+            match = None
+        if match is not None:
+            return ValidationCode.OK, match.groups(), None
+    return _diagnose(frame)
+
+
+def _diagnose(frame: bytes) -> Tuple[ValidationCode, Optional[Fields], Optional[str]]:
+    """Validate a frame rejected by the fast path field by field.
+
+    This mirrors the original string based rules, so frames that only use
+    non-ASCII whitespace around the fields are still accepted.
+    """
+    try:
+        payload = frame.decode("utf-8").strip()
+    except UnicodeDecodeError:
+        return ValidationCode.NOT_UTF8, None, None
+
+    parts = payload.split(":", maxsplit=EXPECTED_MESSAGE_PARTS - 1)
+    if len(parts) != EXPECTED_MESSAGE_PARTS:
+        return ValidationCode.WRONG_PART_COUNT, None, str(len(parts))
+
+    fields = []
+    for name, value in zip(FIELD_NAMES, parts):
+        value = value.strip()
+        if not value:
+            return ValidationCode.EMPTY_FIELD, None, name
+        if len(value) > MAX_FIELD_LENGTH:
+            return ValidationCode.FIELD_TOO_LONG, None, name
+        if not _FIELD_MATCH(value):
+            return ValidationCode.INVALID_CHARACTERS, None, name
+        fields.append(value)
+
+    return ValidationCode.OK, (fields[0], fields[1], fields[2]), None
+
+
+def validate_field(value: str) -> ValidationCode:
+    """Validate a single field value, e.g. a name loaded from configuration.
+
+    Args:
+        value: Field value
+
+    Returns:
+        ValidationCode.OK or the reason the value is invalid
+    """
+    if not value:
+        return ValidationCode.EMPTY_FIELD
+    if len(value) > MAX_FIELD_LENGTH:
+        return ValidationCode.FIELD_TOO_LONG
+    if not _FIELD_MATCH(value):
+        return ValidationCode.INVALID_CHARACTERS
+    return ValidationCode.OK
+
+
+def describe_error(code: ValidationCode, detail: Optional[str]) -> str:
+    """Build a human readable description of a validation failure.
+
+    Args:
+        code: Validation result code
+        detail: Detail returned alongside the code
+
+    Returns:
+        Description suitable for logging
+    """
+    if code == ValidationCode.NOT_UTF8:
+        return "message is not valid UTF-8"
+    if code == ValidationCode.WRONG_PART_COUNT:
+        return f"expected {EXPECTED_MESSAGE_PARTS} parts, got {detail}"
+    if code == ValidationCode.EMPTY_FIELD:
+        return f"{detail} cannot be empty"
+    if code == ValidationCode.FIELD_TOO_LONG:
+        return f"{detail} exceeds maximum length of {MAX_FIELD_LENGTH}"
+    if code == ValidationCode.INVALID_CHARACTERS:
+        return f"{detail} contains invalid characters (must match {FIELD_VALIDATION_PATTERN})"
+    if code == ValidationCode.SHORT_RECORD:
+        return f"binary record too short ({detail} bytes)"
+    if code == ValidationCode.UNKNOWN_ID:
+        return f"unknown {detail}"
+    return code.name.lower()
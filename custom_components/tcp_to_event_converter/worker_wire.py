@@ -0,0 +1,99 @@
+"""Records exchanged between ingest worker processes and Home Assistant.
+
+Every record is a header followed by a body:
+
+    header:  !BI  kind, body length
+    READY:   empty body, sent once the worker has bound the port
+    EVENTS:  repeated !dBBB received_at and field lengths, then the fields
+    STATS:   !QQQQQQI counter deltas and the current connection count
+    HANDSHAKES: !IIdd and one !I per latency bucket: resumed and failed
+             handshake deltas, latency total and maximum, bucket counts
+
+Fields are ASCII, as guaranteed by validation, and at most MAX_FIELD_LENGTH
+bytes long so their lengths fit in one byte.
+"""
+
+import struct
+from typing import List, Tuple
+
+from .metrics import HANDSHAKE_BUCKETS, HandshakeMetrics
+from .validator import Fields
+
+# Record kinds
+MSG_READY: int = 1
+MSG_EVENTS: int = 2
+MSG_STATS: int = 3
+MSG_HANDSHAKES: int = 4
+
+HEADER = struct.Struct("!BI")
+TIMESTAMP = struct.Struct("!d")
+FIELD_LENGTHS = struct.Struct("!BBB")
+EVENT_HEADER = struct.Struct("!dBBB")
+STATS = struct.Struct("!QQQQQQI")
+HANDSHAKES = struct.Struct(f"!IIdd{len(HANDSHAKE_BUCKETS) + 1}I")
+
+
+def encode_record(kind: int, body: bytes = b"") -> bytes:
+    """Encode one record for the worker pipe."""
+    return HEADER.pack(kind, len(body)) + body
+
+
+def encode_fields(fields: Fields) -> bytes:
+    """Encode the (device_id, button_id, action) of a validated event."""
+    raw = [field.encode("ascii") for field in fields]
+    return FIELD_LENGTHS.pack(*map(len, raw)) + b"".join(raw)
+
+
+def encode_handshakes(metrics: HandshakeMetrics) -> bytes:
+    """Encode the TLS handshake metrics of a worker for a HANDSHAKES record."""
+    latency = metrics.latency
+    return HANDSHAKES.pack(
+        metrics.resumed, metrics.failed, latency.total, latency.max, *latency.counts
+    )
+
+
+def decode_handshakes(body: bytes) -> HandshakeMetrics:
+    """Decode the body of a HANDSHAKES record."""
+    resumed, failed, total, maximum, *counts = HANDSHAKES.unpack(body)
+    metrics = HandshakeMetrics()
+    metrics.resumed = resumed
+    metrics.failed = failed
+    latency = metrics.latency
+    latency.counts = counts
+    latency.count = sum(counts)
+    latency.total = total
+    latency.max = maximum
+    return metrics
+
+
+def decode_events(body: bytes) -> List[Tuple[float, bytes]]:
+    """Split the body of an EVENTS record into events.
+
+    Args:
+        body: Record body
+
+    Returns:
+        List of (received_at, encoded_fields); the encoded fields are stable
+        for identical messages and can be used as a cache key
+    """
+    events = []
+    offset = 0
+    unpack_from = EVENT_HEADER.unpack_from
+    header_size = EVENT_HEADER.size
+    while offset < len(body):
+        received_at, device_len, button_len, action_len = unpack_from(body, offset)
+        start = offset + TIMESTAMP.size
+        offset += header_size + device_len + button_len + action_len
+        events.append((received_at, body[start:offset]))
+    return events
+
+
+def decode_fields(encoded: bytes) -> Fields:
+    """Decode the (device_id, button_id, action) of an encoded event."""
+    device_end = FIELD_LENGTHS.size + encoded[0]
+    button_end = device_end + encoded[1]
+    return (
+        encoded[FIELD_LENGTHS.size:device_end].decode("ascii"),
+        encoded[device_end:button_end].decode("ascii"),
+        encoded[button_end:].decode("ascii"),
+    )
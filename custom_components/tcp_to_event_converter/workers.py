@@ -0,0 +1,272 @@
+"""Multi-process ingest using SO_REUSEPORT worker processes.
+
+With ingest workers enabled a TCPServer does not listen itself. It starts a
+WorkerPool of ingest_worker processes which all bind the configured port with
+SO_REUSEPORT, so the kernel balances connections across them. Framing and
+validation run in the workers; the Home Assistant event loop only decodes
+compact batches of pre-validated events from each worker's stdout pipe and
+queues them on the EventDispatcher. With TLS enabled the workers also
+terminate TLS, so handshakes are spread over the worker processes as well.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+from typing import TYPE_CHECKING, List, Optional
+
+from .frame_cache import build_cached_frame
+from .worker_wire import (
+    HEADER,
+    MSG_EVENTS,
+    MSG_HANDSHAKES,
+    MSG_READY,
+    MSG_STATS,
+    STATS,
+    decode_events,
+    decode_fields,
+    decode_handshakes,
+)
+
+if TYPE_CHECKING:
+    from .tcp_server import TCPServer
+
+_LOGGER = logging.getLogger(__name__)
+
+# Seconds a worker may take to bind the port and report ready
+WORKER_START_TIMEOUT: float = 30.0
+# Seconds a worker may take to exit after its stdin is closed
+WORKER_STOP_TIMEOUT: float = 5.0
+# Seconds to wait before restarting a worker that exited unexpectedly
+WORKER_RESTART_DELAY: float = 5.0
+
+# Started as a script so the workers don't import the package __init__
+_WORKER_SCRIPT = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "ingest_worker.py"
+)
+
+
+class _Worker:
+    """State of one ingest worker process."""
+
+    __slots__ = ("index", "process", "connections", "task")
+
+    def __init__(self, index: int) -> None:
+        """Initialize the worker state."""
+        self.index = index
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.connections: int = 0
+        self.task: Optional[asyncio.Task] = None
+
+
+class WorkerPool:
+    """Runs and supervises the ingest worker processes of a TCPServer."""
+
+    def __init__(self, server: "TCPServer", count: int) -> None:
+        """Initialize the pool.
+
+        Args:
+            server: TCPServer whose port, framing, metrics and queue are used
+            count: Number of worker processes
+        """
+        self._server = server
+        self._workers: List[_Worker] = [_Worker(index) for index in range(count)]
+        self._max_connections = -(-server.max_connections // count)
+        self._max_handshakes = -(-server.max_handshakes // count)
+        self._stopped = asyncio.Event()
+
+    @property
+    def pids(self) -> List[int]:
+        """Process ids of the running workers."""
+        return [
+            worker.process.pid for worker in self._workers
+            if worker.process is not None and worker.process.returncode is None
+        ]
+
+    async def start(self) -> None:
+        """Start all workers and wait until each has bound the port.
+
+        Raises:
+            OSError: If a worker cannot bind the port
+            asyncio.TimeoutError: If a worker does not report ready in time
+        """
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(self._spawn(worker) for worker in self._workers)),
+                timeout=WORKER_START_TIMEOUT,
+            )
+        except BaseException:
+            await self.stop()
+            raise
+
+        for worker in self._workers:
+            worker.task = self._server.hass.loop.create_task(self._supervise(worker))
+
+    async def stop(self) -> None:
+        """Stop all workers, handling every event they already sent."""
+        self._stopped.set()
+        await asyncio.gather(*(self._stop_worker(worker) for worker in self._workers))
+
+    async def _spawn(self, worker: _Worker) -> None:
+        """Start a worker process and wait for its READY record.
+
+        Raises:
+            OSError: If the worker exits before binding the port, with the
+                worker's exit status (the bind errno) as errno
+        """
+        server = self._server
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, _WORKER_SCRIPT,
+            "--port", str(server.tcp_port),
+            "--framing", server.framing,
+            "--max-connections", str(self._max_connections),
+            "--read-buffer-size", str(server.read_buffer_size),
+            "--idle-timeout", str(server.idle_timeout),
+            "--heartbeat-interval", str(server.idle_reaper.heartbeat_interval),
+            "--tcp-keepalive", str(server.tcp_keepalive),
+            "--tls-certfile", server.tls_certfile,
+            "--tls-keyfile", server.tls_keyfile,
+            "--max-handshakes", str(self._max_handshakes),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        worker.process = process
+        worker.connections = 0
+        server.hass.loop.create_task(self._log_stderr(worker, process))
+
+        try:
+            kind, _ = HEADER.unpack(await process.stdout.readexactly(HEADER.size))
+        except asyncio.IncompleteReadError:
+            returncode = await process.wait()
+            raise OSError(
+                returncode,
+                f"Ingest worker {worker.index} exited with code {returncode} "
+                f"before binding port {server.tcp_port}",
+            ) from None
+        if kind != MSG_READY:
+            raise OSError(f"Unexpected record {kind} from ingest worker {worker.index}")
+        _LOGGER.debug(
+            "Ingest worker %d (pid %d) listening on port %d",
+            worker.index, process.pid, server.tcp_port
+        )
+
+    async def _supervise(self, worker: _Worker) -> None:
+        """Read a worker's records and restart it if it exits unexpectedly."""
+        while True:
+            await self._read_records(worker)
+            returncode = await worker.process.wait()
+            self._set_connections(worker, 0)
+            if self._stopped.is_set():
+                return
+
+            _LOGGER.error(
+                "Ingest worker %d exited with code %s, restarting in %s seconds",
+                worker.index, returncode, WORKER_RESTART_DELAY
+            )
+            try:
+                await asyncio.wait_for(self._stopped.wait(), WORKER_RESTART_DELAY)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await asyncio.wait_for(self._spawn(worker), timeout=WORKER_START_TIMEOUT)
+            except (OSError, asyncio.TimeoutError) as e:
+                _LOGGER.error("Failed to restart ingest worker %d: %s", worker.index, e)
+
+    async def _read_records(self, worker: _Worker) -> None:
+        """Handle records from a worker until its stdout is closed."""
+        stdout = worker.process.stdout
+        source = f"ingest worker {worker.index}"
+        try:
+            while True:
+                kind, length = HEADER.unpack(await stdout.readexactly(HEADER.size))
+                body = await stdout.readexactly(length) if length else b""
+                if kind == MSG_EVENTS:
+                    self._handle_events(body, source)
+                elif kind == MSG_STATS:
+                    self._handle_stats(worker, body)
+                elif kind == MSG_HANDSHAKES and self._server.tls_metrics is not None:
+                    self._server.tls_metrics.add(decode_handshakes(body))
+        except asyncio.IncompleteReadError:
+            return
+
+    def _handle_events(self, body: bytes, source: str) -> None:
+        """Queue the pre-validated events of an EVENTS record.
+
+        Args:
+            body: Record body
+            source: Worker description used in log messages
+        """
+        server = self._server
+        cache = server.frame_cache
+        submit = server._submit_event
+
+        for received_at, encoded in decode_events(body):
+            cached = cache.get(encoded) if cache is not None else None
+            if cached is None:
+                cached = build_cached_frame(decode_fields(encoded))
+                if cache is not None:
+                    cache.put(encoded, cached)
+            submit(cached, received_at, source)
+
+    def _handle_stats(self, worker: _Worker, body: bytes) -> None:
+        """Add a worker's counter deltas to the server metrics."""
+        (
+            bytes_received,
+            messages_received,
+            parse_failures,
+            validation_failures,
+            connections_accepted,
+            connections_rejected,
+            connections,
+        ) = STATS.unpack(body)
+        metrics = self._server.metrics
+        metrics.bytes_received += bytes_received
+        metrics.messages_received += messages_received
+        metrics.parse_failures += parse_failures
+        metrics.validation_failures += validation_failures
+        metrics.connections_accepted += connections_accepted
+        metrics.connections_rejected += connections_rejected
+        self._set_connections(worker, connections)
+
+    def _set_connections(self, worker: _Worker, connections: int) -> None:
+        """Update a worker's connection count and the server total."""
+        self._server._connection_count += connections - worker.connections
+        worker.connections = connections
+
+    async def _log_stderr(
+        self, worker: _Worker, process: asyncio.subprocess.Process
+    ) -> None:
+        """Forward a worker's stderr output to the integration log."""
+        async for line in process.stderr:
+            _LOGGER.warning(
+                "Ingest worker %d: %s",
+                worker.index, line.decode("utf-8", "replace").rstrip()
+            )
+
+    async def _stop_worker(self, worker: _Worker) -> None:
+        """Ask a worker to exit, killing it if it does not."""
+        process = worker.process
+        if process is None:
+            return
+        if process.returncode is None:
+            # Closing stdin makes the worker stop listening, flush and exit
+            process.stdin.close()
+            try:
+                await asyncio.wait_for(process.wait(), timeout=WORKER_STOP_TIMEOUT)
+            except asyncio.TimeoutError:
+                _LOGGER.warning(
+                    "Ingest worker %d did not exit within %s seconds, killing it",
+                    worker.index, WORKER_STOP_TIMEOUT
+                )
+                process.kill()
+                await process.wait()
+
+        if worker.task is not None:
+            # Let the reader handle the worker's final records
+            try:
+                await asyncio.wait_for(worker.task, timeout=WORKER_STOP_TIMEOUT)
+            except asyncio.TimeoutError:
+                pass
+            worker.task = None
@@ -0,0 +1,82 @@
+"""Shared fixtures for the TCP to Event Converter tests."""
+
+from typing import Any, Callable, List
+
+import pytest
+
+from custom_components.tcp_to_event_converter.timer_wheel import TimerWheel
+
+
+class FakeTimerHandle:
+    """Loop timer handle returned by FakeLoop.call_at."""
+
+    def __init__(self, when: float, callback: Callable[..., Any], args: tuple) -> None:
+        """Initialize the handle."""
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        """Cancel the timer."""
+        self.cancelled = True
+
+
+class FakeLoop:
+    """Event loop stand-in with a manually advanced clock."""
+
+    def __init__(self) -> None:
+        """Initialize the loop at time 0."""
+        self.now = 0.0
+        self._timers: List[FakeTimerHandle] = []
+
+    def time(self) -> float:
+        """Current loop time."""
+        return self.now
+
+    def call_at(
+        self, when: float, callback: Callable[..., Any], *args: Any
+    ) -> FakeTimerHandle:
+        """Schedule a callback at a loop time."""
+        handle = FakeTimerHandle(when, callback, args)
+        self._timers.append(handle)
+        return handle
+
+    def call_later(
+        self, delay: float, callback: Callable[..., Any], *args: Any
+    ) -> FakeTimerHandle:
+        """Schedule a callback after a delay."""
+        return self.call_at(self.now + delay, callback, *args)
+
+    def call_soon(self, callback: Callable[..., Any], *args: Any) -> FakeTimerHandle:
+        """Schedule a callback on the next iteration."""
+        return self.call_at(self.now, callback, *args)
+
+    def advance(self, seconds: float) -> None:
+        """Move the clock forward, running every timer that falls due."""
+        target = self.now + seconds
+        while True:
+            due = [
+                handle
+                for handle in self._timers
+                if not handle.cancelled and handle.when <= target
+            ]
+            if not due:
+                break
+            handle = min(due, key=lambda item: item.when)
+            self._timers.remove(handle)
+            self.now = max(self.now, handle.when)
+            handle.callback(*handle.args)
+        self.now = target
+
+
+@pytest.fixture
+def loop() -> FakeLoop:
+    """Return a loop with a manually advanced clock."""
+    return FakeLoop()
+
+
+@pytest.fixture
+def wheel(loop: FakeLoop) -> TimerWheel:
+    """Return a timer wheel with a 10 ms tick driven by the fake loop."""
+    return TimerWheel(loop, tick=0.01, slots=64)
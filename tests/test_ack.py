@@ -0,0 +1,131 @@
+"""Tests for the acknowledgement tracker."""
+
+import struct
+from types import SimpleNamespace
+from typing import List, Tuple
+
+from homeassistant.core import CoreState
+
+from custom_components.tcp_to_event_converter.ack import (
+    ACK_RECORD,
+    KIND_ACK,
+    KIND_NACK,
+    NACK_BAD_SEQUENCE,
+    NACK_OVERLOADED,
+    AckTracker,
+)
+from custom_components.tcp_to_event_converter.dispatch import EventDispatcher
+from custom_components.tcp_to_event_converter.tcp_server import TCPServer
+from custom_components.tcp_to_event_converter.validator import ValidationCode
+
+from .conftest import FakeLoop
+
+ADDR = ("127.0.0.1", 40000)
+
+
+class Handler:
+    """Records the frames handed to the server and the malformed ones."""
+
+    def __init__(self) -> None:
+        """Initialize the handler."""
+        self.frames: List[bytes] = []
+        self.bad: List[Tuple[bytes, tuple]] = []
+
+    def handle(self, frame: bytes, addr: tuple, received_at: float) -> ValidationCode:
+        """Accept every frame."""
+        self.frames.append(frame)
+        return ValidationCode.OK
+
+    def bad_sequence(self, frame: bytes, addr: tuple) -> None:
+        """Record a frame with a malformed sequence number."""
+        self.bad.append((frame, addr))
+
+
+def _tracker(binary: bool = False) -> Tuple[AckTracker, Handler]:
+    handler = Handler()
+    return AckTracker(handler.handle, handler.bad_sequence, binary), handler
+
+
+def test_implicit_and_explicit_sequence_numbers() -> None:
+    """Frames without a prefix continue from the previous sequence number."""
+    tracker, handler = _tracker()
+    tracker.handle(b"a:b:press", ADDR, 0.0)
+    tracker.handle(b"10|a:b:release", ADDR, 0.0)
+    tracker.handle(b"a:b:press", ADDR, 0.0)
+    assert handler.frames == [b"a:b:press", b"a:b:release", b"a:b:press"]
+    assert tracker.reply() == b"ACK 11\n"
+
+
+def test_blank_frames_do_not_consume_sequence_numbers() -> None:
+    """Keep-alives are handled and re-acknowledged but not numbered."""
+    tracker, handler = _tracker()
+    tracker.handle(b"a:b:press", ADDR, 0.0)
+    assert tracker.reply() == b"ACK 1\n"
+    tracker.handle(b"", ADDR, 0.0)
+    tracker.handle(b"  ", ADDR, 0.0)
+    assert tracker.reply() == b"ACK 1\n"
+    tracker.handle(b"a:b:release", ADDR, 0.0)
+    assert tracker.reply() == b"ACK 2\n"
+    assert handler.frames == [b"a:b:press", b"", b"  ", b"a:b:release"]
+
+
+def test_binary_blank_frame_is_not_numbered() -> None:
+    """An empty binary payload is a keep-alive."""
+    tracker, _ = _tracker(binary=True)
+    tracker.handle(b"", ADDR, 0.0)
+    assert tracker.reply() == ACK_RECORD.pack(KIND_ACK, 0, 0)
+
+
+def test_binary_sequence_number_is_stripped() -> None:
+    """The handler sees the same 5 id bytes with or without a sequence number."""
+    tracker, handler = _tracker(binary=True)
+    ids = struct.pack("!HHB", 1, 2, 3)
+    tracker.handle(ids + struct.pack("!I", 77), ADDR, 0.0)
+    tracker.handle(ids, ADDR, 0.0)
+    assert handler.frames == [ids, ids]
+    assert tracker.reply() == ACK_RECORD.pack(KIND_ACK, 78, 0)
+
+
+def test_binary_payload_of_unexpected_length_is_nacked() -> None:
+    """Payloads that are neither 5 nor 9 bytes long are not handled."""
+    tracker, handler = _tracker(binary=True)
+    tracker.handle(bytes(12), ADDR, 0.0)
+    assert handler.frames == []
+    assert len(handler.bad) == 1
+    assert tracker.reply() == ACK_RECORD.pack(
+        KIND_NACK, 1, NACK_BAD_SEQUENCE
+    ) + ACK_RECORD.pack(KIND_ACK, 1, 0)
+
+
+def test_malformed_sequence_is_reported_and_nacked() -> None:
+    """A malformed prefix is recorded as invalid and NACKed, not handled."""
+    tracker, handler = _tracker()
+    code = tracker.handle(b"x1|a:b:press", ADDR, 0.0)
+    assert code is ValidationCode.WRONG_PART_COUNT
+    assert handler.frames == []
+    assert handler.bad == [(b"x1|a:b:press", ADDR)]
+    assert tracker.reply() == b"NACK 1 %d\nACK 1\n" % NACK_BAD_SEQUENCE
+
+
+def test_events_dropped_by_a_full_queue_are_nacked(loop: FakeLoop) -> None:
+    """Only the events that made it into the queue are acknowledged."""
+    hass = SimpleNamespace(
+        loop=loop,
+        bus=SimpleNamespace(async_fire=lambda event_type, event_data: None),
+        data={},
+        state=CoreState.running,
+    )
+    server = TCPServer(
+        hass,
+        54321,
+        "tcp_event",
+        {"ack_mode": True, "overload_policy": "drop_newest"},
+        EventDispatcher(hass, 2),
+    )
+    tracker = server._create_ack_tracker()
+    for _ in range(5):
+        tracker.handle(b"a:b:press", ADDR, 0.0)
+    assert tracker.reply() == b"".join(
+        b"NACK %d %d\n" % (seq, NACK_OVERLOADED) for seq in (3, 4, 5)
+    ) + b"ACK 5\n"
+    assert server.drop_counts["queue_full"] == 3
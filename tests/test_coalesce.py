@@ -0,0 +1,208 @@
+"""Tests for deduplication and gesture coalescing."""
+
+from typing import List, Tuple
+
+import pytest
+
+from custom_components.tcp_to_event_converter.coalesce import EventCoalescer
+from custom_components.tcp_to_event_converter.frame_cache import build_cached_frame
+from custom_components.tcp_to_event_converter.timer_wheel import TimerWheel
+
+from .conftest import FakeLoop
+
+ADDR = ("127.0.0.1", 40000)
+
+
+class Recorder:
+    """Collects the actions emitted by a coalescer."""
+
+    def __init__(self) -> None:
+        """Initialize the recorder."""
+        self.events: List[Tuple[str, str, str]] = []
+
+    def __call__(self, event_data, received_at: float, addr: tuple) -> None:
+        """Record an emitted event."""
+        self.events.append(
+            (event_data["device_id"], event_data["button_id"], event_data["action"])
+        )
+
+    @property
+    def actions(self) -> List[str]:
+        """Actions of the emitted events."""
+        return [action for _, _, action in self.events]
+
+
+@pytest.fixture
+def recorder() -> Recorder:
+    """Return an empty recorder."""
+    return Recorder()
+
+
+def _coalescer(
+    wheel: TimerWheel,
+    recorder: Recorder,
+    dedupe_window: float = 0.0,
+    gestures: bool = True,
+) -> EventCoalescer:
+    """Create a coalescer with 400 ms double press and 800 ms long press times."""
+    return EventCoalescer(wheel, recorder, dedupe_window, gestures, 0.4, 0.8)
+
+
+def _submit(
+    coalescer: EventCoalescer, loop: FakeLoop, action: str, button: str = "b1"
+) -> None:
+    """Submit one validated message."""
+    coalescer.submit(build_cached_frame(("dev", button, action)), loop.time(), ADDR)
+
+
+def test_single_press_fires_after_double_press_window(
+    loop: FakeLoop, wheel: TimerWheel, recorder: Recorder
+) -> None:
+    """A press and release becomes one press once no second press follows."""
+    coalescer = _coalescer(wheel, recorder)
+    _submit(coalescer, loop, "press")
+    loop.advance(0.1)
+    _submit(coalescer, loop, "release")
+    loop.advance(0.35)
+    assert recorder.actions == []
+    loop.advance(0.1)
+    assert recorder.events == [("dev", "b1", "press")]
+    assert coalescer.stats["pending_gestures"] == 0
+
+
+def test_double_press_fires_on_second_press(
+    loop: FakeLoop, wheel: TimerWheel, recorder: Recorder
+) -> None:
+    """A second press within the window fires double_press right away."""
+    coalescer = _coalescer(wheel, recorder)
+    _submit(coalescer, loop, "press")
+    loop.advance(0.1)
+    _submit(coalescer, loop, "release")
+    loop.advance(0.3)
+    _submit(coalescer, loop, "press")
+    assert recorder.actions == ["double_press"]
+    loop.advance(0.1)
+    _submit(coalescer, loop, "release")
+    loop.advance(2.0)
+    assert recorder.actions == ["double_press"]
+    assert coalescer.stats["pending_gestures"] == 0
+
+
+def test_second_press_after_window_is_a_new_gesture(
+    loop: FakeLoop, wheel: TimerWheel, recorder: Recorder
+) -> None:
+    """Presses further apart than the window are two single presses."""
+    coalescer = _coalescer(wheel, recorder)
+    for _ in range(2):
+        _submit(coalescer, loop, "press")
+        loop.advance(0.1)
+        _submit(coalescer, loop, "release")
+        loop.advance(0.5)
+    assert recorder.actions == ["press", "press"]
+
+
+def test_long_press_fires_while_held(
+    loop: FakeLoop, wheel: TimerWheel, recorder: Recorder
+) -> None:
+    """Holding past the long press time fires long_press before the release."""
+    coalescer = _coalescer(wheel, recorder)
+    _submit(coalescer, loop, "press")
+    loop.advance(0.75)
+    assert recorder.actions == []
+    loop.advance(0.1)
+    assert recorder.actions == ["long_press"]
+    _submit(coalescer, loop, "release")
+    loop.advance(1.0)
+    assert recorder.actions == ["long_press"]
+
+
+def test_buttons_are_coalesced_independently(
+    loop: FakeLoop, wheel: TimerWheel, recorder: Recorder
+) -> None:
+    """Gestures of different buttons do not interfere."""
+    coalescer = _coalescer(wheel, recorder)
+    _submit(coalescer, loop, "press", "b1")
+    _submit(coalescer, loop, "press", "b2")
+    _submit(coalescer, loop, "release", "b1")
+    _submit(coalescer, loop, "press", "b1")
+    _submit(coalescer, loop, "release", "b2")
+    loop.advance(0.5)
+    assert sorted(recorder.events) == [
+        ("dev", "b1", "double_press"),
+        ("dev", "b2", "press"),
+    ]
+
+
+def test_other_actions_pass_through(
+    loop: FakeLoop, wheel: TimerWheel, recorder: Recorder
+) -> None:
+    """Actions other than press and release, and untracked releases, are not held."""
+    coalescer = _coalescer(wheel, recorder)
+    _submit(coalescer, loop, "hold")
+    _submit(coalescer, loop, "release")
+    assert recorder.actions == ["hold", "release"]
+
+
+def test_flush_fires_undecided_press(
+    loop: FakeLoop, wheel: TimerWheel, recorder: Recorder
+) -> None:
+    """A press still waiting for its window is fired on shutdown."""
+    coalescer = _coalescer(wheel, recorder)
+    _submit(coalescer, loop, "press")
+    _submit(coalescer, loop, "release")
+    coalescer.flush()
+    assert recorder.actions == ["press"]
+    loop.advance(1.0)
+    assert recorder.actions == ["press"]
+
+
+def test_dedupe_drops_repeats_within_window(
+    loop: FakeLoop, wheel: TimerWheel, recorder: Recorder
+) -> None:
+    """Copies of a message within the window of the first are dropped."""
+    coalescer = _coalescer(wheel, recorder, dedupe_window=0.05, gestures=False)
+    _submit(coalescer, loop, "press")
+    loop.advance(0.02)
+    _submit(coalescer, loop, "press")
+    loop.advance(0.04)
+    _submit(coalescer, loop, "press")
+    assert recorder.actions == ["press", "press"]
+    assert coalescer.stats["deduplicated"] == 1
+
+
+def test_dedupe_repeats_do_not_become_double_press(
+    loop: FakeLoop, wheel: TimerWheel, recorder: Recorder
+) -> None:
+    """Repeated copies of a press and release coalesce into one press."""
+    coalescer = _coalescer(wheel, recorder, dedupe_window=0.05)
+    for action in ("press", "press", "release", "release"):
+        _submit(coalescer, loop, action)
+        loop.advance(0.01)
+    loop.advance(0.5)
+    assert recorder.actions == ["press"]
+    assert coalescer.stats["deduplicated"] == 2
+
+
+def test_dedupe_keeps_press_after_release(
+    loop: FakeLoop, wheel: TimerWheel, recorder: Recorder
+) -> None:
+    """Press, release, press within the dedupe window is a double press."""
+    coalescer = _coalescer(wheel, recorder, dedupe_window=0.2)
+    for action in ("press", "release", "press", "release"):
+        _submit(coalescer, loop, action)
+        loop.advance(0.05)
+    loop.advance(0.5)
+    assert recorder.actions == ["double_press"]
+    assert coalescer.stats["deduplicated"] == 0
+
+
+def test_dedupe_window_ends_on_other_action(
+    loop: FakeLoop, wheel: TimerWheel, recorder: Recorder
+) -> None:
+    """Only repeats without another action in between are dropped."""
+    coalescer = _coalescer(wheel, recorder, dedupe_window=0.2, gestures=False)
+    for action in ("press", "press", "release", "press", "press"):
+        _submit(coalescer, loop, action)
+        loop.advance(0.01)
+    assert recorder.actions == ["press", "release", "press"]
+    assert coalescer.stats["deduplicated"] == 2
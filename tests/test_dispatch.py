@@ -0,0 +1,99 @@
+"""Tests for the shared event dispatcher and its listener queues."""
+
+from types import SimpleNamespace
+from typing import List, Tuple
+
+import pytest
+
+from custom_components.tcp_to_event_converter.dispatch import EventDispatcher
+
+from .conftest import FakeLoop
+
+
+class Bus:
+    """Records fired events."""
+
+    def __init__(self) -> None:
+        """Initialize the bus."""
+        self.fired: List[Tuple[str, dict]] = []
+
+    def async_fire(self, event_type: str, event_data: dict) -> None:
+        """Record an event."""
+        self.fired.append((event_type, event_data))
+
+
+@pytest.fixture
+def hass(loop: FakeLoop) -> SimpleNamespace:
+    """Return a minimal Home Assistant stand-in."""
+    return SimpleNamespace(loop=loop, bus=Bus())
+
+
+def _types(hass: SimpleNamespace) -> List[str]:
+    """Event types fired so far."""
+    return [event_type for event_type, _ in hass.bus.fired]
+
+
+def test_each_queue_uses_its_own_batching(
+    loop: FakeLoop, hass: SimpleNamespace
+) -> None:
+    """Batch size and delay of one listener do not apply to another."""
+    dispatcher = EventDispatcher(hass)
+    fast = dispatcher.create_queue(max_batch=2, max_delay_ms=0)
+    slow = dispatcher.create_queue(max_batch=100, max_delay_ms=50)
+    for index in range(3):
+        fast.enqueue("fast", {"index": index}, loop.time())
+        slow.enqueue("slow", {"index": index}, loop.time())
+
+    loop.advance(0.01)
+    assert _types(hass) == ["fast"] * 3
+    assert dispatcher.batch_count == 2
+    loop.advance(0.05)
+    assert _types(hass) == ["fast"] * 3 + ["slow"] * 3
+    assert dispatcher.batch_count == 3
+    assert dispatcher.pending == 0
+
+
+def test_full_batch_does_not_wait_for_delay(
+    loop: FakeLoop, hass: SimpleNamespace
+) -> None:
+    """A queue is drained as soon as a full batch is waiting."""
+    dispatcher = EventDispatcher(hass)
+    queue = dispatcher.create_queue(max_batch=2, max_delay_ms=1000)
+    queue.enqueue("a", {}, loop.time())
+    loop.advance(0.01)
+    assert hass.bus.fired == []
+    queue.enqueue("a", {}, loop.time())
+    loop.advance(0)
+    assert _types(hass) == ["a", "a"]
+
+
+def test_flush_only_fires_own_events(loop: FakeLoop, hass: SimpleNamespace) -> None:
+    """Stopping one listener leaves the events of the others queued."""
+    dispatcher = EventDispatcher(hass)
+    first = dispatcher.create_queue(max_delay_ms=100)
+    second = dispatcher.create_queue(max_delay_ms=100)
+    first.enqueue("first", {}, loop.time())
+    second.enqueue("second", {}, loop.time())
+
+    first.flush()
+    assert _types(hass) == ["first"]
+    assert dispatcher.pending == 1
+    loop.advance(0.2)
+    assert _types(hass) == ["first", "second"]
+
+
+def test_queue_size_is_shared(loop: FakeLoop, hass: SimpleNamespace) -> None:
+    """The bound applies to the events of all listeners together."""
+    dispatcher = EventDispatcher(hass, queue_size=2)
+    first = dispatcher.create_queue()
+    second = dispatcher.create_queue()
+    assert first.enqueue("first", {}, loop.time())
+    assert second.enqueue("second", {}, loop.time())
+    assert not second.enqueue("second", {}, loop.time())
+    # Evicting only ever drops the listener's own events
+    assert second.evict_oldest()
+    assert not second.evict_oldest()
+    assert first.pending == 1
+    assert second.enqueue("second", {}, loop.time())
+    loop.advance(0)
+    assert _types(hass) == ["first", "second"]
@@ -0,0 +1,153 @@
+"""Tests for the stream framers."""
+
+import pytest
+
+from custom_components.tcp_to_event_converter.const import (
+    FRAMING_BINARY,
+    FRAMING_LENGTH_PREFIXED,
+    FRAMING_NEWLINE,
+    FRAMING_READ,
+)
+from custom_components.tcp_to_event_converter.framing import (
+    LENGTH_PREFIX,
+    BinaryFramer,
+    FramingError,
+    LengthPrefixedFramer,
+    NewlineFramer,
+    create_framer,
+    split_datagram,
+)
+
+
+def test_newline_several_frames_in_one_read() -> None:
+    """All complete frames of a read are returned in order."""
+    framer = NewlineFramer()
+    assert framer.feed(b"a:b:press\nc:d:release\r\n") == [b"a:b:press", b"c:d:release"]
+    assert framer.buffered == 0
+
+
+def test_newline_frame_split_across_reads() -> None:
+    """A partial frame is carried over until its terminator arrives."""
+    framer = NewlineFramer()
+    assert framer.feed(b"a:b:pr") == []
+    assert framer.buffered == 6
+    assert framer.feed(b"ess\nc:d") == [b"a:b:press"]
+    assert framer.feed(b":release\n") == [b"c:d:release"]
+    assert framer.buffered == 0
+
+
+def test_newline_crlf_split_between_reads() -> None:
+    """A carriage return read before its newline is still stripped."""
+    framer = NewlineFramer()
+    assert framer.feed(b"a:b:press\r") == []
+    assert framer.feed(b"\n") == [b"a:b:press"]
+
+
+def test_newline_empty_frames_are_kept() -> None:
+    """Blank lines are returned as empty frames."""
+    framer = NewlineFramer()
+    assert framer.feed(b"\n\r\na:b:press\n") == [b"", b"", b"a:b:press"]
+
+
+def test_newline_flush_returns_partial_frame() -> None:
+    """The unterminated tail is returned when the peer closes."""
+    framer = NewlineFramer()
+    framer.feed(b"a:b:press\nc:d:rel")
+    assert framer.flush() == [b"c:d:rel"]
+    assert framer.flush() == []
+
+
+def test_newline_oversized_frame_is_skipped_to_next_newline() -> None:
+    """An oversized partial frame is dropped along with its tail."""
+    framer = NewlineFramer(max_frame_size=8)
+    assert framer.feed(b"0123456789") == []
+    assert framer.overflow_count == 1
+    assert framer.buffered == 0
+    assert framer.feed(b"abc\na:b:c\n") == [b"a:b:c"]
+    assert framer.overflow_count == 1
+    assert framer.flush() == []
+
+
+def test_newline_oversized_terminated_frame_is_skipped() -> None:
+    """A terminated frame over the limit is counted and skipped."""
+    framer = NewlineFramer(max_frame_size=4)
+    assert framer.feed(b"toolong\nok\n") == [b"ok"]
+    assert framer.overflow_count == 1
+
+
+def test_length_prefixed_header_split_across_reads() -> None:
+    """A frame whose header and payload arrive in pieces is reassembled."""
+    framer = LengthPrefixedFramer()
+    data = LENGTH_PREFIX.pack(9) + b"a:b:press" + LENGTH_PREFIX.pack(0)
+    assert framer.feed(data[:1]) == []
+    assert framer.feed(data[1:6]) == []
+    assert framer.feed(data[6:]) == [b"a:b:press", b""]
+    assert framer.buffered == 0
+
+
+def test_length_prefixed_partial_frame_is_dropped_on_flush() -> None:
+    """A truncated frame is never returned."""
+    framer = LengthPrefixedFramer()
+    framer.feed(LENGTH_PREFIX.pack(9) + b"a:b")
+    assert framer.flush() == []
+    assert framer.buffered == 0
+
+
+def test_length_prefixed_oversized_frame_raises() -> None:
+    """An oversized length cannot be resynchronised."""
+    framer = LengthPrefixedFramer(max_frame_size=8)
+    with pytest.raises(FramingError):
+        framer.feed(LENGTH_PREFIX.pack(9) + b"a:b:press")
+    assert framer.overflow_count == 1
+
+
+def test_binary_records_split_across_reads() -> None:
+    """Standard and non-standard records survive arbitrary read boundaries."""
+    framer = BinaryFramer()
+    data = b"\x05\x00\x01\x00\x02\x01" + b"\x09" + bytes(range(9)) + b"\x00"
+    frames = []
+    for index in range(len(data)):
+        frames += framer.feed(data[index:index + 1])
+    assert frames == [b"\x00\x01\x00\x02\x01", bytes(range(9)), b""]
+    assert framer.buffered == 0
+
+
+def test_split_datagram_newline_final_frame_unterminated() -> None:
+    """The last frame of a datagram does not need a terminator."""
+    assert split_datagram(b"a:b:press\r\nc:d:release", FRAMING_NEWLINE) == [
+        b"a:b:press",
+        b"c:d:release",
+    ]
+    assert split_datagram(b"a:b:press\n", FRAMING_NEWLINE) == [b"a:b:press"]
+
+
+@pytest.mark.parametrize(
+    ("data", "mode"),
+    [
+        (LENGTH_PREFIX.pack(9) + b"a:b", FRAMING_LENGTH_PREFIXED),
+        (b"\x00", FRAMING_LENGTH_PREFIXED),
+        (b"\x05\x00\x01", FRAMING_BINARY),
+    ],
+)
+def test_split_datagram_truncated(data: bytes, mode: str) -> None:
+    """Truncated datagrams are rejected as a whole."""
+    with pytest.raises(FramingError):
+        split_datagram(data, mode)
+
+
+def test_read_framer_ends_message_with_each_read() -> None:
+    """An unterminated message is complete at the end of its read."""
+    framer = create_framer(FRAMING_READ)
+    assert framer.feed(b"a:b:press") == [b"a:b:press"]
+    assert framer.feed(b"a:b:press\r\nc:d:release") == [b"a:b:press", b"c:d:release"]
+    assert framer.feed(b"a:b:press\n") == [b"a:b:press"]
+    assert framer.buffered == 0
+    assert framer.flush() == []
+
+
+def test_read_framer_drops_oversized_read() -> None:
+    """An oversized message is skipped without affecting the next read."""
+    framer = create_framer(FRAMING_READ, max_frame_size=8)
+    assert framer.feed(b"0123456789") == []
+    assert framer.feed(b"a:b:c") == [b"a:b:c"]
+    assert framer.overflow_count == 1
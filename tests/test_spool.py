@@ -0,0 +1,176 @@
+"""Tests for the on-disk event spool."""
+
+import os
+import zlib
+
+from custom_components.tcp_to_event_converter.spool import (
+    RECORD_HEADER,
+    SEGMENT_HEADER,
+    SEGMENT_SUFFIX,
+    Spool,
+)
+
+EVENTS = [
+    ("living_room", "button_1", "press"),
+    ("living_room", "button_1", "release"),
+    ("kitchen", "button_2", "press"),
+]
+
+
+def _segment_paths(directory: str) -> list:
+    """Return the segment files of a spool directory, oldest first."""
+    return sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.endswith(SEGMENT_SUFFIX)
+    )
+
+
+def _record_offsets(path: str) -> list:
+    """Return the offsets of the records written to a segment file."""
+    with open(path, "rb") as file:
+        data = file.read()
+    offsets = []
+    offset = SEGMENT_HEADER.size
+    while True:
+        length = RECORD_HEADER.unpack_from(data, offset)[0]
+        if not length:
+            return offsets
+        offsets.append(offset)
+        offset += RECORD_HEADER.size + length
+
+
+def test_events_survive_reopen(tmp_path) -> None:
+    """Unreplayed events are replayed in order after reopening."""
+    spool = Spool.open(str(tmp_path), 1 << 20)
+    for fields in EVENTS:
+        assert spool.append(fields)
+    assert spool.read(1) == [EVENTS[0]]
+    spool.close()
+
+    spool = Spool.open(str(tmp_path), 1 << 20)
+    assert spool.pending == 2
+    assert spool.read(10) == EVENTS[1:]
+    spool.close()
+
+
+def test_corrupt_record_ends_the_segment(tmp_path) -> None:
+    """A record whose CRC does not match is dropped with everything after it."""
+    spool = Spool.open(str(tmp_path), 1 << 20)
+    for fields in EVENTS:
+        spool.append(fields)
+    spool.close()
+
+    (path,) = _segment_paths(str(tmp_path))
+    offset = _record_offsets(path)[1]
+    with open(path, "r+b") as file:
+        # Flip one payload byte of the second record
+        file.seek(offset + RECORD_HEADER.size)
+        byte = file.read(1)
+        file.seek(offset + RECORD_HEADER.size)
+        file.write(bytes([byte[0] ^ 0xFF]))
+
+    spool = Spool.open(str(tmp_path), 1 << 20)
+    assert spool.pending == 1
+    assert spool.read(10) == EVENTS[:1]
+    spool.close()
+
+
+def test_torn_record_is_overwritten_by_the_next_append(tmp_path) -> None:
+    """Appends after recovery continue in place of a torn record."""
+    spool = Spool.open(str(tmp_path), 1 << 20)
+    for fields in EVENTS[:2]:
+        spool.append(fields)
+    spool.close()
+
+    (path,) = _segment_paths(str(tmp_path))
+    offset = _record_offsets(path)[-1]
+    with open(path, "r+b") as file:
+        # Header of the last record written with a stale CRC
+        file.seek(offset)
+        header = RECORD_HEADER.unpack(file.read(RECORD_HEADER.size))
+        file.seek(offset)
+        file.write(RECORD_HEADER.pack(header[0], zlib.crc32(b"stale"), header[2]))
+
+    spool = Spool.open(str(tmp_path), 1 << 20)
+    assert spool.pending == 1
+    assert spool.append(EVENTS[2])
+    spool.close()
+
+    spool = Spool.open(str(tmp_path), 1 << 20)
+    assert spool.read(10) == [EVENTS[0], EVENTS[2]]
+    spool.close()
+
+
+def _prepare_standby(spool: Spool) -> None:
+    """Prepare the next segment like the server does in its executor."""
+    if spool.standby_needed:
+        spool.set_standby(spool.create_segment(spool.reserve_standby()))
+
+
+def test_replayed_segments_are_deleted(tmp_path) -> None:
+    """Rotating after a full replay starts over with a single segment."""
+    spool = Spool.open(str(tmp_path), 8192, segment_size=1024)
+    for index in range(100):
+        assert spool.append(("device", f"button_{index}", "press"))
+        _prepare_standby(spool)
+        spool.read(1)
+    assert spool.pending == 0
+    assert len(_segment_paths(str(tmp_path))) <= 2
+    spool.close()
+    assert len(_segment_paths(str(tmp_path))) == 1
+
+
+def test_rotation_waits_for_standby_segment(tmp_path) -> None:
+    """A full segment is never replaced by one created on the caller's thread."""
+    spool = Spool.open(str(tmp_path), 8192, segment_size=1024)
+    count = 0
+    while spool.append(("device", f"button_{count}", "press")):
+        count += 1
+    assert spool.awaiting_standby
+    assert spool.standby_needed
+    assert len(_segment_paths(str(tmp_path))) == 1
+
+    _prepare_standby(spool)
+    assert not spool.awaiting_standby
+    assert spool.append(("device", "button_last", "press"))
+    assert len(_segment_paths(str(tmp_path))) == 2
+    assert len(spool.read(count + 1)) == count + 1
+    spool.close()
+
+
+def test_extend_creates_segments(tmp_path) -> None:
+    """Events spooled at shutdown do not wait for a standby segment."""
+    spool = Spool.open(str(tmp_path), 8192, segment_size=1024)
+    events = [("device", f"button_{index}", "press") for index in range(100)]
+    assert spool.extend(events) == 100
+    spool.close()
+
+    spool = Spool.open(str(tmp_path), 8192, segment_size=1024)
+    assert spool.read(100) == events
+    spool.close()
+
+
+def test_truncated_segment_file(tmp_path) -> None:
+    """A segment file cut short on disk is appended to within its size."""
+    spool = Spool.open(str(tmp_path), 8192, segment_size=1024)
+    for fields in EVENTS:
+        spool.append(fields)
+    spool.close()
+
+    (path,) = _segment_paths(str(tmp_path))
+    offset = _record_offsets(path)[-1]
+    with open(path, "r+b") as file:
+        file.truncate(offset + RECORD_HEADER.size + 2)
+
+    spool = Spool.open(str(tmp_path), 8192, segment_size=1024)
+    assert spool.pending == 2
+    count = 0
+    while spool.append(("device", f"button_{count}", "press")):
+        count += 1
+    assert spool.awaiting_standby
+    _prepare_standby(spool)
+    assert spool.append(("device", "button_last", "press"))
+    assert spool.read(2) == EVENTS[:2]
+    assert len(spool.read(count + 1)) == count + 1
+    spool.close()
@@ -0,0 +1,39 @@
+"""Tests for frame handling in the TCP server and the ingest workers."""
+
+from types import SimpleNamespace
+
+from homeassistant.core import CoreState
+
+from custom_components.tcp_to_event_converter.dispatch import EventDispatcher
+from custom_components.tcp_to_event_converter.framing import NewlineFramer
+from custom_components.tcp_to_event_converter.ingest_worker import WorkerIngest
+from custom_components.tcp_to_event_converter.tcp_server import TCPServer
+
+from .conftest import FakeLoop
+
+ADDR = ("127.0.0.1", 40000)
+
+
+def test_whitespace_lines_are_heartbeats(loop: FakeLoop) -> None:
+    """CRLF and space keep-alives are neither messages nor parse failures."""
+    hass = SimpleNamespace(
+        loop=loop,
+        bus=SimpleNamespace(async_fire=lambda event_type, event_data: None),
+        data={},
+        state=CoreState.running,
+    )
+    server = TCPServer(hass, 54321, "tcp_event", {}, EventDispatcher(hass))
+    for frame in NewlineFramer().feed(b"\r\n \n\t\na:b:press\n"):
+        server._handle_frame(frame, ADDR, 0.0)
+    assert server.metrics.messages_received == 1
+    assert server.metrics.parse_failures == 0
+    assert server.metrics.validation_failures == 0
+
+
+def test_worker_skips_whitespace_heartbeats(loop: FakeLoop) -> None:
+    """Ingest workers treat blank lines the same way."""
+    ingest = WorkerIngest(loop, None, 0, 1024)
+    for frame in (b"", b" ", b"\t", b"a:b:press", b"bad"):
+        ingest.handle_frame(frame, 0.0)
+    assert ingest.messages_received == 2
+    assert ingest.parse_failures == 1
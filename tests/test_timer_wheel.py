@@ -0,0 +1,108 @@
+"""Tests for the hashed timer wheel."""
+
+from custom_components.tcp_to_event_converter.timer_wheel import TimerWheel
+
+from .conftest import FakeLoop
+
+
+def test_timer_fires_at_tick_granularity_never_early(
+    loop: FakeLoop, wheel: TimerWheel
+) -> None:
+    """A timer fires on the first tick at or after its delay."""
+    fired = []
+    wheel.schedule(0.105, fired.append, "a")
+    loop.advance(0.1)
+    assert fired == []
+    loop.advance(0.011)
+    assert fired == ["a"]
+    assert len(wheel) == 0
+
+
+def test_cancelled_timer_does_not_fire(loop: FakeLoop, wheel: TimerWheel) -> None:
+    """Cancelling drops the timer and its arguments."""
+    fired = []
+    timer = wheel.schedule(0.05, fired.append, "a")
+    wheel.cancel(timer)
+    assert len(wheel) == 0
+    assert timer.args == ()
+    wheel.cancel(timer)
+    assert len(wheel) == 0
+    loop.advance(1.0)
+    assert fired == []
+
+
+def test_cancel_after_firing_is_a_no_op(loop: FakeLoop, wheel: TimerWheel) -> None:
+    """A fired timer no longer counts as pending."""
+    fired = []
+    timer = wheel.schedule(0.05, fired.append, "a")
+    other = wheel.schedule(0.5, fired.append, "b")
+    loop.advance(0.1)
+    wheel.cancel(timer)
+    assert len(wheel) == 1
+    wheel.cancel(other)
+    assert len(wheel) == 0
+
+
+def test_reschedule_moves_the_timer(loop: FakeLoop, wheel: TimerWheel) -> None:
+    """Cancelling and scheduling again only fires the new timer."""
+    fired = []
+    timer = wheel.schedule(0.1, fired.append, "first")
+    loop.advance(0.05)
+    wheel.cancel(timer)
+    wheel.schedule(0.1, fired.append, "second")
+    loop.advance(0.06)
+    assert fired == []
+    loop.advance(0.05)
+    assert fired == ["second"]
+
+
+def test_earlier_timer_rearms_the_loop_timer(loop: FakeLoop, wheel: TimerWheel) -> None:
+    """A timer due before the armed slot is not delayed until that slot."""
+    fired = []
+    wheel.schedule(2.0, fired.append, "late")
+    wheel.schedule(0.02, fired.append, "early")
+    loop.advance(0.03)
+    assert fired == ["early"]
+    loop.advance(2.0)
+    assert fired == ["early", "late"]
+
+
+def test_timer_beyond_one_rotation(loop: FakeLoop, wheel: TimerWheel) -> None:
+    """A timer further away than one rotation waits for its own tick."""
+    fired = []
+    # 64 slots of 10 ms: one rotation is 0.64 s
+    wheel.schedule(1.0, fired.append, "far")
+    wheel.schedule(0.36, fired.append, "near")
+    loop.advance(0.7)
+    assert fired == ["near"]
+    loop.advance(0.29)
+    assert fired == ["near"]
+    loop.advance(0.02)
+    assert fired == ["near", "far"]
+
+
+def test_callback_can_reschedule(loop: FakeLoop, wheel: TimerWheel) -> None:
+    """Timers scheduled from a callback fire on a later tick."""
+    fired = []
+
+    def repeat(count: int) -> None:
+        fired.append(count)
+        if count < 3:
+            wheel.schedule(0.01, repeat, count + 1)
+
+    wheel.schedule(0.01, repeat, 1)
+    loop.advance(0.015)
+    assert fired == [1]
+    loop.advance(0.1)
+    assert fired == [1, 2, 3]
+    assert len(wheel) == 0
+
+
+def test_close_drops_pending_timers(loop: FakeLoop, wheel: TimerWheel) -> None:
+    """Closing the wheel never calls its timers."""
+    fired = []
+    wheel.schedule(0.01, fired.append, "a")
+    wheel.close()
+    loop.advance(1.0)
+    assert fired == []
+    assert len(wheel) == 0
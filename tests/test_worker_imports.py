@@ -0,0 +1,33 @@
+"""Tests that the ingest workers stay free of Home Assistant imports."""
+
+import os
+import subprocess
+import sys
+
+import custom_components.tcp_to_event_converter as integration
+
+WORKER_SCRIPT = os.path.join(
+    os.path.dirname(integration.__file__), "ingest_worker.py"
+)
+
+
+def test_worker_does_not_import_home_assistant() -> None:
+    """The worker script loads its modules without the package __init__."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", WORKER_SCRIPT, "--help"],
+        capture_output=True,
+        text=True,
+        check=False,
+        timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    imported = {
+        line.rsplit("|", 1)[-1].strip()
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:")
+    }
+    package = "custom_components.tcp_to_event_converter"
+    for module in ("worker_wire", "framing", "validator"):
+        assert f"{package}.{module}" in imported
+    assert not {name for name in imported if name.split(".")[0] == "homeassistant"}
+    assert f"{package}.tcp_server" not in imported